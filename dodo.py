@@ -1,4 +1,17 @@
 from pathlib import Path # To wrap around filepaths
+from src.pipeline import registry
+from src.pipeline.batch import get_shared_outputs
+from src.pipeline.profiling import get_profile_mode
+
+#With PIPELINE_PROFILE set, the scripts run under the profiler, see src/pipeline/profiling.py
+script_runner = "python" if get_profile_mode() is None else "python -m src.pipeline.profiling"
+
+#doit only checks that targets exist, so a partitioned dataset is declared by its
+#_common_metadata file, which is written last, see data_io_helper_functions.py
+def get_target_fp(artifact):
+    if artifact["kind"] == "partitioned":
+        return Path(artifact["path"]).joinpath("_common_metadata")
+    return artifact["path"]
 
 def task_clear_data_output():
     action_path = Path("src/data_preparation/clear_data_output.py")
@@ -33,11 +46,68 @@ def task_run_data_visualization_helper_functions_unit_tests():
         "file_dep": [Path("src/helper_functions/data_visualization_helper_functions.py")],
     }
 
+def task_run_helper_functions_import_time_tests():
+    action_path = Path("tests/unit_tests/helper_functions/test_helper_functions_import_time.py")
+    return {
+        "actions": ["pytest {}".format(action_path)],
+        "file_dep": [Path("src/helper_functions/data_io_helper_functions.py"),
+                     Path("src/helper_functions/data_preparation_helper_functions.py"),
+                     Path("src/helper_functions/data_analysis_helper_functions.py"),
+                     Path("src/helper_functions/data_visualization_helper_functions.py"),
+                     Path("src/helper_functions/web_scraping_helper_functions.py"),
+                     Path("src/helper_functions/geocoding_helper_functions.py"),
+                     Path("src/helper_functions/district_helper_functions.py")],
+    }
+
+def task_run_web_scraping_helper_functions_unit_tests():
+    action_path = Path("tests/unit_tests/helper_functions/test_web_scraping_helper_functions.py")
+    return {
+        "actions": ["pytest {}".format(action_path)],
+        "file_dep": [Path("src/helper_functions/web_scraping_helper_functions.py")],
+    }
+
+def task_run_geocoding_helper_functions_unit_tests():
+    action_path = Path("tests/unit_tests/helper_functions/test_geocoding_helper_functions.py")
+    return {
+        "actions": ["pytest {}".format(action_path)],
+        "file_dep": [Path("src/helper_functions/geocoding_helper_functions.py")],
+    }
+
+def task_run_district_helper_functions_unit_tests():
+    action_path = Path("tests/unit_tests/helper_functions/test_district_helper_functions.py")
+    return {
+        "actions": ["pytest {}".format(action_path)],
+        "file_dep": [Path("src/helper_functions/district_helper_functions.py")],
+    }
+
+def task_run_pipeline_unit_tests():
+    action_path = Path("tests/unit_tests/pipeline")
+    return {
+        "actions": ["pytest {}".format(action_path)],
+        "file_dep": [Path("src/pipeline/stages.py"),
+                     Path("src/pipeline/runner.py"),
+                     Path("src/pipeline/cache.py"),
+                     Path("src/pipeline/ledger.py"),
+                     Path("src/pipeline/invalidate.py"),
+                     Path("src/pipeline/registry.py"),
+                     Path("src/pipeline/batch.py"),
+                     Path("src/pipeline/profiling.py"),
+                     Path("src/pipeline/checkpoints.py")],
+    }
+
+def task_run_data_io_helper_functions_unit_tests():
+    action_path = Path("tests/unit_tests/helper_functions/test_data_io_helper_functions.py")
+    return {
+        "actions": ["pytest {}".format(action_path)],
+        "file_dep": [Path("src/helper_functions/data_io_helper_functions.py")],
+    }
+
 def task_process_airbnb_data():
     action_path = Path("src/data_preparation/process_airbnb_data.py")
     return {
-        "file_dep": [Path("data/raw/istanbul_airbnb_raw.csv")],
-        "actions": ["python {}".format(action_path)],
+        "file_dep": [Path("data/raw/istanbul_airbnb_raw.csv"),
+                     Path("data/external/istanbul_districts.shp")],
+        "actions": ["{} {}".format(script_runner, action_path)],
         "targets": [Path("data/processed/istanbul_airbnb_processed.csv")]
     }
 
@@ -53,16 +123,20 @@ def task_convert_airbnb_data_to_shapefile():
     action_path = Path("src/data_preparation/convert_airbnb_data_to_shapefile.py")
     return {
         "file_dep": [Path("data/processed/istanbul_airbnb_processed.csv"),
-                    Path("data/processed/hair_clinics_processed.shp")],
+                    Path("data/processed/hair_clinics_processed.shp"),
+                    Path("data/external/istanbul_districts.shp")],
         "task_dep": ["run_data_quality_tests_for_processed_airbnb_data"],
-        "actions": ["python {}".format(action_path)]
+        "actions": ["{} {}".format(script_runner, action_path)],
+        "targets": [Path("data/processed/istanbul_airbnb_processed_shapefile.shp"),
+                    Path("data/processed/istanbul_airbnb_processed_partitioned/_common_metadata")]
     }
 
 def task_process_health_services_data():
     action_path = Path("src/data_preparation/process_health_services_data.py")
     return {
-        "file_dep": [Path("data/raw/istanbul_healthservices_raw.csv")],
-        "actions": ["python {}".format(action_path)],
+        "file_dep": [Path("data/raw/istanbul_healthservices_raw.csv"),
+                     Path("data/external/istanbul_districts.shp")],
+        "actions": ["{} {}".format(script_runner, action_path)],
         "targets": [Path("data/processed/istanbul_aesthethic_centers_processed.csv")]
     }
 
@@ -71,14 +145,14 @@ def task_convert_aesthetic_clinic_to_shapefile():
     return {
         "file_dep": [Path("data/processed/istanbul_aesthethic_centers_processed.csv"),
                     Path("data/processed/hair_clinics_processed.shp")],
-        "actions": ["python {}".format(action_path)],
+        "actions": ["{} {}".format(script_runner, action_path)],
         "targets": [Path("data/processed/istanbul_aesthethic_centers_processed_shapefile.shp")]
     }
 
 # # # def task_scrape_web_for_hclinics():
 # # #     action_path = Path("src/data_preparation/scrape_web_for_hclinics.py")
 # # #     return {
-# # #         "actions": ["python {}".format(action_path)],
+# # #         "actions": ["{} {}".format(script_runner, action_path)],
 # # #         "targets": [Path("data/raw/hair_clinics_raw.csv")]
 # # #     }
 
@@ -86,7 +160,7 @@ def task_convert_hclinic_coords_to_points():
     action_path = Path("src/data_preparation/convert_hclinic_coords_to_points.py")
     return {
         "file_dep": [Path("data/raw/hair_clinics_raw.csv")],
-        "actions": ["python {}".format(action_path)],
+        "actions": ["{} {}".format(script_runner, action_path)],
         "targets": [Path("data/processed/hair_clinics_processed.shp")]
     }
 
@@ -94,8 +168,9 @@ def task_combine_aesthethic_clinic_hclinic_shapefiles():
     action_path = Path("src/data_preparation/combine_aesthethic_clinic_hclinic_shapefiles.py")
     return {
         "file_dep": [Path("data/processed/hair_clinics_processed.shp"),
-                    Path("data/processed/istanbul_aesthethic_centers_processed_shapefile.shp")],
-        "actions": ["python {}".format(action_path)],
+                    Path("data/processed/istanbul_aesthethic_centers_processed_shapefile.shp"),
+                    Path("data/external/istanbul_districts.shp")],
+        "actions": ["{} {}".format(script_runner, action_path)],
         "targets": [Path("data/processed/htourism_centers_processed.shp")]
     }
 
@@ -115,7 +190,7 @@ def task_run_nearest_neighbor_analysis():
         "task_dep": ["combine_aesthethic_clinic_hclinic_shapefiles",
                     "convert_airbnb_data_to_shapefile",
                     "run_data_quality_tests_for_processed_htourism_centers_data"],
-        "actions": ["python {}".format(action_path)],
+        "actions": ["{} {}".format(script_runner, action_path)],
         "targets": [Path("data/final/nn_analysis_results_all.csv"),
                     Path("data/final/nn_analysis_results_norm_atasehir.csv"),
                     Path("data/final/nn_analysis_results_norm_besiktas.csv"),
@@ -132,8 +207,9 @@ def task_process_nearest_neighbor_analysis_results():
                      Path("data/processed/istanbul_airbnb_processed_shapefile.shp")],
         "task_dep": ["run_nearest_neighbor_analysis",
                      "convert_airbnb_data_to_shapefile"],
-        "actions": ["python {}".format(action_path)],
-        "targets": [Path("data/final/distance_price_dataset.shp")]
+        "actions": ["{} {}".format(script_runner, action_path)],
+        "targets": [Path("data/final/distance_price_dataset.shp"),
+                    Path("data/final/distance_price_dataset_partitioned/_common_metadata")]
     }
 
 def task_analyze_geographic_distribution_of_htourism_centers():
@@ -143,7 +219,7 @@ def task_analyze_geographic_distribution_of_htourism_centers():
                     Path("data/external/istanbul_districts.shp"),
                     Path("data/external/district_income.xlsx")],
         "task_dep": ["combine_aesthethic_clinic_hclinic_shapefiles"],
-        "actions": ["python {}".format(action_path)],
+        "actions": ["{} {}".format(script_runner, action_path)],
         "targets": [Path("data/final/geographic_distribution_of_htourism_centers.shp")]
     }
 
@@ -154,7 +230,7 @@ def task_analyze_geographic_distribution_of_airbnb_rentals():
                     Path("data/external/istanbul_districts.shp"),
                     Path("data/external/district_income.xlsx")],
         "task_dep": ["convert_airbnb_data_to_shapefile"],
-        "actions": ["python {}".format(action_path)],
+        "actions": ["{} {}".format(script_runner, action_path)],
         "targets": [Path("data/final/geographic_distribution_of_airbnb_rentals.shp")]
     }
 
@@ -165,7 +241,7 @@ def task_visualize_geographic_distribution_of_htourism_centers():
                     Path("data/processed/htourism_centers_processed.shp"),
                     Path("data/external/istanbul_districts.shp")],
         "task_dep": ["analyze_geographic_distribution_of_htourism_centers"],
-        "actions": ["python {}".format(action_path)],
+        "actions": ["{} {}".format(script_runner, action_path)],
         "targets": [Path("media/figures/raw/visualize_geographic_distribution_of_htourism")]
     }
 
@@ -174,7 +250,7 @@ def task_visualize_bivariate_analysis_htourism_center_count_at_district_level():
     return {
         "file_dep": [Path("data/final/geographic_distribution_of_htourism_centers.shp")],
         "task_dep": ["analyze_geographic_distribution_of_htourism_centers"],
-        "actions": ["python {}".format(action_path)],
+        "actions": ["{} {}".format(script_runner, action_path)],
         "targets": [Path("media/figures/raw/visualize_bivariate_analysis_htourism_center_count_at_district_level")]
     }
 
@@ -185,7 +261,7 @@ def task_visualize_geographic_distribution_of_airbnb_rentals():
                     Path("data/processed/istanbul_airbnb_processed_shapefile.shp"),
                     Path("data/external/istanbul_districts.shp")],
         "task_dep": ["analyze_geographic_distribution_of_airbnb_rentals"],
-        "actions": ["python {}".format(action_path)],
+        "actions": ["{} {}".format(script_runner, action_path)],
         "targets": [Path("media/figures/raw/visualize_geographic_distribution_airbnb")]
     }
 
@@ -194,16 +270,16 @@ def task_visualize_bivariate_analysis_airbnb_count_at_district_level():
     return {
         "file_dep": [Path("data/final/geographic_distribution_of_airbnb_rentals.shp")],
         "task_dep": ["analyze_geographic_distribution_of_airbnb_rentals"],
-        "actions": ["python {}".format(action_path)],
+        "actions": ["{} {}".format(script_runner, action_path)],
         "targets": [Path("media/figures/raw/visualize_bivariate_analysis_airbnb_count_at_district_level")],
     }
 
 def task_visualize_price_distribution_of_airbnb_rentals_kdeplot():
     action_path = Path("src/data_visualization/visualize_price_distribution_of_airbnb_rentals_kdeplot.py")
     return {
-        "file_dep": [Path("data/processed/istanbul_airbnb_processed.csv")],
-        "task_dep": ["run_data_quality_tests_for_processed_airbnb_data"],
-        "actions": ["python {}".format(action_path)],
+        "file_dep": [Path("data/processed/istanbul_airbnb_processed_partitioned/_common_metadata")],
+        "task_dep": ["convert_airbnb_data_to_shapefile"],
+        "actions": ["{} {}".format(script_runner, action_path)],
         "targets": [Path("media/figures/raw/visualize_price_distribution_of_airbnb_rentals_kdeplot")]
     }
 
@@ -218,15 +294,52 @@ def task_visualize_nearest_neighbor_analysis_confirmation():
                     Path("data/final/nn_analysis_results_norm_uskudar.csv"),
                     Path("data/final/nn_analysis_results_normalized.csv")],
         "task_dep": ["run_nearest_neighbor_analysis"],
-        "actions": ["python {}".format(action_path)],
+        "actions": ["{} {}".format(script_runner, action_path)],
         "targets": [Path("media/figures/raw/visualize_nearest_neighbor_analysis_confirmation")]
     }
 
 def task_visualize_nearest_neighbor_analysis_correlation_results():
     action_path = Path("src/data_visualization/visualize_nearest_neighbor_analysis_correlation_results.py")
     return {
-        "file_dep": [Path("data/final/distance_price_dataset.shp")],
+        "file_dep": [Path("data/final/distance_price_dataset_partitioned/_common_metadata")],
         "task_dep": ["process_nearest_neighbor_analysis_results"],
-        "actions": ["python {}".format(action_path)],
+        "actions": ["{} {}".format(script_runner, action_path)],
         "targets": [Path("media/figures/raw/visualize_nearest_neighbor_analysis_correlation_results")]
-    }
\ No newline at end of file
+    }
+
+#The shared outputs of the home city are written by the tasks above.
+#Other cities get one task that writes them, see src/pipeline/batch.py
+def task_prepare_city():
+    for city in registry.cities:
+        if city == registry.home_city:
+            continue
+        artifacts, stages = registry.build_registry(city)
+        yield {
+            "name": city,
+            "file_dep": [path for name, path in registry.cities[city].items() if name != "selected_districts"],
+            "actions": ["python -m src.pipeline.batch --city {} --shared-only --workers 1".format(city)],
+            "targets": [get_target_fp(artifacts[name]) for name in get_shared_outputs(stages)]
+        }
+
+#One task per dated airbnb snapshot in data/raw/airbnb_snapshots/<city>/<YYYY-MM-DD>.csv
+#Snapshot tasks don't depend on each other, so "doit -n 4" runs four of them side by side.
+def task_run_airbnb_snapshot():
+    for city in registry.cities:
+        for snapshot in registry.list_snapshots(city, Path(".")):
+            artifacts, stages = registry.build_registry(city, snapshot)
+            shared_fps = [artifacts[name]["path"] for name in get_shared_outputs(stages)]
+            yield {
+                "name": "{}_{}".format(city, snapshot),
+                "file_dep": [artifacts["istanbul_airbnb_raw"]["path"]] + shared_fps,
+                "actions": ["python -m src.pipeline.batch --city {} --snapshot {} --reuse-shared --workers 1"
+                            .format(city, snapshot)],
+                "targets": [get_target_fp(artifacts[name]) for stage_name, stage in stages.items()
+                            if stage_name not in registry.shared_stage_names for name in stage["outputs"]
+                            if artifacts[name].get("persist", False)]
+            }
+
+#The clear tasks remove every output, which forces everything to run again.
+#They only run when named, e.g. "doit clear_data_output clear_viz_output".
+#To remove only the outputs that depend on a change, see src/pipeline/invalidate.py
+DOIT_CONFIG = {"default_tasks": [name[len("task_"):] for name in list(globals())
+                                 if name.startswith("task_") and not name.startswith("task_clear_")]}
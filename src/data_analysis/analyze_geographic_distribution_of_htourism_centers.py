@@ -12,59 +12,45 @@ the district level while also adding some extra information for further
 bivariate correlation analysis.
 
 Returns geographic_distribution_of_htourism_centers.shp
+
+The analysis itself is done by analyze_geographic_distribution_of_htourism_centers,
+found at src/pipeline/stages.py
 """
 #%% --- Import Required Packages ---
 
-import os
-from pathlib import Path # To wrap around filepaths
-import pandas as pd
 import geopandas as gpd
-#%% --- Set proper directory to assure integration with doit ---
-
-abspath = os.path.abspath(__file__)
-dname = os.path.dirname(abspath)
-os.chdir(dname)
-
+from src.helper_functions.data_io_helper_functions import load_reference_geodataframe
+from src.helper_functions.data_io_helper_functions import write_shapefile
+from src.helper_functions.data_io_helper_functions import load_reference_dataframe
+from src.pipeline.stages import analyze_geographic_distribution_of_htourism_centers
+from src.helper_functions.data_io_helper_functions import external_data_dir
+from src.helper_functions.data_io_helper_functions import processed_data_dir
+from src.helper_functions.data_io_helper_functions import final_data_dir
 #%% --- Import Data ---
 
 #Import district data
-import_fp = Path("../../data/external/istanbul_districts.shp")
-districts_gdf = gpd.read_file(import_fp, encoding = "utf-8-sig")
+import_fp = external_data_dir.joinpath("istanbul_districts.shp")
+districts_gdf = load_reference_geodataframe(import_fp, encoding = "utf-8-sig")
 
 #Import htourism centers data
-import_fp = Path("../../data/processed/htourism_centers_processed.shp")
+import_fp = processed_data_dir.joinpath("htourism_centers_processed.shp")
 htourism_gdf = gpd.read_file(import_fp, encoding = "utf-8-sig")
 
 #Import extra data
-import_fp = Path("../../data/external/district_income.xlsx")
-extra_data = pd.read_excel(import_fp, engine = "openpyxl")
+import_fp = external_data_dir.joinpath("district_income.xlsx")
+extra_data = load_reference_dataframe(import_fp, engine = "openpyxl")
 
 #%% --- Aggregate htourism center count per district ---
 
-htourism_count_per_district = htourism_gdf.loc[:,"district_e"].value_counts().rename_axis('district_e').reset_index(name='htourism_count')
-
-#%% --- Join in with district data ---
-
-districts_gdf = districts_gdf.merge(htourism_count_per_district,
-                                               on = "district_e",
-                                               how = "left")
-
-#%% --- Subset only the info that you might need from districts_gdf ---
-
-columns_to_drop = ["OBJECTID", "Shape_Leng", "Shape_Area",
-                   "continent"]
-districts_gdf.drop(columns_to_drop, axis = 1, inplace = True)
-
-#%% --- Add in extra data ---
-
-extra_data.rename(columns = {"district_eng" : "district_e"}, inplace = True)
-districts_gdf = districts_gdf.merge(extra_data.loc[:,["district_e", "population", "yearly_average_household_income"]],
-                                               on = "district_e",
-                                               how = "left")
+#The stage counts the htourism centers in each district into a "htourism_count" column, joins
+#the counts in with district data, drops the district columns that are not needed
+#and adds in the population and yearly average household income from extra_data.
+districts_gdf = analyze_geographic_distribution_of_htourism_centers(districts_gdf, htourism_gdf,
+                                                      extra_data)["geographic_distribution_of_htourism_centers"]
 
 #%% --- Export data ---
 
-export_fp = Path("../../data/final/geographic_distribution_of_htourism_centers.shp")
-districts_gdf.to_file(export_fp, encoding = "utf-8")
+export_fp = final_data_dir.joinpath("geographic_distribution_of_htourism_centers.shp")
+write_shapefile(districts_gdf, export_fp, encoding = "utf-8")
 
 
@@ -10,73 +10,59 @@ istanbul_airbnb_processed as reference and htourism_centers_processed as compari
 
 Returns a dataframe that includes information about the nearest health tourism center
 to each AirBnB rental along with the distance.
+
+The analysis itself is done by run_nearest_neighbor_analysis, found at
+src/pipeline/stages.py
+
+The analysis runs in chunks that are checkpointed in
+data/cache/checkpoints/run_nearest_neighbor_analysis. If the script is
+interrupted, running it again resumes from the last completed chunk.
 """
 #%% --- Import Required Packages ---
 
-import os
-from pathlib import Path # To wrap around filepaths
-from scipy.stats import iqr
 import geopandas as gpd
-from src.helper_functions.data_analysis_helper_functions import nearest_neighbor_analysis
-#%% --- Set proper directory to assure integration with doit ---
-
-abspath = os.path.abspath(__file__)
-dname = os.path.dirname(abspath)
-os.chdir(dname)
-
+from src.pipeline.stages import run_nearest_neighbor_analysis
+from src.pipeline.checkpoints import checkpoints_dir
+from src.helper_functions.data_io_helper_functions import processed_data_dir
+from src.helper_functions.data_io_helper_functions import final_data_dir
 #%% --- Import Data ---
 
 #Import airbnb data
-import_fp = Path("../../data/processed/istanbul_airbnb_processed_shapefile.shp")
+import_fp = processed_data_dir.joinpath("istanbul_airbnb_processed_shapefile.shp")
 airbnb_gdf = gpd.read_file(import_fp, encoding = "utf-8-sig")
 
 #Import htourism centers data
-import_fp = Path("../../data/processed/htourism_centers_processed.shp")
+import_fp = processed_data_dir.joinpath("htourism_centers_processed.shp")
 htourism_gdf = gpd.read_file(import_fp, encoding = "utf-8-sig")
-#%% --- Conduct Nearest Neighbor Analysis for all districts - without normalization ---
-
-nn_analysis_results_all = nearest_neighbor_analysis(airbnb_gdf, htourism_gdf)
-
-#%% --- Conduct Nearest Neighbor Analysis for all districts - with normalization ---
 
-#Calculate iqr, q1 and q3 for price
-price_iqr = iqr(airbnb_gdf.loc[:,"price"], axis = 0)
-q1 = airbnb_gdf.loc[:,"price"].quantile(0.25)
-q3 = airbnb_gdf.loc[:,"price"].quantile(0.75)
+#%% --- Conduct Nearest Neighbor Analysis ---
 
-#Create masks to select values within IQR
-min_mask = airbnb_gdf.loc[:,"price"] >= q1 - (price_iqr * 1.5)
-max_mask = airbnb_gdf.loc[:,"price"] <= q3 + (price_iqr * 1.5)
-combined_mask = min_mask & max_mask
-
-#Select values according to mask 
-airbnb_gdf_normalized = airbnb_gdf[combined_mask]
-
-#Conduct nn analysis
-nn_analysis_results_normalized = nearest_neighbor_analysis(airbnb_gdf_normalized,
-                                                           htourism_gdf)
-
-#%% --- Conduct Nearest Neighbor Analysis for five districts with most Htourism centers ---
-
-nn_analysis_results_districts = {}
+#The analysis is conducted for:
+#   all districts, without normalization
+#   all districts, with prices normalized to +/- 1.5 IQR
+#   the five districts with most Htourism centers, with the same city-wide price bounds
 selected_districts = ["Sisli", "Besiktas", "Kadikoy", "Atasehir", "Uskudar"]
 
-for district in selected_districts:
-    district_mask = airbnb_gdf_normalized.loc[:,"district_e"] == district
-    selection = airbnb_gdf_normalized.loc[district_mask,:]
-    result = nearest_neighbor_analysis(selection, htourism_gdf)
-    nn_analysis_results_districts[district] = result
+nn_results = run_nearest_neighbor_analysis(airbnb_gdf, htourism_gdf,
+                                           selected_districts = selected_districts,
+                                           iqr_multiplier = 1.5,
+                                           checkpoint_dir = checkpoints_dir.joinpath("run_nearest_neighbor_analysis"))
+
+nn_analysis_results_all = nn_results["nn_analysis_results_all"]
+nn_analysis_results_normalized = nn_results["nn_analysis_results_normalized"]
+nn_analysis_results_districts = {district: nn_results["nn_analysis_results_norm_{}".format(district.lower())]
+                                 for district in selected_districts}
     
 #%% --- Export data : nn_analysis_results_all ---
 
-export_fp = Path("../../data/final/nn_analysis_results_all.csv")
+export_fp = final_data_dir.joinpath("nn_analysis_results_all.csv")
 nn_analysis_results_all.to_csv(export_fp,
                                encoding = "utf-8-sig",
                                index = False)
 
 #%% --- Export data : nn_analysis_results_normalized ---
 
-export_fp = Path("../../data/final/nn_analysis_results_normalized.csv")
+export_fp = final_data_dir.joinpath("nn_analysis_results_normalized.csv")
 nn_analysis_results_normalized.to_csv(export_fp,
                                       encoding = "utf-8-sig",
                                       index = False)
@@ -84,8 +70,7 @@ nn_analysis_results_normalized.to_csv(export_fp,
 #%% --- Export data: nn_analysis_results_districts ---
 
 for district, nn_analysis in nn_analysis_results_districts.items():
-    path_string = ("../../data/final/nn_analysis_results_norm_{}.csv").format(district.lower())
-    export_fp = Path(path_string)
+    export_fp = final_data_dir.joinpath("nn_analysis_results_norm_{}.csv".format(district.lower()))
     nn_analysis.to_csv(export_fp,
                        encoding = "utf-8-sig",
                        index = False)
\ No newline at end of file
@@ -3,27 +3,21 @@
 ------ What is this file? ------
 This script targets the all the intermediary and final data output produced by the data analysis pipeline.
 It fits into the start of the pipeline as a measure to assure a clean run of the analysis.
+doit runs it only when asked to. To remove only the outputs that depend on a change,
+use src/pipeline/invalidate.py
 """
 #%% --- Import Required Packages ---
 
 import os
 import shutil
-from pathlib import Path # To wrap around filepaths
-
-#%% --- Set proper directory to assure integration with doit ---
-
-abspath = os.path.abspath(__file__)
-dname = os.path.dirname(abspath)
-os.chdir(dname)
+from src.helper_functions.data_io_helper_functions import processed_data_dir
+from src.helper_functions.data_io_helper_functions import final_data_dir
 
 #%% --- Process folder names and delete paths ---
 
-folder_names = ["processed", "final"]
-folder_prefix = "../../data/{}"
-folder_prefix_viz = "../../media/figures/raw"
+folder_paths = [processed_data_dir, final_data_dir]
 
-for folder_name in folder_names:
-    folder_path = Path(folder_prefix.format(folder_name))
+for folder_path in folder_paths:
     for filename in os.listdir(folder_path):
         file_path = os.path.join(folder_path, filename)
         try:
@@ -3,22 +3,18 @@
 ------ What is this file? ------
 This script targets the all the raw visualization output produced by the data analysis pipeline.
 It fits into the start of the pipeline as a measure to assure a clean run of the analysis.
+doit runs it only when asked to. To remove only the outputs that depend on a change,
+use src/pipeline/invalidate.py
 """
 #%% --- Import Required Packages ---
 
 import os
 import shutil
-from pathlib import Path # To wrap around filepaths
-
-#%% --- Set proper directory to assure integration with doit ---
-
-abspath = os.path.abspath(__file__)
-dname = os.path.dirname(abspath)
-os.chdir(dname)
+from src.helper_functions.data_io_helper_functions import figures_dir
 
 #%% --- Process folder names and delete paths ---
 
-folder_path = Path("../../media/figures/raw")
+folder_path = figures_dir
 
 for filename in os.listdir(folder_path):
     file_path = os.path.join(folder_path, filename)
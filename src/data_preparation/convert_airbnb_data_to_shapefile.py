@@ -4,46 +4,59 @@
 
 This script targets the istanbul_airbnb_processed.csv file.
 It converts the file into a shapefile.        
+
+It also writes the same data as a dataset partitioned by district
+(istanbul_airbnb_processed_partitioned), so that per-district analyses
+can read only the districts they need.
+
+The conversion itself is done by convert_airbnb_data_to_shapefile, found at
+src/pipeline/stages.py
 """
 #%% --- Import Required Packages ---
 
-import os
-from pathlib import Path # To wrap around filepaths
 import pandas as pd
-import matplotlib.pyplot as plt
 import geopandas as gpd
-from shapely.geometry import Point
-
-#%% --- Set proper directory to assure integration with doit ---
-
-abspath = os.path.abspath(__file__)
-dname = os.path.dirname(abspath)
-os.chdir(dname)
+from src.helper_functions.data_io_helper_functions import write_partitioned_dataset
+from src.helper_functions.data_io_helper_functions import load_reference_geodataframe
+from src.helper_functions.data_io_helper_functions import write_shapefile
+from src.pipeline.stages import convert_airbnb_data_to_shapefile
+from src.helper_functions.data_io_helper_functions import processed_data_dir
+from src.helper_functions.data_io_helper_functions import external_data_dir
 
 #%% --- Import Data ---
 
 #import the primary dataset
-import_fp = Path("../../data/processed/istanbul_airbnb_processed.csv")
+import_fp = processed_data_dir.joinpath("istanbul_airbnb_processed.csv")
 airbnb_df = pd.read_csv(import_fp, encoding = "utf-8-sig")
 
 #also import secondary dataset
-import_fp = Path("../../data/processed/hair_clinics_processed.shp")
+import_fp = processed_data_dir.joinpath("hair_clinics_processed.shp")
 hclinics_gdf = gpd.read_file(import_fp)
 
+#The district boundaries give the extent of the city for the spatial sort
+import_fp = external_data_dir.joinpath("istanbul_districts.shp")
+istanbul_districts = load_reference_geodataframe(import_fp)
+
 #%% --- Convert airbnb_df DataFrame to a GeoDataFrame ---
 
-#Use the crs of hclinics_gdf as reference crs
-reference_crs = hclinics_gdf.crs
-#Convert latitude and longitude information of airbnb_df into Shapely point objects.
-geometry = [Point(xy) for xy in zip(airbnb_df["longitude"], airbnb_df["latitude"])]
-#convert airbnb_df to a GeoDataframe with crs as reference crs and geometry as geometry
-airbnb_gdf = gpd.GeoDataFrame(airbnb_df,
-                              crs = reference_crs,
-                              geometry = geometry)
+#Latitude and longitude information is converted into points, with the crs of
+#hclinics_gdf as the crs of reference.
+#The listings are then sorted along a Hilbert curve: listings that are close to
+#each other in space are stored next to each other. The curve key is kept in the
+#"hilbert" column. Every layer is keyed over the bounds of the city, so keys are
+#comparable across layers.
+airbnb_gdf = convert_airbnb_data_to_shapefile(airbnb_df, hclinics_gdf,
+                                              istanbul_districts)["istanbul_airbnb_processed_shapefile"]
 
 #%% --- Export airbnb_gdf as a shapefile ---
 
-export_fp = Path("../../data/processed/istanbul_airbnb_processed_shapefile.shp")
-airbnb_gdf.to_file(export_fp, encoding = "utf-8-sig")
+export_fp = processed_data_dir.joinpath("istanbul_airbnb_processed_shapefile.shp")
+write_shapefile(airbnb_gdf, export_fp, encoding = "utf-8-sig")
 
+#%% --- Export airbnb_gdf as a district-partitioned dataset ---
 
+#One folder per district: district_eng=<district>/part-0.parquet
+#Column names are not truncated to 10 characters as they are in the shapefile.
+export_dir = processed_data_dir.joinpath("istanbul_airbnb_processed_partitioned")
+write_partitioned_dataset(airbnb_gdf, export_dir,
+                          partition_column = "district_eng")
@@ -16,68 +16,45 @@ the following information is retained:
     - distance between the Airbnb rental and the nearest
         health-tourism related institution.
         
-Returns a single shapefile.
+Returns a single shapefile, along with a copy of it that is partitioned
+by district (distance_price_dataset_partitioned).
+
+The merge itself is done by process_nearest_neighbor_analysis_results, found at
+src/pipeline/stages.py
 
 """
 #%% --- Import Required Packages ---
 
-import os
-from pathlib import Path # To wrap around filepaths
-from shapely.geometry import Point
 import pandas as pd
 import geopandas as gpd
-
-#%% --- Set proper directory to assure integration with doit ---
-
-abspath = os.path.abspath(__file__)
-dname = os.path.dirname(abspath)
-os.chdir(dname)
+from src.helper_functions.data_io_helper_functions import write_partitioned_dataset
+from src.pipeline.stages import process_nearest_neighbor_analysis_results
+from src.helper_functions.data_io_helper_functions import final_data_dir
+from src.helper_functions.data_io_helper_functions import processed_data_dir
 
 #%% --- Import Data ---
 
 #Nearest neighbor analysis results
-import_fp = Path("../../data/final/nn_analysis_results_all.csv")
+import_fp = final_data_dir.joinpath("nn_analysis_results_all.csv")
 nn_results = pd.read_csv(import_fp, encoding = "utf-8-sig")
 
 #Airbnb data in geospatial form
-import_fp = Path("../../data/processed/istanbul_airbnb_processed_shapefile.shp")
+import_fp = processed_data_dir.joinpath("istanbul_airbnb_processed_shapefile.shp")
 airbnb = gpd.read_file(import_fp, encoding = "utf-8-sig")
 
-#%% --- Drop irrelevant Airbnb columns ---
-
-#Keep only the colums that will be needed in masking/viz./analysis
-columns_to_keep = ["district_e", "price", "geometry"]
-airbnb =  airbnb.loc[:,columns_to_keep]
-
-#%% --- Turn nn_results into a GeoDataFrame ---
-
-#Create a function to transform strings into tuples
-def decode_recode_point_str(point_str):
-    split = point_str.split()
-    lon = float(split[1].strip("("))
-    lat = float(split[2].strip(")"))
-    return Point(lon,lat)
+#%% --- Merge the two datasets ---
 
-# Decode and recode point info, goes from str to shapely Point object.
-nn_results.loc[:,"point_of_origin"] = (nn_results.loc[:,"point_of_origin"]
-                                       .apply(decode_recode_point_str))
-
-#Create a GeoDataFrame with the same crs as airbnb dataset
-nn_results_gdf = gpd.GeoDataFrame(nn_results,
-                                  crs = airbnb.crs,
-                                  geometry = "point_of_origin")
-
-#rename "point_of_origin" column to geometry
-nn_results_gdf.rename({"point_of_origin":"geometry"},
-                      axis = 1,
-                      inplace = True)
-
-#%% --- Merge two GeoDataFrames ---
-
-distance_price_dataset = airbnb.merge(nn_results_gdf,
-                                      on = "geometry")
+#The stage keeps only the Airbnb columns that will be needed in masking/viz./analysis
+#(district_e, price, geometry), turns the "POINT (lon lat)" strings of nn_results
+#back into shapely Point objects and merges the two on geometry.
+distance_price_dataset = process_nearest_neighbor_analysis_results(nn_results, airbnb)["distance_price_dataset"]
 
 #%% --- Export data ---
 
-out_fp = Path("../../data/final/distance_price_dataset.shp")
-distance_price_dataset.to_file(out_fp)
\ No newline at end of file
+out_fp = final_data_dir.joinpath("distance_price_dataset.shp")
+distance_price_dataset.to_file(out_fp)
+
+#One folder per district: district_e=<district>/part-0.parquet
+export_dir = final_data_dir.joinpath("distance_price_dataset_partitioned")
+write_partitioned_dataset(distance_price_dataset, export_dir,
+                          partition_column = "district_e")
@@ -9,35 +9,46 @@ This file is used to scrape the web for information about the hair transplant
 centers that can be found in Istanbul.
 
 I use simple html and xpath scraping to get a list of the potential hair transplant
-centers in Istanbul. Then, i use Selenium to automate Google Maps coordinate extraction.
+centers in Istanbul. Then, i use Selenium to automate Google Maps coordinate extraction,
+through the geocoder backends of src/helper_functions/geocoding_helper_functions.py
+
+The listing pages are fetched with fetch_all, found at
+src/helper_functions/web_scraping_helper_functions.py, which caches them in
+data/cache/http and only downloads them again if they changed.
 
 Finally, the dataset that contains information about clinic name - clinic search url
 and clinic-coordinate is written to a csv file.
+
+The coordinates are cached in data/cache/geocode_cache.sqlite as soon as each
+clinic is geocoded. If the script crashes, running it again only geocodes the
+clinics that are not cached yet. The clinics of the existing hair_clinics_raw.csv
+keep their coordinates, so a refresh only geocodes the new or renamed clinics.
 """
 
 #%% --- Import required packages ---
 
-import os
-import requests # To request for an HTML file
 from lxml import html #To create the document tree / xpath query
 from selenium import webdriver # For webscraping
 from pathlib import Path # To wrap around filepaths
 import pandas as pd
-
-#%% --- Set proper directory to assure integration with doit ---
-
-abspath = os.path.abspath(__file__)
-dname = os.path.dirname(abspath)
-os.chdir(dname)
+from src.helper_functions.data_io_helper_functions import raw_data_dir
+from src.helper_functions.web_scraping_helper_functions import fetch_all
+from src.helper_functions.geocoding_helper_functions import create_selenium_backend
+from src.helper_functions.geocoding_helper_functions import create_gazetteer_backend
+from src.helper_functions.geocoding_helper_functions import geocode_all
+from src.helper_functions.geocoding_helper_functions import seed_geocode_cache
+from src.helper_functions.geocoding_helper_functions import diff_place_names
 
 
 #%% --- Scrape the hair transplant clinic names from the web ---
 
-#Open a request to the page
-page = requests.get("https://www.sacekimiburada.com/istanbul-sac-ekim-merkezleri")
+#Fetch the page. More listing pages can be fetched at once by adding them to the list,
+#and paginated directories can be followed with crawl.
+listing_urls = ["https://www.sacekimiburada.com/istanbul-sac-ekim-merkezleri"]
+page_content = fetch_all(listing_urls)[0]
 
 #Create an html document tree of the page content
-tree = html.fromstring(page.content)
+tree = html.fromstring(page_content)
 
 #Parse the tree using xpath to find the information we are looking for
 hclinic_names_unmodified = list(tree.xpath('//h3/text()'))
@@ -64,6 +75,16 @@ last_row_index = hclinic_df.loc[last_row_mask].index[0]
 after_last_row_mask = hclinic_df.index <= last_row_index
 hclinic_df = hclinic_df[after_last_row_mask]
 
+#Delete some specific indexes that do not fit. They are deleted before
+#geocoding, so that they are not geocoded for nothing.
+
+unwanted_hclinic_names = ["Dr. Yaman Hair Clinic","Prens Hair",
+                          "Marmara Hair Clinic","Life Point","Dr.Eser Aydoğdu",
+                          "MepyyHair", "Equinox Hair", "Hairworld İstanbul"]
+
+unwanted_hclinic_names_mask = hclinic_df.loc[:,"hclinic_name"].isin(unwanted_hclinic_names) == False
+
+hclinic_df = hclinic_df.loc[unwanted_hclinic_names_mask,:]
 
 #%% --- Add a "hclinic_search_url" column ---
 
@@ -73,46 +94,71 @@ search_url = "https://www.google.com/maps/search/"
 #Concat with each row to create a search url belonging to that row
 hclinic_df["hclinic_search_url"] = search_url + hclinic_df["hclinic_name"]
 
-#%% --- Scrape the location data with Selenium and Google Maps ---
+#%% --- Carry the coordinates of the known clinics forward ---
 
-#We'll be scraping the Google Maps web interface with Selenium.
+#The clinics of the previous scrape keep their coordinates. They are written to
+#the geocode cache, so that only the new or renamed clinics are geocoded below,
+#and a refresh that finds no new clinic doesn't start a browser at all.
+out_fp = raw_data_dir.joinpath("hair_clinics_raw.csv")
 
-#Create an empty list where coordinates will be stored
-Url_With_Coordinates = []
+if out_fp.is_file():
+    known_hclinic_df = pd.read_csv(out_fp, encoding = "utf-8-sig")
+    
+    hclinic_name_diff = diff_place_names(hclinic_df.loc[:,"hclinic_name"], known_hclinic_df.loc[:,"hclinic_name"])
+    print("{} new, {} removed and {} known clinics".format(len(hclinic_name_diff["new"]),
+                                                           len(hclinic_name_diff["removed"]),
+                                                           len(hclinic_name_diff["kept"])))
+    
+    seed_geocode_cache(known_hclinic_df, backend_name = "hair_clinics_raw.csv")
 
-#Access the options for Chrome webdrivers
-option = webdriver.ChromeOptions()
+#%% --- Geocode the hair transplant clinics ---
 
-#Add some exceptions to deactivate images and javascript
-#This way, the page will load faster.
-prefs = {'profile.default_content_setting_values': {'images':2, 'javascript':2}}
-option.add_experimental_option('prefs', prefs)
+#The coordinates are found by geocode_all, found at
+#src/helper_functions/geocoding_helper_functions.py. Clinics that were geocoded
+#by an earlier run are read from data/cache/geocode_cache.sqlite, the others are
+#geocoded by several workers at once.
 
-#Initiate the Google Chrome webdriver with options.
-driver = webdriver.Chrome("selenium chrome driver/chromedriver.exe", options=option)
+#"selenium" searches Google Maps. "gazetteer" looks the clinics up in the
+#hair_clinics_raw.csv of an earlier scrape, and works offline.
+geocoder_backend = "selenium"
 
-for url in hclinic_df.loc[:,"hclinic_search_url"].values:
-    driver.get(url) #Go to the page
-    
-    #Select the html element containing coords info via css selector
-    raw_str = driver.find_element_by_css_selector('meta[itemprop=image]').get_attribute('content')
+#The number of clinics geocoded at once, and of Chrome webdrivers running at once
+geocoder_workers = 4
+
+if geocoder_backend == "selenium":
+    #Access the options for Chrome webdrivers
+    option = webdriver.ChromeOptions()
     
-    # Split to format - 1
-    processed_str_1 = raw_str.split('?center=')[1]
+    #Add some exceptions to deactivate images and javascript
+    #This way, the page will load faster.
+    prefs = {'profile.default_content_setting_values': {'images':2, 'javascript':2}}
+    option.add_experimental_option('prefs', prefs)
     
-    #Split to format - 2
-    processed_str_2 = processed_str_1.split('&zoom=')[0]
+    #The webdrivers run without a window
+    option.add_argument("--headless")
     
-    #Split to format - 3
-    processed_str_3 = processed_str_2.split("%2C")
+    #The webdrivers are started by the backend with options, and restarted if a
+    #page doesn't load within 30 seconds. The driver is kept next to this script
+    chromedriver_fp = Path(__file__).resolve().parent.joinpath("selenium chrome driver", "chromedriver.exe")
+    def create_driver():
+        return webdriver.Chrome(str(chromedriver_fp), options=option)
     
-    #Get tuple position 0 as latitude and tuple position 1 as longitude
-    lat = processed_str_3[0]
-    lon = processed_str_3[1]
-
-    Url_With_Coordinates.append((lat,lon))
-
-driver.close()
+    backend, drivers = create_selenium_backend(create_driver, search_url = search_url,
+                                               pool_size = geocoder_workers,
+                                               page_load_timeout = 30, retries = 2)
+    try:
+        #Google Maps is searched twice per second at most
+        coordinates_df = geocode_all(hclinic_df.loc[:,"hclinic_name"], backend, backend_name = "selenium",
+                                     max_workers = geocoder_workers, calls_per_second = 2)
+    finally:
+        for driver in list(drivers):
+            driver.quit()
+else:
+    gazetteer = pd.read_csv(out_fp, encoding = "utf-8-sig")
+    coordinates_df = geocode_all(hclinic_df.loc[:,"hclinic_name"], create_gazetteer_backend(gazetteer),
+                                 backend_name = "gazetteer")
+
+Url_With_Coordinates = list(coordinates_df.loc[:,["lat", "lon"]].itertuples(index = False, name = None))
 
 #%% --- Write URL_with_Coordinates info into the dataframe ---
 
@@ -138,18 +184,22 @@ hclinic_df.drop(labels = "lat_lon",
                 axis = 1,
                 inplace = True)
 
-#Delete some specific indexes that do not fit
+#%% --- Drop the clinics that couldn't be geocoded ---
 
-unwanted_hclinic_names = ["Dr. Yaman Hair Clinic","Prens Hair",
-                          "Marmara Hair Clinic","Life Point","Dr.Eser Aydoğdu",
-                          "MepyyHair", "Equinox Hair", "Hairworld İstanbul"]
+#Clinics that were not found or whose geocoding failed have no coordinates.
+#They are reported and left out of the raw file, which must not contain missing
+#coordinates. They are not cached either, so the next run geocodes them again.
+unresolved_mask = hclinic_df.loc[:,["lat", "lon"]].isna().any(axis = 1).values
 
-unwanted_hclinic_names_mask = hclinic_df.loc[:,"hclinic_name"].isin(unwanted_hclinic_names) == False
+if unresolved_mask.any():
+    unresolved_df = pd.DataFrame({"hclinic_name": hclinic_df.loc[unresolved_mask, "hclinic_name"].values,
+                                  "source": coordinates_df.loc[unresolved_mask, "source"].values})
+    print("{} clinics could not be geocoded and are left out:".format(len(unresolved_df)))
+    print(unresolved_df.to_string(index = False))
 
-hclinic_df = hclinic_df.loc[unwanted_hclinic_names_mask,:]
+hclinic_df = hclinic_df.loc[~unresolved_mask,:]
 
 #%% --- Export Data ---
-out_fp = Path("../../data/raw/hair_clinics_raw.csv")
 hclinic_df.to_csv(out_fp, encoding='utf-8-sig', index = False)
 
 
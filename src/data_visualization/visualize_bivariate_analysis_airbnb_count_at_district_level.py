@@ -19,17 +19,14 @@ import geopandas as gpd
 from scipy.stats import pearsonr
 import matplotlib.pyplot as plt
 import numpy as np
-
-#%% --- Set proper directory to assure integration with doit ---
-
-abspath = os.path.abspath(__file__)
-dname = os.path.dirname(abspath)
-os.chdir(dname)
+from src.helper_functions.data_io_helper_functions import final_data_dir
+from src.helper_functions.data_io_helper_functions import figures_dir
+from src.helper_functions.data_io_helper_functions import matplotlib_stylesheet_fp
 
 #%% --- Import Data ---
 
 #Import airbnb rentals data - aggregated at the district level
-import_fp = Path("../../data/final/geographic_distribution_of_airbnb_rentals.shp")
+import_fp = final_data_dir.joinpath("geographic_distribution_of_airbnb_rentals.shp")
 airbnb_rentals_agg = gpd.read_file(import_fp, encoding = "utf-8-sig")
 
 #%% --- Get pearson's r ---
@@ -45,7 +42,7 @@ for independent_variable in independent_variables:
     
 #%% --- Visualization One: Small multiples scatterplot
 
-with plt.style.context('matplotlib_stylesheet_ejg_fixes'):
+with plt.style.context(str(matplotlib_stylesheet_fp)):
     
     # --- Create figure and axes ---
     fig_1 = plt.figure(figsize = (10.80,10.80))
@@ -110,7 +107,7 @@ with plt.style.context('matplotlib_stylesheet_ejg_fixes'):
 current_filename_split = os.path.basename(__file__).split(".")[0].split("_")
 current_filename_complete = "_".join(current_filename_split)
 
-mkdir_path = Path("../../media/figures/raw/{}".format(current_filename_complete))
+mkdir_path = figures_dir.joinpath(current_filename_complete)
 os.mkdir(mkdir_path)
 
 file_extensions = [".png", ".svg"]
@@ -19,17 +19,14 @@ import geopandas as gpd
 from scipy.stats import pearsonr
 import matplotlib.pyplot as plt
 import numpy as np
-
-#%% --- Set proper directory to assure integration with doit ---
-
-abspath = os.path.abspath(__file__)
-dname = os.path.dirname(abspath)
-os.chdir(dname)
+from src.helper_functions.data_io_helper_functions import final_data_dir
+from src.helper_functions.data_io_helper_functions import figures_dir
+from src.helper_functions.data_io_helper_functions import matplotlib_stylesheet_fp
 
 #%% --- Import Data ---
 
 #Import htourism centers data - aggregated at the district level
-import_fp = Path("../../data/final/geographic_distribution_of_htourism_centers.shp")
+import_fp = final_data_dir.joinpath("geographic_distribution_of_htourism_centers.shp")
 htourism_gdf_agg = gpd.read_file(import_fp, encoding = "utf-8-sig")
 
 #%% --- Fill missing values with zero ---
@@ -51,7 +48,7 @@ for independent_variable in independent_variables:
     
 #%% --- Visualization One: Small multiples scatterplot
 
-with plt.style.context('matplotlib_stylesheet_ejg_fixes'):
+with plt.style.context(str(matplotlib_stylesheet_fp)):
     
     # --- Create figure and axes ---
     fig_1 = plt.figure(figsize = (10.80,10.80))
@@ -111,7 +108,7 @@ with plt.style.context('matplotlib_stylesheet_ejg_fixes'):
 current_filename_split = os.path.basename(__file__).split(".")[0].split("_")
 current_filename_complete = "_".join(current_filename_split)
 
-mkdir_path = Path("../../media/figures/raw/{}".format(current_filename_complete))
+mkdir_path = figures_dir.joinpath(current_filename_complete)
 os.mkdir(mkdir_path)
 
 file_extensions = [".png", ".svg"]
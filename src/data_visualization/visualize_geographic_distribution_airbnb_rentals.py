@@ -24,21 +24,19 @@ import matplotlib.cm as cm
 import matplotlib.colors as col
 import contextily as ctx #Used in conjuction with matplotlib/geopandas to set a basemap
 from src.helper_functions import data_visualization_helper_functions as viz_helpers
-
-#%% --- Set proper directory to assure integration with doit ---
-
-abspath = os.path.abspath(__file__)
-dname = os.path.dirname(abspath)
-os.chdir(dname)
+from src.helper_functions.data_io_helper_functions import processed_data_dir
+from src.helper_functions.data_io_helper_functions import final_data_dir
+from src.helper_functions.data_io_helper_functions import figures_dir
+from src.helper_functions.data_io_helper_functions import matplotlib_stylesheet_fp
 
 #%% --- Import Data ---
 
 #Import airbnb rentals data - raw
-import_fp = Path("../../data/processed/istanbul_airbnb_processed_shapefile.shp")
+import_fp = processed_data_dir.joinpath("istanbul_airbnb_processed_shapefile.shp")
 airbnb_gdf_raw = gpd.read_file(import_fp, encoding = "utf-8-sig")
 
 #Import htourism centers data - aggregated at the district level
-import_fp = Path("../../data/final/geographic_distribution_of_airbnb_rentals.shp")
+import_fp = final_data_dir.joinpath("geographic_distribution_of_airbnb_rentals.shp")
 airbnb_gdf_agg = gpd.read_file(import_fp, encoding = "utf-8-sig")
 
 #%% --- Define universal variables (color, typography etc.)
@@ -47,7 +45,7 @@ color_lblue = "#1CB2FE"
 
 #%% --- Visualization One : Choropleth Map + Distribution + Horizontal Bar Chart
 
-with plt.style.context('matplotlib_stylesheet_ejg_fixes'):
+with plt.style.context(str(matplotlib_stylesheet_fp)):
     
     # --- Create figure and axes ---
     fig_1 = plt.figure(figsize = (19.20,19.20))
@@ -192,7 +190,7 @@ with plt.style.context('matplotlib_stylesheet_ejg_fixes'):
 current_filename_split = os.path.basename(__file__).split("_")[:-1]
 current_filename_complete = "_".join(current_filename_split)
 
-mkdir_path = Path("../../media/figures/raw/{}".format(current_filename_complete))
+mkdir_path = figures_dir.joinpath(current_filename_complete)
 os.mkdir(mkdir_path)
 
 figure = fig_1
@@ -30,25 +30,23 @@ from shapely.geometry import Point
 import pandas as pd
 import geopandas as gpd
 from src.helper_functions.data_visualization_helper_functions import confirm_nearest_neighbor_analysis
-
-#%% --- Set proper directory to assure integration with doit ---
-
-abspath = os.path.abspath(__file__)
-dname = os.path.dirname(abspath)
-os.chdir(dname)
+from src.helper_functions.data_io_helper_functions import load_reference_geodataframe
+from src.helper_functions.data_io_helper_functions import external_data_dir
+from src.helper_functions.data_io_helper_functions import final_data_dir
+from src.helper_functions.data_io_helper_functions import figures_dir
 
 #%% --- Import Data ---
 
 #Istanbul districts for reference crs
-import_fp = Path("../../data/external/istanbul_districts.shp")
-istanbul_districts = gpd.read_file(import_fp)
+import_fp = external_data_dir.joinpath("istanbul_districts.shp")
+istanbul_districts = load_reference_geodataframe(import_fp)
 
 #All districts - raw
-import_fp = Path("../../data/final/nn_analysis_results_all.csv")
+import_fp = final_data_dir.joinpath("nn_analysis_results_all.csv")
 nn_analysis_results_all = pd.read_csv(import_fp, encoding = "utf-8-sig")
 
 #All districts - normalized
-import_fp = Path("../../data/final/nn_analysis_results_normalized.csv")
+import_fp = final_data_dir.joinpath("nn_analysis_results_normalized.csv")
 nn_analysis_results_normalized = pd.read_csv(import_fp, encoding = "utf-8-sig")
 
 #Selected districts - normalized
@@ -57,7 +55,7 @@ districts = ["atasehir", "besiktas", "kadikoy", "sisli", "uskudar"]
 nn_analysis_results_per_district = {}
 
 for district in districts:
-    import_fp = Path("../../data/final/nn_analysis_results_norm_{}.csv".format(district))
+    import_fp = final_data_dir.joinpath("nn_analysis_results_norm_{}.csv".format(district))
     nn_analysis_results_per_district[district] = pd.read_csv(import_fp, encoding = "utf-8-sig")
     
 
@@ -123,7 +121,7 @@ for district_gdf in nn_analysis_results_per_district_gdf.values():
 current_filename_split = os.path.basename(__file__).split(".")[0].split("_")
 current_filename_complete = "_".join(current_filename_split)
 
-mkdir_path = Path("../../media/figures/raw/{}".format(current_filename_complete))
+mkdir_path = figures_dir.joinpath(current_filename_complete)
 os.mkdir(mkdir_path)
 
 figures = [plot for plot in per_district_confirmation_plot]
@@ -2,8 +2,8 @@
 """
 ------ What is this file? ------
 
-This script targets one file:
-    - distance_price_dataset.shp
+This script targets one dataset:
+    - distance_price_dataset_partitioned (distance_price_dataset.shp, partitioned by district)
     
 The script produces scatterplots that show Pearson'r and Spearman's rho
 analysis results for multiple subsets of the distance_price datasets
@@ -17,20 +17,19 @@ Returns multiple scatterplots,both single and small-multiples
 
 import os
 from pathlib import Path # To wrap around filepaths
-import geopandas as gpd
 import matplotlib.pyplot as plt
 from scipy.stats import pearsonr,spearmanr,iqr
-
-#%% --- Set proper directory to assure integration with doit ---
-
-abspath = os.path.abspath(__file__)
-dname = os.path.dirname(abspath)
-os.chdir(dname)
+from src.helper_functions.data_io_helper_functions import read_partitioned_dataset
+from src.helper_functions.data_io_helper_functions import final_data_dir
+from src.helper_functions.data_io_helper_functions import figures_dir
+from src.helper_functions.data_io_helper_functions import matplotlib_stylesheet_fp
 
 #%% --- Import data ---
 
-import_fp = Path("../../data/final/distance_price_dataset.shp")
-distance_price = gpd.read_file(import_fp)
+#The figures need only two columns, the geometry is never read
+import_dir = final_data_dir.joinpath("distance_price_dataset_partitioned")
+columns_to_read = ["price", "distance_in_meter"]
+distance_price = read_partitioned_dataset(import_dir, columns = columns_to_read)
 
 #%% --- Create subsets of the dataset for visualization ---
 
@@ -41,9 +40,13 @@ price_iqr = iqr(distance_price["price"], axis = 0)
 q1 = distance_price["price"].quantile(0.25)
 q3 = distance_price["price"].quantile(0.75)
 
+#Price bounds for +/- 1.5 IQR
+price_min = q1 - (price_iqr * 1.5)
+price_max = q3 + (price_iqr * 1.5)
+
 #Create masks to select values only within +/- 1.5 IQR
-min_mask = distance_price["price"] >= q1 - (price_iqr * 1.5)
-max_mask = distance_price["price"] <= q3 + (price_iqr * 1.5)
+min_mask = distance_price["price"] >= price_min
+max_mask = distance_price["price"] <= price_max
 combined_mask = min_mask & max_mask
 
 #Subset the dataset with the mask above
@@ -58,21 +61,22 @@ selected_districts = ["Sisli", "Besiktas", "Kadikoy",
 #Create an empty dictionary for district name and values
 distance_price_per_district= {}
 
-#Loop over selected districts, create a mask and select for each of them
+#Loop over selected districts, read only their partitions and select within +/- 1.5 IQR
 for district in selected_districts:
-    district_mask = distance_price_normalized["district_e"] == district
-    selection = distance_price_normalized.loc[district_mask,:]
-    distance_price_per_district[district] = selection
+    district_df = read_partitioned_dataset(import_dir, partitions = [district],
+                                           columns = columns_to_read)
+    price_mask = district_df["price"].between(price_min, price_max)
+    distance_price_per_district[district] = district_df.loc[price_mask,:]
 
 #%% --- Visualizations ---
 
 #%% --- Visualization One: Scatterplot for raw distance_price ---
 
-with plt.style.context('matplotlib_stylesheet_ejg_fixes'):
+with plt.style.context(str(matplotlib_stylesheet_fp)):
     
     # --- Calculate pearson's r and spearman's rho
-    r = pearsonr(distance_price["distance_i"],distance_price["price"])[0]
-    rho = spearmanr(distance_price["distance_i"],distance_price["price"])[0]
+    r = pearsonr(distance_price["distance_in_meter"],distance_price["price"])[0]
+    rho = spearmanr(distance_price["distance_in_meter"],distance_price["price"])[0]
     
     # --- Create figure and axes ---
     fig_1 = plt.figure(figsize = (10.80,10.80))
@@ -80,7 +84,7 @@ with plt.style.context('matplotlib_stylesheet_ejg_fixes'):
     ax = fig_1.add_subplot(1,1,1)
     
     # --- Plot the data ---
-    ax.scatter(distance_price["distance_i"],
+    ax.scatter(distance_price["distance_in_meter"],
                distance_price["price"],
                s = 80,
                alpha = 0.80,
@@ -127,12 +131,12 @@ with plt.style.context('matplotlib_stylesheet_ejg_fixes'):
     
 #%% --- Visualization two: Scatterplot for distance_price_normalized ---
 
-with plt.style.context('matplotlib_stylesheet_ejg_fixes'):
+with plt.style.context(str(matplotlib_stylesheet_fp)):
     
     # --- Calculate pearson's r and spearman's rho
-    r = pearsonr(distance_price_normalized["distance_i"],
+    r = pearsonr(distance_price_normalized["distance_in_meter"],
                  distance_price_normalized["price"])[0]
-    rho = spearmanr(distance_price_normalized["distance_i"],
+    rho = spearmanr(distance_price_normalized["distance_in_meter"],
                     distance_price_normalized["price"])[0]
     
     # --- Create figure and axes ---
@@ -141,7 +145,7 @@ with plt.style.context('matplotlib_stylesheet_ejg_fixes'):
     ax = fig_2.add_subplot(1,1,1)
     
     # --- Plot the data ---
-    ax.scatter(distance_price_normalized["distance_i"],
+    ax.scatter(distance_price_normalized["distance_in_meter"],
                distance_price_normalized["price"],
                s = 80,
                alpha = 0.80,
@@ -188,7 +192,7 @@ with plt.style.context('matplotlib_stylesheet_ejg_fixes'):
     
 #%% --- Visualization Three: Small-multiples scatterplot per district ---
 
-with plt.style.context('matplotlib_stylesheet_ejg_fixes'):
+with plt.style.context(str(matplotlib_stylesheet_fp)):
     
     # --- Create figure and axes ---
     
@@ -205,14 +209,14 @@ with plt.style.context('matplotlib_stylesheet_ejg_fixes'):
     for district_name,district_gdf in distance_price_per_district.items():
         
         # --- Calculate pearson's r and spearman's rho
-        r = pearsonr(district_gdf["distance_i"],
+        r = pearsonr(district_gdf["distance_in_meter"],
                      district_gdf["price"])[0]
-        rho = spearmanr(district_gdf["distance_i"],
+        rho = spearmanr(district_gdf["distance_in_meter"],
                         district_gdf["price"])[0]
         
         # --- Add axes and plot the Data ---
         ax = fig_3.add_subplot(gs[col, row])
-        ax.scatter(district_gdf["distance_i"],
+        ax.scatter(district_gdf["distance_in_meter"],
                    district_gdf["price"],
                    s = 80,
                    alpha = 0.80,
@@ -270,7 +274,7 @@ with plt.style.context('matplotlib_stylesheet_ejg_fixes'):
 current_filename_split = os.path.basename(__file__).split(".")[0].split("_")
 current_filename_complete = "_".join(current_filename_split)
 
-mkdir_path = Path("../../media/figures/raw/{}".format(current_filename_complete))
+mkdir_path = figures_dir.joinpath(current_filename_complete)
 os.mkdir(mkdir_path)
 
 figures = [fig_1, fig_2, fig_3]
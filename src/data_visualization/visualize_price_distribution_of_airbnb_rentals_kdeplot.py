@@ -2,8 +2,8 @@
 """
 ------ What is this file? ------
 
-This script targets one file:
-    - istanbul_airbnb_processed.csv
+This script targets one dataset:
+    - istanbul_airbnb_processed_partitioned (istanbul_airbnb_processed.csv, partitioned by district)
     
 The script produces histograms for the distribution of Airbnb
 prices in the city of Istanbul. 
@@ -16,21 +16,19 @@ under different slices.
 import os
 from pathlib import Path # To wrap around filepaths
 import numpy as np
-import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 from scipy.stats import iqr, skew, kurtosis
-
-#%% --- Set proper directory to assure integration with doit ---
-
-abspath = os.path.abspath(__file__)
-dname = os.path.dirname(abspath)
-os.chdir(dname)
+from src.helper_functions.data_io_helper_functions import read_partitioned_dataset
+from src.helper_functions.data_io_helper_functions import processed_data_dir
+from src.helper_functions.data_io_helper_functions import figures_dir
+from src.helper_functions.data_io_helper_functions import matplotlib_stylesheet_fp
 
 #%% --- Import Data ---
 
-import_fp = Path("../../data/processed/istanbul_airbnb_processed.csv")
-airbnb_df = pd.read_csv(import_fp, encoding = "utf-8-sig")
+#Only the price column is read. The district comes from the partition folders.
+import_dir = processed_data_dir.joinpath("istanbul_airbnb_processed_partitioned")
+airbnb_df = read_partitioned_dataset(import_dir, columns = ["price"])
 
 #%% --- Subset Data ---
 
@@ -84,7 +82,7 @@ for subset in prices:
     
 #%% --- Visualization One: Histogram for raw and log10 transformed price data ---
 
-with plt.style.context('matplotlib_stylesheet_ejg_fixes'):
+with plt.style.context(str(matplotlib_stylesheet_fp)):
     
     # --- Create figure and axes ---
     fig_1 = plt.figure(figsize = (10.80,10.80))
@@ -181,7 +179,7 @@ with plt.style.context('matplotlib_stylesheet_ejg_fixes'):
             
 #%% --- Visualization Two: Histogram for normalized (+/- 1.5 IQR) price data ---
 
-with plt.style.context('matplotlib_stylesheet_ejg_fixes'):
+with plt.style.context(str(matplotlib_stylesheet_fp)):
     
     # --- Create figure and axes ---
     
@@ -248,7 +246,7 @@ with plt.style.context('matplotlib_stylesheet_ejg_fixes'):
 #%% --- Visualization Three: Small multiples histogram for Airbnb price data
 # faceted by district
 
-with plt.style.context('matplotlib_stylesheet_ejg_fixes'):
+with plt.style.context(str(matplotlib_stylesheet_fp)):
 
     # --- Create figure and axes ---
     i = 0
@@ -316,7 +314,7 @@ with plt.style.context('matplotlib_stylesheet_ejg_fixes'):
 #%% --- Visualization Four: Small multiples histogram for Airbnb price data
 # faceted by district
 
-with plt.style.context('matplotlib_stylesheet_ejg_fixes'):
+with plt.style.context(str(matplotlib_stylesheet_fp)):
 
     # --- Create figure and axes ---
     i = 0
@@ -383,7 +381,7 @@ with plt.style.context('matplotlib_stylesheet_ejg_fixes'):
 #%%--- Visualization Five: Nested small multiples histogram for 
 # "selected" and normalized districts. ---
 
-with plt.style.context('matplotlib_stylesheet_ejg_fixes'):
+with plt.style.context(str(matplotlib_stylesheet_fp)):
     
     # --- Create figure and axes ---
     
@@ -507,7 +505,7 @@ with plt.style.context('matplotlib_stylesheet_ejg_fixes'):
 current_filename_split = os.path.basename(__file__).split(".")[0].split("_")
 current_filename_complete = "_".join(current_filename_split)
 
-mkdir_path = Path("../../media/figures/raw/{}".format(current_filename_complete))
+mkdir_path = figures_dir.joinpath(current_filename_complete)
 os.mkdir(mkdir_path)
 
 figures = [fig_1, fig_2, fig_3, fig_4, fig_5, fig_5]
@@ -13,7 +13,6 @@ import pandas as pd
 import geopandas as gpd
 from shapely.geometry import Point, MultiPoint, LineString
 from shapely.ops import nearest_points
-from geopy import distance
  
 #%% --- FUNCTION : nearest_neighbor_analysis ---
 
@@ -397,6 +396,9 @@ def calculate_distance(nearest_points_gdf):
     valerror_text = "The geodataframe provided does not contain columns point_of_origin and nearest_point"
     if not ("point_of_origin" in nearest_points_gdf.columns and "nearest_point" in nearest_points_gdf.columns):
         raise ValueError(valerror_text)
+    
+    #Imported here so that importing this module doesn't load geopy and its geocoders
+    from geopy import distance
         
     distances = [distance.distance(p1.coords,p2.coords).m for p1,p2 in nearest_points_gdf.loc[:,["point_of_origin","nearest_point"]].values]
     
@@ -0,0 +1,943 @@
+# -*- coding: utf-8 -*-
+"""
+------ What is this file? ------
+
+This script contains some helper functions that are used to read and write
+the datasets of the pipeline in a fast and repeatable way.
+The unit tests for these functions can be found at:
+     tests/unit_tests/helper_functions/test_data_io_helper_functions.py
+
+"""
+#%% --- Import Required Packages ---
+
+import os
+import json
+import shutil
+import hashlib
+import threading
+from pathlib import Path # To wrap around filepaths
+from urllib.parse import quote, unquote
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import pyarrow as pa
+import pyarrow.csv as pcsv
+import pyarrow.parquet as pq
+from shapely import wkb
+
+#%% --- DEFINITIONS ---
+
+#Every path of the project is built from the project root, so scripts don't
+#depend on the working directory and can be imported and run side by side.
+project_root = Path(__file__).resolve().parents[2]
+data_dir = project_root.joinpath("data")
+raw_data_dir = data_dir.joinpath("raw")
+external_data_dir = data_dir.joinpath("external")
+processed_data_dir = data_dir.joinpath("processed")
+final_data_dir = data_dir.joinpath("final")
+figures_dir = project_root.joinpath("media", "figures", "raw")
+matplotlib_stylesheet_fp = project_root.joinpath("src", "data_visualization", "matplotlib_stylesheet_ejg_fixes")
+
+#The reference cache lives under data/cache, next to the datasets it mirrors.
+reference_cache_dir = data_dir.joinpath("cache", "reference")
+
+#A shapefile is spread over several files. A change in any of them is a change in the dataset.
+shapefile_sidecar_extensions = [".shp", ".shx", ".dbf", ".prj", ".cpg"]
+
+#The columns of an InsideAirbnb listings file that the pipeline uses, with compact dtypes.
+#The order of the columns is the order in which read_airbnb_listings returns them.
+airbnb_listings_schema = {"id": "int64",
+                          "name": "object",
+                          "host_id": "int64",
+                          "host_name": "object",
+                          "neighbourhood": "category",
+                          "latitude": "float32",
+                          "longitude": "float32",
+                          "room_type": "category",
+                          "price": "int32"}
+
+#pyarrow equivalents of the dtypes above
+airbnb_listings_arrow_types = {"int64": pa.int64(),
+                               "int32": pa.int32(),
+                               "float32": pa.float32(),
+                               "float64": pa.float64(),
+                               "object": pa.string(),
+                               "category": pa.dictionary(pa.int32(), pa.string())}
+
+#%% --- FUNCTION: calculate_file_hash ---
+
+def calculate_file_hash(filepath, chunk_size = 1024 * 1024):
+    """
+    Calculates a sha256 hash of the contents of the file at filepath.
+    If filepath points to a shapefile, the sidecar files (.shx, .dbf, .prj, .cpg)
+    are also hashed.
+
+    Parameters
+    ----------
+    filepath : pathlib.Path or str
+        Path to the file that will be hashed.
+
+    chunk_size : int, optional
+        The number of bytes that are read at once. The default is 1 MB.
+
+    Returns
+    -------
+    str
+        The hexdigest of the sha256 hash.
+
+    """
+    valerror_text = "filepath must be type pathlib.Path or str, got {}".format(type(filepath))
+    if not isinstance(filepath, (Path, str)):
+        raise ValueError(valerror_text)
+
+    filepath = Path(filepath)
+
+    filenotfound_text = "No file found at {}".format(filepath)
+    if not filepath.is_file():
+        raise FileNotFoundError(filenotfound_text)
+
+    if filepath.suffix.lower() == ".shp":
+        filepaths = [filepath.with_suffix(extension) for extension in shapefile_sidecar_extensions]
+        filepaths = [fp for fp in filepaths if fp.is_file()]
+    else:
+        filepaths = [filepath]
+
+    file_hash = hashlib.sha256()
+    for fp in filepaths:
+        #Hash the name of each part too, so that a missing sidecar changes the hash
+        file_hash.update(fp.suffix.encode("utf-8"))
+        with open(fp, "rb") as file:
+            for chunk in iter(lambda: file.read(chunk_size), b""):
+                file_hash.update(chunk)
+
+    return file_hash.hexdigest()
+
+#%% --- FUNCTION: load_reference_geodataframe ---
+
+#%%     --- Helper Functions ---
+
+def get_cache_fp(import_fp, cache_dir, extension, read_kwargs):
+    """
+    Composes the path of the cached copy of the file at import_fp.
+    The name of the cached copy encodes the keyword arguments that were used
+    to read the source file and the hash of the source file:
+        <source name>.<read_kwargs key>.<source hash><extension>
+
+    Parameters
+    ----------
+    import_fp : pathlib.Path
+        Path to the source file.
+    cache_dir : pathlib.Path
+        Folder that contains the cached copies.
+    extension : str
+        File extension of the cached copy, such as ".arrow" or ".parquet"
+    read_kwargs : dict
+        Keyword arguments that are passed to the reader of the source file.
+
+    Returns
+    -------
+    pathlib.Path
+        Path to the cached copy.
+
+    """
+    source_hash = calculate_file_hash(import_fp)[:16]
+
+    kwargs_str = json.dumps(read_kwargs, sort_keys = True, default = str)
+    kwargs_key = hashlib.sha256(kwargs_str.encode("utf-8")).hexdigest()[:8]
+
+    cache_filename = "{}.{}.{}{}".format(Path(import_fp).stem, kwargs_key, source_hash, extension)
+    return Path(cache_dir).joinpath(cache_filename)
+
+def remove_stale_cache_files(cache_fp):
+    """
+    Removes the cached copies that were read from the same source file with the
+    same keyword arguments as cache_fp, but from an older version of the source file.
+
+    Parameters
+    ----------
+    cache_fp : pathlib.Path
+        Path to the up-to-date cached copy.
+
+    Returns
+    -------
+    None.
+
+    """
+    source_stem, kwargs_key = cache_fp.name.split(".")[:2]
+    for stale_fp in cache_fp.parent.glob("{}.{}.*{}".format(source_stem, kwargs_key, cache_fp.suffix)):
+        if stale_fp != cache_fp:
+            #A task running in parallel may have removed it already
+            try:
+                stale_fp.unlink()
+            except FileNotFoundError:
+                pass
+
+def get_temporary_fp(export_fp):
+    """
+    Returns a path next to export_fp to write to before moving the output into place.
+    The path is unique to the process and the thread, so tasks that run in
+    parallel never write to the same temporary path.
+
+    Parameters
+    ----------
+    export_fp : pathlib.Path
+
+    Returns
+    -------
+    pathlib.Path
+
+    """
+    return export_fp.with_name(export_fp.name + ".{}-{}.tmp".format(os.getpid(), threading.get_ident()))
+
+def write_table_atomically(table, export_fp, writer):
+    """
+    Writes a pyarrow.Table to a temporary file with the given writer and then
+    moves it into place. A reader never sees a half-written cache file.
+
+    Parameters
+    ----------
+    table : pyarrow.Table
+    export_fp : pathlib.Path
+    writer : A function that accepts a pyarrow.Table and a path.
+
+    Returns
+    -------
+    None.
+
+    """
+    export_fp.parent.mkdir(parents = True, exist_ok = True)
+    temporary_fp = get_temporary_fp(export_fp)
+    writer(table, str(temporary_fp))
+    os.replace(temporary_fp, export_fp)
+
+def write_arrow_ipc(table, export_fp):
+    with pa.OSFile(export_fp, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+#%%     --- Subfunctions ---
+
+def geodataframe_to_table(geodataframe):
+    """
+    Converts a geopandas.GeoDataFrame to a pyarrow.Table.
+    The geometry is stored as WKB, the geometry column name and the crs are stored
+    in the schema metadata.
+
+    Parameters
+    ----------
+    geodataframe : geopandas.GeoDataFrame
+
+    Returns
+    -------
+    pyarrow.Table
+
+    """
+    valerror_text = "geodataframe must be type geopandas.GeoDataFrame, got {}".format(type(geodataframe))
+    if not isinstance(geodataframe, gpd.GeoDataFrame):
+        raise ValueError(valerror_text)
+
+    geometry_column = geodataframe.geometry.name
+
+    dataframe = pd.DataFrame(geodataframe.drop(columns = geometry_column))
+    dataframe[geometry_column] = [geom.wkb if geom is not None else None for geom in geodataframe.geometry]
+
+    table = pa.Table.from_pandas(dataframe, preserve_index = False)
+
+    crs = geodataframe.crs.to_wkt() if geodataframe.crs is not None else ""
+    metadata = dict(table.schema.metadata or {})
+    metadata.update({b"geometry_column": geometry_column.encode("utf-8"),
+                     b"crs": crs.encode("utf-8")})
+    return table.replace_schema_metadata(metadata)
+
+def table_to_geodataframe(table):
+    """
+    Converts a pyarrow.Table created by geodataframe_to_table back to a
+    geopandas.GeoDataFrame. Tables without geometry metadata, or whose geometry
+    column was not read, are returned as a pandas.DataFrame.
+
+    Parameters
+    ----------
+    table : pyarrow.Table
+
+    Returns
+    -------
+    geopandas.GeoDataFrame or pandas.DataFrame
+
+    """
+    metadata = table.schema.metadata or {}
+    geometry_column = metadata.get(b"geometry_column", b"").decode("utf-8")
+
+    dataframe = table.to_pandas()
+    if geometry_column not in dataframe.columns:
+        return dataframe
+
+    crs = metadata[b"crs"].decode("utf-8") or None
+    geometry = [wkb.loads(bytes(value)) if value is not None else None for value in dataframe[geometry_column]]
+    dataframe[geometry_column] = geometry
+
+    return gpd.GeoDataFrame(dataframe,
+                            geometry = geometry_column,
+                            crs = crs)
+
+def write_geodataframe_to_arrow(geodataframe, export_fp):
+    """
+    Writes a geopandas.GeoDataFrame to an uncompressed Arrow IPC file.
+    The geometry is stored as WKB, the crs is stored in the schema metadata.
+
+    Parameters
+    ----------
+    geodataframe : geopandas.GeoDataFrame
+    export_fp : pathlib.Path
+
+    Returns
+    -------
+    None.
+
+    """
+    table = geodataframe_to_table(geodataframe)
+    write_table_atomically(table, Path(export_fp), write_arrow_ipc)
+
+def read_geodataframe_from_arrow(import_fp):
+    """
+    Reads a geopandas.GeoDataFrame that was written by write_geodataframe_to_arrow.
+    The file is memory mapped, so no parsing takes place.
+
+    Parameters
+    ----------
+    import_fp : pathlib.Path
+
+    Returns
+    -------
+    geopandas.GeoDataFrame
+
+    """
+    with pa.memory_map(str(import_fp), "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+
+    return table_to_geodataframe(table)
+
+#%%     --- Main Function ---
+
+def load_reference_geodataframe(import_fp, cache_dir = None, **read_kwargs):
+    """
+    Loads a reference geospatial dataset such as istanbul_districts.shp.
+
+    The first call parses the source file with geopandas.read_file and
+    stores the result under cache_dir as an Arrow IPC file. The following calls
+    memory map the cached copy instead. The cached copy is invalidated when the
+    hash of the source file changes.
+
+    Parameters
+    ----------
+    import_fp : pathlib.Path or str
+        Path to the source file.
+
+    cache_dir : pathlib.Path or str, optional
+        Folder that contains the cached copies. The default is data/cache/reference.
+
+    **read_kwargs :
+        Keyword arguments that are passed to geopandas.read_file
+
+    Returns
+    -------
+    geopandas.GeoDataFrame
+
+    """
+    valerror_text = "import_fp must be type pathlib.Path or str, got {}".format(type(import_fp))
+    if not isinstance(import_fp, (Path, str)):
+        raise ValueError(valerror_text)
+
+    import_fp = Path(import_fp)
+    cache_dir = Path(cache_dir) if cache_dir is not None else reference_cache_dir
+
+    cache_fp = get_cache_fp(import_fp, cache_dir, ".arrow", read_kwargs)
+
+    if cache_fp.is_file():
+        return read_geodataframe_from_arrow(cache_fp)
+
+    geodataframe = gpd.read_file(import_fp, **read_kwargs)
+    write_geodataframe_to_arrow(geodataframe, cache_fp)
+    remove_stale_cache_files(cache_fp)
+
+    return geodataframe
+
+#%% --- FUNCTION: load_reference_dataframe ---
+
+def load_reference_dataframe(import_fp, cache_dir = None, **read_kwargs):
+    """
+    Loads a reference tabular dataset such as district_income.xlsx.
+
+    The first call parses the source file with pandas.read_excel (or pandas.read_csv
+    for .csv files) and stores the result under cache_dir as a Parquet file.
+    The following calls read the cached copy instead. The cached copy is invalidated
+    when the hash of the source file changes.
+
+    Parameters
+    ----------
+    import_fp : pathlib.Path or str
+        Path to the source file.
+
+    cache_dir : pathlib.Path or str, optional
+        Folder that contains the cached copies. The default is data/cache/reference.
+
+    **read_kwargs :
+        Keyword arguments that are passed to the reader of the source file.
+
+    Returns
+    -------
+    pandas.DataFrame
+
+    """
+    valerror_text = "import_fp must be type pathlib.Path or str, got {}".format(type(import_fp))
+    if not isinstance(import_fp, (Path, str)):
+        raise ValueError(valerror_text)
+
+    import_fp = Path(import_fp)
+
+    accepted_extensions = [".xlsx", ".xls", ".csv"]
+    valerror_text = "import_fp must point to one of {} files. Got {}".format(", ".join(accepted_extensions), import_fp.suffix)
+    if import_fp.suffix.lower() not in accepted_extensions:
+        raise ValueError(valerror_text)
+
+    cache_dir = Path(cache_dir) if cache_dir is not None else reference_cache_dir
+
+    cache_fp = get_cache_fp(import_fp, cache_dir, ".parquet", read_kwargs)
+
+    if cache_fp.is_file():
+        return pq.read_table(cache_fp, memory_map = True).to_pandas()
+
+    if import_fp.suffix.lower() == ".csv":
+        dataframe = pd.read_csv(import_fp, **read_kwargs)
+    else:
+        dataframe = pd.read_excel(import_fp, **read_kwargs)
+
+    table = pa.Table.from_pandas(dataframe, preserve_index = False)
+    write_table_atomically(table, cache_fp, pq.write_table)
+    remove_stale_cache_files(cache_fp)
+
+    return dataframe
+
+#%% --- FUNCTION: read_airbnb_listings ---
+
+#%%     --- Helper Functions ---
+
+def get_airbnb_listings_source_columns(import_fp, encoding = "utf-8-sig"):
+    """
+    Maps the columns of airbnb_listings_schema to the columns of the file at import_fp.
+
+    InsideAirbnb publishes two formats. The summary format (listings.csv) has a
+    "neighbourhood" column that holds the district and a plain integer "price" column.
+    The full format (listings.csv.gz) has ~100 columns, keeps the district in
+    "neighbourhood_cleansed" and formats "price" as "$1,234.00".
+
+    Parameters
+    ----------
+    import_fp : pathlib.Path
+    encoding : str, optional
+        The default is "utf-8-sig".
+
+    Returns
+    -------
+    tuple
+        A dict of {schema column: source column} and a bool that is True if the
+        file is in the full format.
+
+    """
+    #pandas infers the compression of listings.csv.gz from its extension
+    header = pd.read_csv(import_fp, nrows = 0, encoding = encoding).columns
+
+    source_columns = {column: column for column in airbnb_listings_schema}
+
+    is_full_format = "neighbourhood_cleansed" in header
+    if is_full_format:
+        source_columns["neighbourhood"] = "neighbourhood_cleansed"
+
+    missing_columns = [column for column in source_columns.values() if column not in header]
+    valerror_text = "File at {} is missing the following listing columns: {}".format(import_fp, missing_columns)
+    if len(missing_columns) > 0:
+        raise ValueError(valerror_text)
+
+    return source_columns, is_full_format
+
+def parse_price_column(price_series):
+    """
+    Converts a price column, plain or full format such as "$1,234.00", into float64.
+
+    Parameters
+    ----------
+    price_series : pandas.Series
+
+    Returns
+    -------
+    pandas.Series
+        Missing prices are NaN.
+
+    """
+    if pd.api.types.is_numeric_dtype(price_series):
+        return price_series.astype("float64")
+
+    price_series = price_series.str.replace(r"[$,]", "", regex = True)
+    return pd.to_numeric(price_series).astype("float64")
+
+def get_airbnb_listings_source_dtypes(import_fp, encoding = "utf-8-sig"):
+    """
+    Builds the {source column: dtype} mapping that the parsers of read_airbnb_listings
+    and iter_airbnb_listings use for the file at import_fp.
+
+    Parameters
+    ----------
+    import_fp : pathlib.Path
+    encoding : str, optional
+        The default is "utf-8-sig".
+
+    Returns
+    -------
+    tuple
+        A dict of {source column: dtype}, in the order of airbnb_listings_schema,
+        and a bool that is True if the file is in the full format.
+
+    """
+    source_columns, is_full_format = get_airbnb_listings_source_columns(import_fp, encoding = encoding)
+
+    source_dtypes = {source_columns[column]: dtype for column, dtype in airbnb_listings_schema.items()}
+    #A price can be missing, which int32 can't hold, and a full format price is
+    #a string. Both are parsed after reading, see normalize_airbnb_listings
+    source_dtypes[source_columns["price"]] = "object" if is_full_format else "float64"
+
+    return source_dtypes, is_full_format
+
+def normalize_airbnb_listings(listings, source_dtypes, is_full_format):
+    """
+    Orders and renames the parsed source columns to match airbnb_listings_schema.
+    Listings without a finite price are dropped, the others keep their index.
+
+    Parameters
+    ----------
+    listings : pandas.DataFrame
+    source_dtypes : dict
+    is_full_format : bool
+
+    Returns
+    -------
+    pandas.DataFrame
+
+    """
+    listings = listings.reindex(columns = list(source_dtypes.keys()))
+    listings.columns = list(airbnb_listings_schema.keys())
+
+    price_series = parse_price_column(listings.loc[:, "price"])
+    listings = listings.loc[np.isfinite(price_series)].copy()
+    listings["price"] = price_series.loc[listings.index].astype("int32")
+
+    return listings
+
+#%%     --- Main Function ---
+
+def read_airbnb_listings(import_fp, engine = "c", encoding = "utf-8-sig"):
+    """
+    Reads an InsideAirbnb listings file.
+
+    Only the columns in airbnb_listings_schema are read and each of them is parsed
+    straight into its compact dtype: int64 ids, float32 coordinates, int32 price,
+    categorical district and room type. The unused columns are never materialized.
+
+    Parameters
+    ----------
+    import_fp : pathlib.Path or str
+        Path to a summary (listings.csv) or full format (listings.csv.gz) listings file.
+
+    engine : One of the following strings "c", "pyarrow"
+        The default is "c", the pandas parser. "pyarrow" uses the multithreaded
+        pyarrow.csv parser, which is several times faster on large files.
+
+    encoding : str, optional
+        The default is "utf-8-sig".
+
+    Returns
+    -------
+    pandas.DataFrame
+        A dataframe with the columns of airbnb_listings_schema, in the same order.
+        The district column is always called "neighbourhood". Listings without
+        a finite price are dropped.
+
+    """
+    valerror_text = "import_fp must be type pathlib.Path or str, got {}".format(type(import_fp))
+    if not isinstance(import_fp, (Path, str)):
+        raise ValueError(valerror_text)
+
+    accepted_engines = ["c", "pyarrow"]
+    valerror_text = "Parameter engine must be one of c or pyarrow. Got \"{}\" as type {}.".format(str(engine), type(engine))
+    if str(engine) not in accepted_engines:
+        raise ValueError(valerror_text)
+
+    import_fp = Path(import_fp)
+    source_dtypes, is_full_format = get_airbnb_listings_source_dtypes(import_fp, encoding = encoding)
+
+    if engine == "pyarrow":
+        read_options = pcsv.ReadOptions(encoding = encoding.replace("-sig", ""))
+        convert_options = pcsv.ConvertOptions(include_columns = list(source_dtypes.keys()),
+                                              column_types = {column: airbnb_listings_arrow_types[dtype]
+                                                              for column, dtype in source_dtypes.items()},
+                                              strings_can_be_null = True)
+        listings = pcsv.read_csv(import_fp,
+                                 read_options = read_options,
+                                 convert_options = convert_options).to_pandas()
+    else:
+        listings = pd.read_csv(import_fp,
+                               encoding = encoding,
+                               usecols = list(source_dtypes.keys()),
+                               dtype = source_dtypes)
+
+    listings = normalize_airbnb_listings(listings, source_dtypes, is_full_format)
+
+    return listings
+
+#%% --- FUNCTION: iter_airbnb_listings ---
+
+def iter_airbnb_listings(import_fp, chunksize = 10000, encoding = "utf-8-sig"):
+    """
+    Reads an InsideAirbnb listings file in chunks of chunksize rows.
+
+    Every chunk has the same columns and dtypes as the output of read_airbnb_listings,
+    so memory use depends on chunksize rather than on the size of the file.
+    The categories of the categorical columns can differ between chunks.
+
+    Parameters
+    ----------
+    import_fp : pathlib.Path or str
+        Path to a summary (listings.csv) or full format (listings.csv.gz) listings file.
+
+    chunksize : int, optional
+        Number of rows per chunk. The default is 10000.
+
+    encoding : str, optional
+        The default is "utf-8-sig".
+
+    Yields
+    ------
+    pandas.DataFrame
+
+    """
+    valerror_text = "import_fp must be type pathlib.Path or str, got {}".format(type(import_fp))
+    if not isinstance(import_fp, (Path, str)):
+        raise ValueError(valerror_text)
+
+    valerror_text = "chunksize must be a positive int, got {}".format(chunksize)
+    if not isinstance(chunksize, int) or isinstance(chunksize, bool) or chunksize < 1:
+        raise ValueError(valerror_text)
+
+    import_fp = Path(import_fp)
+    source_dtypes, is_full_format = get_airbnb_listings_source_dtypes(import_fp, encoding = encoding)
+
+    reader = pd.read_csv(import_fp,
+                         encoding = encoding,
+                         usecols = list(source_dtypes.keys()),
+                         dtype = source_dtypes,
+                         chunksize = chunksize)
+
+    for chunk in reader:
+        yield normalize_airbnb_listings(chunk, source_dtypes, is_full_format)
+
+#%% --- FUNCTION: write_shapefile ---
+
+def write_shapefile(geodataframe, export_fp, **write_kwargs):
+    """
+    Writes a GeoDataFrame as a shapefile. Shapefiles can't store categorical
+    columns, such as the district columns, so they are written as text.
+
+    Parameters
+    ----------
+    geodataframe : geopandas.GeoDataFrame
+    export_fp : pathlib.Path or str
+    **write_kwargs
+        Keyword arguments that are passed to geopandas.GeoDataFrame.to_file,
+        e.g. encoding = "utf-8-sig"
+
+    Returns
+    -------
+    None.
+
+    """
+    valerror_text = "geodataframe must be type gpd.GeoDataFrame, got {}".format(type(geodataframe))
+    if not isinstance(geodataframe, gpd.GeoDataFrame):
+        raise ValueError(valerror_text)
+
+    category_columns = geodataframe.select_dtypes(include = ["category"]).columns
+    geodataframe = geodataframe.astype({column: object for column in category_columns})
+    geodataframe.to_file(export_fp, **write_kwargs)
+
+#%% --- FUNCTION: write_partitioned_dataset ---
+
+def write_partitioned_dataset(dataframe, export_dir, partition_column):
+    """
+    Writes a dataframe as a hive-style partitioned Parquet dataset, one folder per
+    value of partition_column:
+        <export_dir>/<partition_column>=<value>/part-0.parquet
+
+    The partition column itself is encoded in the folder names and is not stored
+    in the Parquet files. GeoDataFrames keep their geometry and crs, see
+    geodataframe_to_table. The dataset is written to a temporary folder that
+    replaces export_dir once every partition is written.
+
+    Parameters
+    ----------
+    dataframe : pandas.DataFrame or geopandas.GeoDataFrame
+
+    export_dir : pathlib.Path or str
+        Folder of the dataset.
+
+    partition_column : str
+        Column to partition by, such as "district_eng". Must not contain null values.
+
+    Returns
+    -------
+    list
+        The partition values, sorted.
+
+    """
+    valerror_text = "dataframe must be type pd.DataFrame, got {}".format(type(dataframe))
+    if not isinstance(dataframe, pd.DataFrame):
+        raise ValueError(valerror_text)
+
+    valerror_text = "partition_column must be a column of dataframe, got {}".format(partition_column)
+    if partition_column not in dataframe.columns:
+        raise ValueError(valerror_text)
+
+    valerror_text = "partition_column {} must not contain null values".format(partition_column)
+    if dataframe.loc[:, partition_column].isnull().any():
+        raise ValueError(valerror_text)
+
+    export_dir = Path(export_dir)
+    temporary_dir = get_temporary_fp(export_dir)
+    if temporary_dir.exists():
+        shutil.rmtree(temporary_dir)
+    temporary_dir.mkdir(parents = True)
+
+    partition_values = dataframe.loc[:, partition_column].astype(str)
+    partitions = dataframe.drop(columns = partition_column).groupby(partition_values.values, sort = True)
+
+    for partition_value, partition in partitions:
+        if isinstance(partition, gpd.GeoDataFrame):
+            table = geodataframe_to_table(partition)
+        else:
+            table = pa.Table.from_pandas(partition, preserve_index = False)
+
+        partition_dir = temporary_dir.joinpath("{}={}".format(partition_column, quote(partition_value, safe = "")))
+        partition_dir.mkdir()
+        pq.write_table(table, str(partition_dir.joinpath("part-0.parquet")))
+
+    #Keep the schema and the partition column of the dataset, so that an empty
+    #selection still has its columns
+    if isinstance(dataframe, gpd.GeoDataFrame):
+        schema = geodataframe_to_table(dataframe.drop(columns = partition_column).iloc[:0]).schema
+    else:
+        schema = pa.Table.from_pandas(dataframe.drop(columns = partition_column).iloc[:0], preserve_index = False).schema
+    metadata = dict(schema.metadata or {})
+    metadata[b"partition_column"] = partition_column.encode("utf-8")
+    pq.write_metadata(schema.with_metadata(metadata), str(temporary_dir.joinpath("_common_metadata")))
+
+    if export_dir.exists():
+        shutil.rmtree(export_dir)
+    os.replace(temporary_dir, export_dir)
+
+    return sorted(partition_values.unique().tolist())
+
+#%% --- FUNCTION: read_partitioned_dataset ---
+
+#%%     --- Helper Functions ---
+
+def list_partitions(import_dir):
+    """
+    Lists the partitions of a dataset written by write_partitioned_dataset.
+
+    Parameters
+    ----------
+    import_dir : pathlib.Path or str
+
+    Returns
+    -------
+    dict
+        {partition value: partition folder}, sorted by partition value.
+
+    """
+    valerror_text = "import_dir must be type pathlib.Path or str, got {}".format(type(import_dir))
+    if not isinstance(import_dir, (Path, str)):
+        raise ValueError(valerror_text)
+
+    partitions = {}
+    for partition_dir in sorted(Path(import_dir).glob("*=*")):
+        partition_value = unquote(partition_dir.name.split("=", 1)[1])
+        partitions[partition_value] = partition_dir
+
+    return partitions
+
+#%%     --- Main Function ---
+
+def read_partitioned_dataset(import_dir, partitions = None, columns = None):
+    """
+    Reads a dataset written by write_partitioned_dataset. Only the folders of the
+    requested partitions are opened, so reading one district costs as much as the
+    district, not the city.
+
+    Parameters
+    ----------
+    import_dir : pathlib.Path or str
+        Folder of the dataset.
+
+    partitions : list, optional
+        Partition values to read, such as ["Sisli", "Besiktas"]. Values without a
+        partition are skipped. The default is None, which reads every partition.
+
+    columns : list, optional
+        Columns to read, in addition to the partition column. The default is None,
+        which reads every column.
+
+    Returns
+    -------
+    geopandas.GeoDataFrame or pandas.DataFrame
+        A GeoDataFrame if the dataset was written from a GeoDataFrame and its
+        geometry column was read. The partition column is the last column.
+
+    """
+    available_partitions = list_partitions(import_dir)
+
+    valerror_text = "import_dir {} does not contain a partitioned dataset".format(import_dir)
+    if not Path(import_dir).joinpath("_common_metadata").is_file():
+        raise ValueError(valerror_text)
+
+    if partitions is None:
+        partitions = list(available_partitions.keys())
+
+    valerror_text = "partitions must be type list, got {}".format(type(partitions))
+    if not isinstance(partitions, list):
+        raise ValueError(valerror_text)
+
+    schema = pq.read_schema(str(Path(import_dir).joinpath("_common_metadata")))
+    partition_column = schema.metadata[b"partition_column"].decode("utf-8")
+
+    tables = []
+    for partition_value in partitions:
+        if str(partition_value) not in available_partitions:
+            continue
+        partition_fp = available_partitions[str(partition_value)].joinpath("part-0.parquet")
+        table = pq.read_table(str(partition_fp), columns = columns)
+        partition_array = pa.array([str(partition_value)] * table.num_rows, type = pa.string())
+        tables.append(table.append_column(partition_column, partition_array))
+
+    if len(tables) > 0:
+        table = pa.concat_tables(tables)
+    else:
+        table = schema.empty_table()
+        if columns is not None:
+            table = table.select(columns)
+        table = table.append_column(partition_column, pa.array([], type = pa.string()))
+
+    table = table.replace_schema_metadata(schema.metadata)
+    return table_to_geodataframe(table)
+
+#%% --- FUNCTION: sort_by_hilbert_key ---
+
+#%%     --- Helper Functions ---
+
+def calculate_hilbert_key(x, y, bounds, order = 16):
+    """
+    Calculates the position of each (x, y) pair on a Hilbert curve that fills
+    the box given by bounds. Points that are close to each other in space get
+    keys that are close to each other.
+
+    The box is divided into a 2**order by 2**order grid. Points outside of the box
+    are clipped to its edges.
+
+    Parameters
+    ----------
+    x : array-like
+    y : array-like
+    bounds : tuple
+        (minx, miny, maxx, maxy), as returned by GeoDataFrame.total_bounds
+
+    order : int, optional
+        Number of bits per axis, between 1 and 31. The default is 16.
+
+    Returns
+    -------
+    numpy.ndarray
+        int64 keys between 0 and 4**order - 1.
+
+    """
+    valerror_text = "order must be an int between 1 and 31, got {}".format(order)
+    if not isinstance(order, int) or isinstance(order, bool) or not 1 <= order <= 31:
+        raise ValueError(valerror_text)
+
+    minx, miny, maxx, maxy = bounds
+    side = 2 ** order
+
+    #Scale the coordinates to integer grid cells
+    x = np.asarray(x, dtype = "float64")
+    y = np.asarray(y, dtype = "float64")
+    x_cells = np.clip((x - minx) / max(maxx - minx, 1e-12) * side, 0, side - 1).astype("int64")
+    y_cells = np.clip((y - miny) / max(maxy - miny, 1e-12) * side, 0, side - 1).astype("int64")
+
+    #Walk the quadrants from the largest to the smallest, rotating as the curve does
+    keys = np.zeros(len(x_cells), dtype = "int64")
+    s = side // 2
+    while s > 0:
+        rx = (x_cells & s) > 0
+        ry = (y_cells & s) > 0
+        keys += s * s * ((3 * rx.astype("int64")) ^ ry.astype("int64"))
+
+        flip = rx & ~ry
+        x_cells = np.where(flip, side - 1 - x_cells, x_cells)
+        y_cells = np.where(flip, side - 1 - y_cells, y_cells)
+
+        swap = ~ry
+        x_cells, y_cells = np.where(swap, y_cells, x_cells), np.where(swap, x_cells, y_cells)
+        s //= 2
+
+    return keys
+
+#%%     --- Main Function ---
+
+def sort_by_hilbert_key(geodataframe, bounds = None, key_column = "hilbert", order = 16):
+    """
+    Sorts a point geopandas.GeoDataFrame along a Hilbert curve and stores the
+    curve key in key_column. Rows that are close to each other in space end up
+    next to each other in the dataframe and in the files that it is written to.
+
+    Parameters
+    ----------
+    geodataframe : geopandas.GeoDataFrame
+        A GeoDataFrame of points. Other geometries are keyed by their centroid.
+
+    bounds : tuple, optional
+        (minx, miny, maxx, maxy) of the box that the curve fills. Layers that share
+        the same bounds get comparable keys. The default is None, which uses the
+        total_bounds of geodataframe.
+
+    key_column : str, optional
+        The default is "hilbert". Kept under 10 characters for shapefiles.
+
+    order : int, optional
+        The default is 16.
+
+    Returns
+    -------
+    geopandas.GeoDataFrame
+        A sorted copy of geodataframe with a new index.
+
+    """
+    valerror_text = "geodataframe must be type geopandas.GeoDataFrame, got {}".format(type(geodataframe))
+    if not isinstance(geodataframe, gpd.GeoDataFrame):
+        raise ValueError(valerror_text)
+
+    if bounds is None:
+        bounds = geodataframe.total_bounds
+
+    geometry = geodataframe.geometry
+    if not (geometry.geom_type == "Point").all():
+        geometry = geometry.centroid
+
+    keys = calculate_hilbert_key(geometry.x.values, geometry.y.values, bounds, order = order)
+
+    geodataframe = geodataframe.assign(**{key_column: keys})
+    return geodataframe.sort_values(by = key_column, kind = "mergesort").reset_index(drop = True)
+
@@ -9,15 +9,69 @@ The unit tests for these functions can be found at:
 """
 #%% --- Import Required Packages ---
 
+import os
+import re #RegEx
+import sys
+from pathlib import Path # To wrap around filepaths
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+import pyarrow.parquet as pq
+from src.helper_functions.data_io_helper_functions import iter_airbnb_listings
+from src.helper_functions.data_io_helper_functions import get_temporary_fp
+from src.helper_functions.geocoding_helper_functions import normalize_text
+from src.helper_functions.district_helper_functions import read_district_registry
+from src.helper_functions.district_helper_functions import get_district_dtype
+from src.helper_functions.district_helper_functions import to_district_categorical
 
-#%% --- Set proper directory to assure integration with doit ---
+#%% --- DEFINITIONS ---
 
-# abspath = os.path.abspath(__file__)
-# dname = os.path.dirname(abspath)
-# os.chdir(dname)
+#Column names of the processed airbnb dataset, in the order of airbnb_listings_schema
+airbnb_columns_in_english = ["listing_id", "name", "host_id", "host_name", "district_eng",
+                             "latitude", "longitude", "room_type", "price"]
+
+#Patterns of the words that mark each category of institution, matched
+#case-insensitively against whole words of the institution names by classify_names.
+#The names in istanbul_healthservices_raw.csv spell "ı" as "i", e.g. "Ağiz ve Diş".
+#"Diş" only matches with its derivatives, e.g. "Dişçi" and "Dişler", and not
+#other words that start with it, e.g. "Dispanseri".
+institution_vocabulary = {"aesthetic": [r"est\w+", r"plast\w+", r"ast\w+", r"aest\w+"],
+                          "hair_transplant": [r"sa[çc]\s+ekim\w*", r"hair\w*"],
+                          "dental": [r"di[şs](?:[çc]i\w*|ler\w*|sel)?", r"a[ğg][ıi]z", r"dent\w*"],
+                          "eye": [r"g[öo]z", r"oftalm\w*", r"eye"]}
+
+#Meters per radian on the surface of the earth, for the distances of find_duplicate_pairs
+earth_radius = 6371000
+
+#The quantiles of the numeric columns that profile_columns reports
+profile_quantiles = [0.25, 0.5, 0.75]
+
+#profile_columns counts distinct values exactly up to distinct_sketch_size, and
+#estimates larger counts, within about 3 percent
+distinct_sketch_size = 1024
+
+#profile_columns calculates quantiles exactly up to quantile_sample_size values,
+#and from a uniform sample of quantile_sample_size values beyond that
+quantile_sample_size = 10000
+
+#Values of the EDA environment variable that turn the exploratory blocks of the
+#data preparation scripts off, e.g. EDA=off on a headless worker
+eda_off_values = ["off", "0", "false", "no"]
+
+#%% --- FUNCTION: is_eda_enabled ---
+
+def is_eda_enabled():
+    """
+    Checks whether the exploratory blocks of the data preparation scripts should run.
+    They run unless the EDA environment variable is set to one of eda_off_values.
+    The variable is read on every call, so it can be changed between scripts.
+
+    Returns
+    -------
+    Returns Boolean True if the exploratory blocks should run.
+    Returns Boolean False if EDA is turned off.
+
+    """
+    return os.environ.get("EDA", "on").strip().lower() not in eda_off_values
 
 #%% --- FUNCTION: sample_and_read_from_df ---
 
@@ -47,15 +101,187 @@ def sample_and_read_from_df(dataframe, sample_size):
         raise IndexError(index_error_text)
     
     sample = dataframe.sample(sample_size)
-    sample_columns = sample.columns
-    for column in sample_columns:
-        print("Commencing with " + column + " column of the dataframe")
-        print("")
-        for i in range(0,len(sample)):
-            selection = sample.iloc[i]
-            print(str(selection[column]).encode("utf-8"))
-            print("")  
+    write_sample(format_sample(sample))
             
+#%% --- FUNCTION: sample_and_read_from_file ---
+
+    # --- Helper Functions --- #
+
+def format_sample(sample):
+    """
+    Formats a sample column by column, as sample_and_read_from_df prints it:
+    a header per column followed by the values of the column, each one
+    followed by an empty line. Every column is formatted with vectorized
+    string operations.
+
+    Parameters
+    ----------
+    sample : pandas.DataFrame
+
+    Returns
+    -------
+    str
+
+    """
+    column_texts = []
+    for column in sample.columns:
+        values = sample.loc[:, column].astype(str) + "\n\n"
+        column_texts.append("Commencing with {} column of the dataframe\n\n".format(column) + values.str.cat())
+    return "".join(column_texts)
+
+def write_sample(text, output = None):
+    """
+    Writes a formatted sample in a single write.
+
+    Parameters
+    ----------
+    text : str
+    output : pathlib.Path, str or file object, optional
+        The default is None, which writes to the console. Characters that the
+        console can't show are written as escape sequences.
+
+    Returns
+    -------
+    None.
+
+    """
+    if output is None:
+        encoding = sys.stdout.encoding or "utf-8"
+        sys.stdout.write(text.encode(encoding, "backslashreplace").decode(encoding))
+    elif isinstance(output, (Path, str)):
+        with open(output, "w", encoding = "utf-8") as output_file:
+            output_file.write(text)
+    else:
+        output.write(text)
+
+def iter_file_chunks(import_fp, chunksize, **read_kwargs):
+    """
+    Yields the rows of a .parquet or .csv file as dataframes of chunksize rows.
+    """
+    if Path(import_fp).suffix == ".parquet":
+        for batch in pq.ParquetFile(str(import_fp)).iter_batches(batch_size = chunksize, **read_kwargs):
+            yield batch.to_pandas()
+    else:
+        for chunk in pd.read_csv(import_fp, chunksize = chunksize, **read_kwargs):
+            yield chunk
+
+def sample_rows_from_file(import_fp, sample_size, chunksize = 100000, random_state = None, **read_kwargs):
+    """
+    Draws a uniform sample of the rows of a file in a single pass, holding one
+    chunk and the sample in memory at a time.
+
+    Every row gets a random priority, and the sample_size rows with the smallest
+    priorities are kept, which is a reservoir sample. Once the reservoir is
+    full, the rows of a chunk whose priorities are too large are skipped
+    without being copied.
+
+    Parameters
+    ----------
+    import_fp : pathlib.Path or str
+        A .csv or .parquet file.
+    sample_size : int
+    chunksize : int, optional
+        The default is 100000.
+    random_state : int, optional
+        The default is None.
+    **read_kwargs
+        Passed to pandas.read_csv, e.g. encoding = "utf-8-sig", or to
+        pyarrow.parquet.ParquetFile.iter_batches, e.g. columns = ["price"]
+
+    Raises
+    ------
+    ValueError
+        If sample_size is negative.
+    IndexError
+        If the file has fewer than sample_size rows.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The sampled rows in the order of the file, indexed by their position in the file.
+
+    """
+    valerror_text = "sample_size must be a non-negative integer, got {}".format(sample_size)
+    if not sample_size >= 0:
+        raise ValueError(valerror_text)
+
+    random_state = np.random.RandomState(random_state)
+    reservoir = None
+    priorities = np.array([], dtype = float)
+    row_count = 0
+
+    for chunk in iter_file_chunks(import_fp, chunksize, **read_kwargs):
+        chunk.index = pd.RangeIndex(row_count, row_count + len(chunk))
+        row_count += len(chunk)
+        chunk_priorities = random_state.random_sample(len(chunk))
+
+        if sample_size > 0 and len(priorities) == sample_size:
+            kept_mask = chunk_priorities < priorities.max()
+            chunk, chunk_priorities = chunk.loc[kept_mask, :], chunk_priorities[kept_mask]
+
+        reservoir = chunk if reservoir is None else pd.concat([reservoir, chunk])
+        priorities = np.concatenate([priorities, chunk_priorities])
+        if len(priorities) > sample_size:
+            kept = np.argpartition(priorities, sample_size)[:sample_size]
+            reservoir, priorities = reservoir.iloc[kept], priorities[kept]
+
+    index_error_text = ("file length must be larger than or equal to sample_size. "
+                        "file length is {}, sample_size is {}").format(row_count, sample_size)
+    if not row_count >= sample_size:
+        raise IndexError(index_error_text)
+
+    return reservoir.sort_index()
+
+    # --- Main Function --- #
+
+def sample_and_read_from_file(import_fp, sample_size, output = None, chunksize = 100000,
+                              random_state = None, **read_kwargs):
+    """
+    Like sample_and_read_from_df, but samples the rows of a .csv or .parquet
+    file without loading it, see sample_rows_from_file. The sample is formatted
+    in one go and written in a single write.
+
+    Parameters
+    ----------
+    import_fp : pathlib.Path or str
+        A .csv or .parquet file.
+    sample_size : int
+    output : pathlib.Path, str or file object, optional
+        Where the sample is written. The default is None, which prints it.
+    chunksize : int, optional
+        The number of rows read at a time. The default is 100000.
+    random_state : int, optional
+        The default is None.
+    **read_kwargs
+        See sample_rows_from_file.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The sample.
+
+    """
+    valerror_text = "import_fp must be type pathlib.Path or str, got {}".format(type(import_fp))
+    if not isinstance(import_fp, (Path, str)):
+        raise ValueError(valerror_text)
+
+    valerror_text = "sample_size must be type int, got {}".format(type(sample_size))
+    if not isinstance(sample_size, int):
+        raise ValueError(valerror_text)
+
+    valerror_text = "sample_size must be a non-negative integer, got {}".format(sample_size)
+    if not sample_size >= 0:
+        raise ValueError(valerror_text)
+
+    valerror_text = "chunksize must be a positive integer, got {}".format(chunksize)
+    if not isinstance(chunksize, int) or chunksize < 1:
+        raise ValueError(valerror_text)
+
+    sample = sample_rows_from_file(import_fp, sample_size, chunksize = chunksize,
+                                   random_state = random_state, **read_kwargs)
+    write_sample(format_sample(sample), output)
+    return sample
+
 #%% --- FUNCTION: report_null_values ---
 
     # --- Helper Functions ---
@@ -138,6 +364,9 @@ def plot_null_values_bar_chart(null_values_dataframe):
     if not is_null_values_dataframe(null_values_dataframe):
         raise ValueError(valerror_text)
     
+    #Imported here so that the scripts that don't plot never import matplotlib
+    import matplotlib.pyplot as plt
+    
     fig = plt.Figure(figsize = (9.60,7.20))
     
     # Ax creating is wrapped inside if-else statement because creating
@@ -178,36 +407,127 @@ def plot_null_values_bar_chart(null_values_dataframe):
     plt.show()
     return fig
 
-def plot_null_values_matrix(dataframe):
+def calculate_binned_nullity(dataframe, bin_count = 200):
     """
-    
+    Splits the rows of dataframe into bin_count buckets of consecutive rows, and
+    calculates the fraction of null values of each column in each bucket.
+    The nullity mask is summed bucket by bucket with a single numpy reduction,
+    so the result has the same size however many rows dataframe has.
 
     Parameters
     ----------
-    dataframe : TYPE
-        DESCRIPTION.
+    dataframe : pandas.DataFrame
+    bin_count : int, optional
+        The number of buckets. A dataframe with fewer rows gets a bucket per row.
+        The default is 200.
 
     Returns
     -------
-    fig : TYPE
-        DESCRIPTION.
+    binned_nullity : pandas.DataFrame
+        A row per bucket, indexed by the position of its first row, and a column
+        per column of dataframe. The values are between 0 and 1.
 
     """
-    
     valerror_text = "dataframe must be type pd.DataFrame, got {}".format(type(dataframe))
     if not isinstance(dataframe, pd.DataFrame):
         raise ValueError(valerror_text)
+
+    valerror_text = "bin_count must be a positive integer, got {}".format(bin_count)
+    if not isinstance(bin_count, int) or bin_count < 1:
+        raise ValueError(valerror_text)
+
+    row_count = len(dataframe)
+    if row_count == 0:
+        return pd.DataFrame(columns = dataframe.columns, dtype = float)
+
+    bin_count = min(bin_count, row_count)
+    bin_starts = (np.arange(bin_count) * row_count) // bin_count
+    bin_sizes = np.diff(np.append(bin_starts, row_count))
+
+    null_mask = dataframe.isna().to_numpy(dtype = np.uint32)
+    null_counts = np.add.reduceat(null_mask, bin_starts, axis = 0)
+
+    return pd.DataFrame(null_counts / bin_sizes[:, np.newaxis],
+                        index = bin_starts,
+                        columns = dataframe.columns)
+
+def plot_binned_nullity(binned_nullity, colorbar):
+    """
+    Draws a binned_nullity dataframe as a single image, with a column of
+    pixels per column and a row of pixels per bucket.
+    """
+    #Imported here so that the scripts that don't plot never import matplotlib
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize = (9.60,7.20))
+
+    image = ax.imshow(binned_nullity.to_numpy(dtype = float),
+                      aspect = "auto",
+                      interpolation = "nearest",
+                      cmap = "viridis" if colorbar else "gray_r",
+                      vmin = 0, vmax = 1)
+
+    ax.set_xticks(np.arange(len(binned_nullity.columns)))
+    ax.set_xticklabels(binned_nullity.columns, rotation = 90, size = "x-large")
+
+    #Label the buckets with the rows they start at
+    tick_positions = np.linspace(0, max(len(binned_nullity) - 1, 0), min(len(binned_nullity), 6)).round().astype(int)
+    ax.set_yticks(tick_positions)
+    ax.set_yticklabels(binned_nullity.index[tick_positions])
+    ax.set_ylabel("row")
+
+    if colorbar:
+        fig.colorbar(image, ax = ax, label = "share of null values")
+
+    return fig
+
+def plot_null_values_matrix(dataframe, bin_count = 200):
+    """
+    Draws where the null values of dataframe are. The rows are aggregated into
+    bin_count buckets, see calculate_binned_nullity, and each bucket is drawn
+    from white, without null values, to black, with only null values.
+
+    Parameters
+    ----------
+    dataframe : pandas.DataFrame
+    bin_count : int, optional
+        The default is 200.
+
+    Returns
+    -------
+    fig : matplotlib.pyplot.Figure
+
+    """
     
-    #Create a boolean dataframe based on whether values are null or not
-    df_null = dataframe.isnull()
-    #create a heatmap of the boolean dataframe
-    plot_object = sns.heatmap(df_null,
-                cbar = False)
-    
-    plt.xticks(rotation=90, size='x-large')
+    valerror_text = "dataframe must be type pd.DataFrame, got {}".format(type(dataframe))
+    if not isinstance(dataframe, pd.DataFrame):
+        raise ValueError(valerror_text)
     
-    fig = plot_object.get_figure()
-    return fig 
+    return plot_binned_nullity(calculate_binned_nullity(dataframe, bin_count = bin_count),
+                               colorbar = False)
+
+def plot_null_values_heatmap(dataframe, bin_count = 200):
+    """
+    Like plot_null_values_matrix, but draws the share of null values of each
+    bucket in color, with a colorbar.
+
+    Parameters
+    ----------
+    dataframe : pandas.DataFrame
+    bin_count : int, optional
+        The default is 200.
+
+    Returns
+    -------
+    fig : matplotlib.pyplot.Figure
+
+    """
+    valerror_text = "dataframe must be type pd.DataFrame, got {}".format(type(dataframe))
+    if not isinstance(dataframe, pd.DataFrame):
+        raise ValueError(valerror_text)
+
+    return plot_binned_nullity(calculate_binned_nullity(dataframe, bin_count = bin_count),
+                               colorbar = True)
 
     
     # --- Subfunction : calculate_null_values ---
@@ -302,7 +622,7 @@ def print_null_values(null_values_dataframe):
 
     # --- Subfunction : visualize_null_values ---
             
-def visualize_null_values(null_values_dataframe, kind = "bar_chart"):
+def visualize_null_values(null_values_dataframe, kind = "bar_chart", dataframe = None, bin_count = 200):
     """
 
     Returns a visual representation of a given null_values_dataframe.
@@ -311,11 +631,20 @@ def visualize_null_values(null_values_dataframe, kind = "bar_chart"):
     ----------
     null_values_dataframe : pandas.DataFrame.
         A pandas.DataFrame that is produced as the result of calling
-        calculate_null_values() on a dataframe. Has to contain a column
-        called "null_count" at minimum.
+        calculate_null_values() or profile_columns() on a dataframe. Has to
+        contain a column called "null_count" at minimum.
     
     kind : One of the following strings "bar_chart", "matrix", "heatmap"
-         The default is "bar_chart". "matrix" and "heatmap" is not implemented yet.
+         The default is "bar_chart". "matrix" and "heatmap" show where the null
+         values of dataframe are, see plot_null_values_matrix and
+         plot_null_values_heatmap.
+
+    dataframe : pandas.DataFrame, optional
+        The dataframe that null_values_dataframe was calculated from. Needed by
+        "matrix" and "heatmap". The default is None.
+
+    bin_count : int, optional
+        The number of row buckets of "matrix" and "heatmap". The default is 200.
 
     Returns
     -------
@@ -335,24 +664,31 @@ def visualize_null_values(null_values_dataframe, kind = "bar_chart"):
     if str(kind) not in accepted_kinds:
         raise ValueError(valerror_text)
     
+    valerror_text = "Parameter kind {} needs the dataframe that null_values_dataframe was calculated from.".format(kind)
+    if kind in ["matrix", "heatmap"] and not isinstance(dataframe, pd.DataFrame):
+        raise ValueError(valerror_text)
+    
     if kind == "bar_chart":
         plot = plot_null_values_bar_chart(null_values_dataframe)
     
     elif kind == "matrix":
-        raise NotImplementedError
+        plot = plot_null_values_matrix(dataframe, bin_count = bin_count)
     
     elif kind == "heatmap":      
-        raise NotImplementedError
+        plot = plot_null_values_heatmap(dataframe, bin_count = bin_count)
     
     return plot
 
     # --- Main function: report_null_values ---
 
 def report_null_values(dataframe, calculate_percentages = True,
-                       visualize_results = False, print_results = False):
+                       visualize_results = False, print_results = False,
+                       kind = "bar_chart"):
     """
 
     Composes a report about the null values within the given dataframe.
+    profile_columns reports the same null values, along with the other
+    statistics of each column.
 
     Parameters
     ----------
@@ -366,6 +702,10 @@ def report_null_values(dataframe, calculate_percentages = True,
     visualize_results: Boolean True or False.
         Related to the subfunction visualize_null_values. Determines whether or not
         this function will return a matplotlib.Figure object.
+    
+    kind: One of the following strings "bar_chart", "matrix", "heatmap"
+        Related to the subfunction visualize_null_values. The kind of the
+        matplotlib.Figure object. The default is "bar_chart".
         
     print_results: Boolean True or False.
         Related to the subfunction print_null_values. Determines whether or not
@@ -397,7 +737,7 @@ def report_null_values(dataframe, calculate_percentages = True,
     null_values_dataframe = calculate_null_values(dataframe, calculate_percentages = calculate_percentages)
 
     if visualize_results == True:
-        plot = visualize_null_values(null_values_dataframe)
+        plot = visualize_null_values(null_values_dataframe, kind = kind, dataframe = dataframe)
         return plot
     
     elif print_results == True:
@@ -406,5 +746,547 @@ def report_null_values(dataframe, calculate_percentages = True,
     
     else:
         return null_values_dataframe
-    
-    
\ No newline at end of file
+
+#%% --- FUNCTION: profile_columns ---
+
+    # --- Helper Functions ---
+
+def create_column_profile():
+    """
+    Creates the running statistics of one column, see update_column_profile.
+    """
+    return {"row_count": 0,
+            "null_count": 0,
+            "dtypes": [],
+            "value_types": set(),
+            "distinct_hashes": np.array([], dtype = np.uint64),
+            "is_orderable": True,
+            "is_numeric": True,
+            "min": None,
+            "max": None,
+            "sample_values": np.array([], dtype = float),
+            "sample_priorities": np.array([], dtype = float)}
+
+def update_column_profile(column_profile, values, random_state):
+    """
+    Adds the values of one chunk of a column to its running statistics.
+    Every statistic is updated from the same pass over the chunk:
+        - The null count.
+        - The dtypes of the chunks, and the Python types of the values of
+          object columns, which tell whether the column has mixed types.
+        - A k-minimum-values sketch of the hashes of the values, which
+          estimates the number of distinct values. It is exact for columns with
+          fewer than distinct_sketch_size distinct values.
+        - The minimum and the maximum, if the values can be compared.
+        - A uniform sample of the numeric values, which estimates the quantiles.
+          It is exact for columns with fewer than quantile_sample_size values.
+
+    Parameters
+    ----------
+    column_profile : dict
+        See create_column_profile
+    values : pandas.Series
+    random_state : numpy.random.RandomState
+        Draws the sample.
+
+    Returns
+    -------
+    None.
+
+    """
+    column_profile["row_count"] += len(values)
+    if str(values.dtype) not in column_profile["dtypes"]:
+        column_profile["dtypes"].append(str(values.dtype))
+
+    null_mask = values.isna()
+    column_profile["null_count"] += int(null_mask.sum())
+    values = values.loc[~null_mask.values]
+    if len(values) == 0:
+        return
+
+    if values.dtype == object:
+        column_profile["value_types"].update(value_type.__name__ for value_type in values.map(type).unique())
+
+    try:
+        hashes = pd.util.hash_pandas_object(values, index = False).values
+    except TypeError:
+        hashes = pd.util.hash_pandas_object(values.astype(str), index = False).values
+    distinct_hashes = np.union1d(column_profile["distinct_hashes"], hashes)
+    column_profile["distinct_hashes"] = distinct_hashes[:distinct_sketch_size]
+
+    is_numeric = pd.api.types.is_numeric_dtype(values.dtype) and not pd.api.types.is_bool_dtype(values.dtype)
+    is_orderable = (is_numeric or pd.api.types.is_datetime64_any_dtype(values.dtype)
+                    or (values.dtype == object and column_profile["value_types"] == {"str"}))
+    column_profile["is_numeric"] = column_profile["is_numeric"] and is_numeric
+    column_profile["is_orderable"] = column_profile["is_orderable"] and is_orderable
+    if column_profile["is_orderable"]:
+        chunk_min, chunk_max = values.min(), values.max()
+        try:
+            if column_profile["min"] is None or chunk_min < column_profile["min"]:
+                column_profile["min"] = chunk_min
+            if column_profile["max"] is None or chunk_max > column_profile["max"]:
+                column_profile["max"] = chunk_max
+        except TypeError:
+            #The chunks have values that can't be compared, e.g. numbers and text
+            column_profile["is_orderable"] = False
+
+    if column_profile["is_numeric"]:
+        #The values with the smallest random priorities are a uniform sample of all the values
+        sample_values = np.concatenate([column_profile["sample_values"], values.to_numpy(dtype = float)])
+        sample_priorities = np.concatenate([column_profile["sample_priorities"], random_state.random_sample(len(values))])
+        if len(sample_values) > quantile_sample_size:
+            kept = np.argpartition(sample_priorities, quantile_sample_size)[:quantile_sample_size]
+            sample_values, sample_priorities = sample_values[kept], sample_priorities[kept]
+        column_profile["sample_values"] = sample_values
+        column_profile["sample_priorities"] = sample_priorities
+
+def summarize_column_profile(column_profile):
+    """
+    Turns the running statistics of a column into a row of the profile, see profile_columns.
+    """
+    row_count = column_profile["row_count"]
+    distinct_hashes = column_profile["distinct_hashes"]
+    if len(distinct_hashes) < distinct_sketch_size:
+        distinct_count = len(distinct_hashes)
+    else:
+        #The k-th smallest of n uniform hashes is about k / n of the way through the hash space
+        distinct_count = int(round((distinct_sketch_size - 1) / (float(distinct_hashes[-1]) / 2 ** 64)))
+        distinct_count = min(distinct_count, row_count - column_profile["null_count"])
+
+    mixed_types = (len(column_profile["dtypes"]) > 1 or len(column_profile["value_types"]) > 1)
+
+    summary = {"row_count": row_count,
+               "null_count": column_profile["null_count"],
+               "null_percentage": column_profile["null_count"] / row_count * 100 if row_count > 0 else np.nan,
+               "dtype": "|".join(column_profile["dtypes"]),
+               "mixed_types": mixed_types,
+               "distinct_count": distinct_count,
+               "min": column_profile["min"] if column_profile["is_orderable"] else None,
+               "max": column_profile["max"] if column_profile["is_orderable"] else None}
+
+    sample_values = column_profile["sample_values"] if column_profile["is_numeric"] else []
+    for quantile in profile_quantiles:
+        quantile_name = "q{:g}".format(quantile * 100)
+        summary[quantile_name] = np.quantile(sample_values, quantile) if len(sample_values) > 0 else np.nan
+    return summary
+
+    # --- Main Function ---
+
+def profile_columns(data, chunksize = None, **read_csv_kwargs):
+    """
+    Profiles the columns of a dataframe, or of a .csv file that is read chunk by
+    chunk, in a single pass over each column. See update_column_profile.
+
+    The profile has the null_count and null_percentage columns of
+    calculate_null_values, so print_null_values and visualize_null_values
+    can render it.
+
+    Parameters
+    ----------
+    data : pandas.DataFrame, pathlib.Path or str
+        A dataframe, or the path to a .csv file.
+    chunksize : int, optional
+        The number of rows per chunk. The default is None, which profiles a
+        dataframe in one go, and reads a .csv file 100000 rows at a time.
+    **read_csv_kwargs
+        Passed to pandas.read_csv, e.g. encoding = "utf-8-sig"
+
+    Returns
+    -------
+    pandas.DataFrame
+        A row per column of data, with the columns row_count, null_count,
+        null_percentage, dtype, mixed_types, distinct_count, min, max, q25, q50 and q75.
+        dtype lists the dtypes of every chunk, e.g. "int64|object" if pandas
+        read some chunks of a .csv column as numbers and some as text.
+
+    """
+    valerror_text = "data must be type pd.DataFrame, pathlib.Path or str, got {}".format(type(data))
+    if not isinstance(data, (pd.DataFrame, Path, str)):
+        raise ValueError(valerror_text)
+
+    valerror_text = "chunksize must be a positive integer, got {}".format(chunksize)
+    if chunksize is not None and (not isinstance(chunksize, int) or chunksize < 1):
+        raise ValueError(valerror_text)
+
+    if isinstance(data, pd.DataFrame):
+        chunksize = len(data) if chunksize is None else chunksize
+        chunks = (data.iloc[start:start + chunksize] for start in range(0, max(len(data), 1), max(chunksize, 1)))
+    else:
+        chunks = pd.read_csv(data, chunksize = 100000 if chunksize is None else chunksize, **read_csv_kwargs)
+
+    random_state = np.random.RandomState(0)
+    column_profiles = {}
+    for chunk in chunks:
+        for column in chunk.columns:
+            column_profile = column_profiles.setdefault(column, create_column_profile())
+            update_column_profile(column_profile, chunk.loc[:, column], random_state)
+
+    return pd.DataFrame.from_dict({column: summarize_column_profile(column_profile)
+                                   for column, column_profile in column_profiles.items()},
+                                  orient = "index")
+
+#%% --- FUNCTION: classify_names ---
+
+    # --- Helper Functions ---
+
+def compile_vocabulary(vocabulary):
+    """
+    Compiles a vocabulary into a single case-insensitive regex, with a named
+    group per category, that matches the whole words of any category.
+
+    Parameters
+    ----------
+    vocabulary : dict
+        {category: list of regex patterns}. The categories must be valid
+        Python identifiers, such as "hair_transplant".
+
+    Returns
+    -------
+    re.Pattern
+
+    """
+    valerror_text = "vocabulary must be a non-empty dict, got {}".format(type(vocabulary))
+    if not isinstance(vocabulary, dict) or len(vocabulary) == 0:
+        raise ValueError(valerror_text)
+
+    invalid_categories = [category for category in vocabulary if not str(category).isidentifier()]
+    valerror_text = "Categories must be valid Python identifiers, got {}".format(invalid_categories)
+    if len(invalid_categories) > 0:
+        raise ValueError(valerror_text)
+
+    groups = ["(?P<{}>{})".format(category, "|".join(patterns)) for category, patterns in vocabulary.items()]
+    return re.compile(r"\b(?:{})\b".format("|".join(groups)), flags = re.IGNORECASE)
+
+    # --- Main Function ---
+
+def classify_names(names, vocabulary = institution_vocabulary):
+    """
+    Tags every name with the categories of vocabulary whose words it contains.
+    All the categories are matched in a single pass over the names, with the
+    regex of compile_vocabulary. A word that matches more than one category
+    only counts for the first one, in the order of vocabulary.
+
+    Parameters
+    ----------
+    names : pandas.Series
+    vocabulary : dict, optional
+        See compile_vocabulary. The default is institution_vocabulary.
+
+    Returns
+    -------
+    pandas.DataFrame
+        A boolean column per category, with the index of names.
+
+    """
+    valerror_text = "names must be type pd.Series, got {}".format(type(names))
+    if not isinstance(names, pd.Series):
+        raise ValueError(valerror_text)
+
+    pattern = compile_vocabulary(vocabulary)
+
+    #extractall returns a row per match, indexed by the position of the name and the match number
+    positional_names = pd.Series(names.to_numpy(), dtype = object).fillna("").astype(str)
+    matches = positional_names.str.extractall(pattern)
+    categories = matches.notna().groupby(level = 0).any()
+
+    categories = categories.reindex(index = range(len(names)), columns = list(vocabulary),
+                                    fill_value = False).astype(bool)
+    categories.index = names.index
+    return categories
+
+#%% --- FUNCTION: drop_duplicate_places ---
+
+    # --- Helper Functions ---
+
+def get_ngrams(text, ngram_size = 3):
+    """
+    Returns the set of character n-grams of a normalized text, padded with a
+    space on both sides so that the first and last letters count as much as the others.
+    """
+    padded_text = " {} ".format(normalize_text(text))
+    return {padded_text[i:i + ngram_size] for i in range(max(len(padded_text) - ngram_size + 1, 1))}
+
+def find_ngram_candidates(ngram_sets, max_ngram_postings):
+    """
+    Returns the pairs of records that share at least one n-gram, from an inverted
+    index of the n-grams. N-grams shared by more than max_ngram_postings records,
+    such as those of "merkezi" or "hastanesi", are left out of the index.
+    """
+    postings = pd.DataFrame([(record, ngram) for record, ngrams in enumerate(ngram_sets) for ngram in ngrams],
+                            columns = ["record", "ngram"])
+    posting_counts = postings.loc[:, "ngram"].map(postings.loc[:, "ngram"].value_counts())
+    postings = postings.loc[posting_counts <= max_ngram_postings, :]
+
+    pairs = postings.merge(postings, on = "ngram", suffixes = ("_left", "_right"))
+    pairs = pairs.loc[pairs.loc[:, "record_left"] < pairs.loc[:, "record_right"], ["record_left", "record_right"]]
+    return pairs.drop_duplicates().rename(columns = {"record_left": "left", "record_right": "right"})
+
+def find_spatial_candidates(latitudes, longitudes, max_distance):
+    """
+    Returns the pairs of records that are within max_distance meters of each
+    other, with their distance. The records are put in a grid of
+    max_distance-wide cells, and only the records of neighboring cells are compared.
+    """
+    latitudes = np.radians(np.asarray(latitudes, dtype = float))
+    longitudes = np.radians(np.asarray(longitudes, dtype = float))
+
+    #An equirectangular projection is accurate enough at the scale of a city
+    y = latitudes * earth_radius
+    x = longitudes * earth_radius * np.cos(np.nanmean(latitudes))
+
+    cells = pd.DataFrame({"record": np.arange(len(x)),
+                          "cell_x": np.floor(x / max_distance),
+                          "cell_y": np.floor(y / max_distance)}).dropna()
+
+    neighbor_pairs = []
+    for offset_x in [-1, 0, 1]:
+        for offset_y in [-1, 0, 1]:
+            neighbors = cells.assign(cell_x = cells.loc[:, "cell_x"] + offset_x,
+                                     cell_y = cells.loc[:, "cell_y"] + offset_y)
+            neighbor_pairs.append(cells.merge(neighbors, on = ["cell_x", "cell_y"], suffixes = ("_left", "_right")))
+    pairs = pd.concat(neighbor_pairs, ignore_index = True)
+    pairs = pairs.loc[pairs.loc[:, "record_left"] < pairs.loc[:, "record_right"], ["record_left", "record_right"]]
+    pairs = pairs.rename(columns = {"record_left": "left", "record_right": "right"})
+
+    left, right = pairs.loc[:, "left"].values, pairs.loc[:, "right"].values
+    pairs = pairs.assign(distance = np.hypot(x[left] - x[right], y[left] - y[right]))
+    return pairs.loc[pairs.loc[:, "distance"] <= max_distance, :]
+
+def find_duplicate_pairs(names, latitudes = None, longitudes = None, max_distance = 100,
+                         similarity_threshold = 0.85, ngram_size = 3, max_ngram_postings = 100):
+    """
+    Finds the pairs of records that refer to the same place, without comparing
+    every pair. The candidates are blocked by their character n-grams and, if
+    coordinates are given, by their distance, see find_ngram_candidates and
+    find_spatial_candidates. Only the candidates are scored, by the Dice
+    similarity of the n-grams of their names.
+
+    Parameters
+    ----------
+    names : list-like
+    latitudes : list-like, optional
+        The default is None, which compares the names only.
+    longitudes : list-like, optional
+        The default is None.
+    max_distance : float, optional
+        Meters. Records further apart than max_distance are never duplicates.
+        The default is 100.
+    similarity_threshold : float, optional
+        Between 0 and 1. The default is 0.85.
+    ngram_size : int, optional
+        The default is 3.
+    max_ngram_postings : int, optional
+        See find_ngram_candidates. The default is 100.
+
+    Returns
+    -------
+    pandas.DataFrame
+        A row per duplicate pair, with the positions of the records in the
+        columns left and right, the distance in meters if coordinates are given,
+        and the similarity.
+
+    """
+    valerror_text = "similarity_threshold must be between 0 and 1, got {}".format(similarity_threshold)
+    if not 0 <= similarity_threshold <= 1:
+        raise ValueError(valerror_text)
+
+    valerror_text = "latitudes and longitudes must be given together"
+    if (latitudes is None) != (longitudes is None):
+        raise ValueError(valerror_text)
+
+    #Missing names have no n-grams, so they are never duplicates
+    ngram_sets = [get_ngrams(name, ngram_size) if isinstance(name, str) else set() for name in names]
+    pairs = find_ngram_candidates(ngram_sets, max_ngram_postings)
+    if latitudes is not None:
+        spatial_pairs = find_spatial_candidates(latitudes, longitudes, max_distance)
+        pairs = spatial_pairs.merge(pairs, on = ["left", "right"])
+
+    similarities = [2 * len(ngram_sets[left] & ngram_sets[right]) / (len(ngram_sets[left]) + len(ngram_sets[right]))
+                    for left, right in zip(pairs.loc[:, "left"], pairs.loc[:, "right"])]
+    pairs = pairs.assign(similarity = np.array(similarities, dtype = float))
+    pairs = pairs.loc[pairs.loc[:, "similarity"] >= similarity_threshold, :]
+    return pairs.sort_values(["left", "right"]).reset_index(drop = True)
+
+def cluster_duplicates(pairs, record_count):
+    """
+    Groups the records that are linked by duplicate pairs, directly or through
+    other records, with a union-find.
+
+    Parameters
+    ----------
+    pairs : pandas.DataFrame
+        As returned by find_duplicate_pairs
+    record_count : int
+
+    Returns
+    -------
+    numpy.ndarray
+        The cluster of each record, named after its first record.
+
+    """
+    parents = np.arange(record_count)
+
+    def find_root(record):
+        while parents[record] != record:
+            #Path halving keeps the trees flat
+            parents[record] = parents[parents[record]]
+            record = parents[record]
+        return record
+
+    for left, right in zip(pairs.loc[:, "left"], pairs.loc[:, "right"]):
+        left_root, right_root = find_root(left), find_root(right)
+        if left_root != right_root:
+            parents[max(left_root, right_root)] = min(left_root, right_root)
+
+    return np.array([find_root(record) for record in range(record_count)])
+
+    # --- Main Function ---
+
+def drop_duplicate_places(dataframe, name_column, latitude_column = None, longitude_column = None, **kwargs):
+    """
+    Merges the records of dataframe that refer to the same place, see
+    find_duplicate_pairs, by keeping the first record of each cluster of duplicates.
+
+    Parameters
+    ----------
+    dataframe : pandas.DataFrame or geopandas.GeoDataFrame
+    name_column : str
+    latitude_column : str, optional
+        The default is None, which compares the names only.
+    longitude_column : str, optional
+        The default is None.
+    **kwargs
+        Passed to find_duplicate_pairs, e.g. max_distance = 50
+
+    Returns
+    -------
+    pandas.DataFrame or geopandas.GeoDataFrame
+
+    """
+    valerror_text = "dataframe must be type pd.DataFrame, got {}".format(type(dataframe))
+    if not isinstance(dataframe, pd.DataFrame):
+        raise ValueError(valerror_text)
+
+    latitudes = None if latitude_column is None else dataframe.loc[:, latitude_column]
+    longitudes = None if longitude_column is None else dataframe.loc[:, longitude_column]
+    pairs = find_duplicate_pairs(dataframe.loc[:, name_column], latitudes, longitudes, **kwargs)
+
+    clusters = cluster_duplicates(pairs, len(dataframe))
+    return dataframe.iloc[clusters == np.arange(len(dataframe))]
+
+#%% --- FUNCTION: clean_airbnb_listings ---
+
+def clean_airbnb_listings(listings, district_registry = None):
+    """
+    Applies the cleaning steps of process_airbnb_data.py to a dataframe returned by
+    read_airbnb_listings or to one chunk yielded by iter_airbnb_listings.
+
+    Every step works row by row, so cleaning a file chunk by chunk gives the same
+    rows as cleaning it in one go:
+        - Rename the columns to airbnb_columns_in_english
+        - Convert "district_eng" to the district categories of district_registry,
+          which renames the district "Eyup" to "Eyupsultan"
+        - Add a "district_tr" column with the Turkish district names
+        - Drop the rows with null values
+        - Drop the rows with a price of 0
+
+    Parameters
+    ----------
+    listings : pandas.DataFrame
+    district_registry : pandas.DataFrame, optional
+        See build_district_registry. The default is None, which reads the
+        registry of istanbul_districts.shp.
+
+    Raises
+    ------
+    ValueError
+        If a listing is in a district that is not in district_registry.
+
+    Returns
+    -------
+    pandas.DataFrame
+
+    """
+    valerror_text = "listings must be type pd.DataFrame, got {}".format(type(listings))
+    if not isinstance(listings, pd.DataFrame):
+        raise ValueError(valerror_text)
+
+    valerror_text = "listings must have {} columns, got {}".format(len(airbnb_columns_in_english), len(listings.columns))
+    if len(listings.columns) != len(airbnb_columns_in_english):
+        raise ValueError(valerror_text)
+
+    listings = listings.set_axis(airbnb_columns_in_english, axis = 1)
+
+    if district_registry is None:
+        district_registry = read_district_registry()
+
+    #Both district columns are codes into the registry, so the Turkish names come from the codes
+    district_eng = to_district_categorical(listings.loc[:, "district_eng"], district_registry, "eng")
+    district_tr = pd.Categorical.from_codes(district_eng.cat.codes,
+                                            dtype = get_district_dtype(district_registry, "tr"))
+    listings = listings.assign(district_eng = district_eng,
+                               district_tr = district_tr)
+
+    listings = listings.dropna(axis = 0)
+
+    zero_mask = listings.loc[:, "price"] > 0
+    return listings.loc[zero_mask, :]
+
+#%% --- FUNCTION: stream_clean_airbnb_listings ---
+
+def stream_clean_airbnb_listings(import_fp, export_fp, chunksize = 10000, district_registry = None):
+    """
+    Cleans a raw InsideAirbnb listings file chunk by chunk and appends every
+    cleaned chunk to export_fp. Only one chunk is held in memory at a time.
+
+    The output is written to a temporary file that replaces export_fp once
+    the last chunk is written, so an interrupted run never leaves a half-written file.
+
+    Parameters
+    ----------
+    import_fp : pathlib.Path or str
+        Path to the raw listings file.
+
+    export_fp : pathlib.Path or str
+        Path of the processed .csv file. Written with utf-8-sig encoding.
+
+    chunksize : int, optional
+        Number of rows per chunk. The default is 10000.
+
+    district_registry : pandas.DataFrame, optional
+        See clean_airbnb_listings. The default is None.
+
+    Returns
+    -------
+    int
+        The number of rows written to export_fp.
+
+    """
+    valerror_text = "export_fp must be type pathlib.Path or str, got {}".format(type(export_fp))
+    if not isinstance(export_fp, (Path, str)):
+        raise ValueError(valerror_text)
+
+    export_fp = Path(export_fp)
+    temporary_fp = get_temporary_fp(export_fp)
+
+    #Every chunk is converted to the same district categories
+    if district_registry is None:
+        district_registry = read_district_registry()
+
+    row_count = 0
+    try:
+        #The byte order mark is written once, at the start of the file
+        with open(temporary_fp, "w", encoding = "utf-8-sig", newline = "") as export_file:
+            for chunk_index, chunk in enumerate(iter_airbnb_listings(import_fp, chunksize = chunksize)):
+                cleaned_chunk = clean_airbnb_listings(chunk, district_registry)
+                cleaned_chunk.to_csv(export_file,
+                                     header = (chunk_index == 0),
+                                     index = False)
+                row_count += len(cleaned_chunk)
+        os.replace(temporary_fp, export_fp)
+    finally:
+        if temporary_fp.exists():
+            temporary_fp.unlink()
+
+    return row_count
+
@@ -13,7 +13,6 @@ found under src/data_visualization.
 import os
 from shapely.geometry import LineString
 import geopandas as gpd
-import matplotlib.pyplot as plt
 from src.helper_functions import data_analysis_helper_functions as functions_analysis
 
 #%% --- DEFINITIONS ---
@@ -85,6 +84,10 @@ def plot_nearest_neighbor_analysis(nn_analysis_gdf, link_gseries):
     attriberror_text = "nn_analysis_gdf object is missing crs information."
     if functions_analysis.has_crs(nn_analysis_gdf) is False:
         raise AttributeError(attriberror_text)
+    
+    #matplotlib is imported by the functions that use it, so that importing this
+    #module stays cheap for the scripts that only use its data functions
+    import matplotlib.pyplot as plt
         
     fig = plt.figure(figsize = (10,10))
     ax_1 = fig.add_subplot(1,1,1)
@@ -177,6 +180,8 @@ def add_watermark(fig, watermark_str, ax_is_constrained = False,
 
     """
     
+    import matplotlib.pyplot as plt
+    
     valerror_text = "Argument fig should be of type matplotlib.Figure. Got {} ".format(type(fig))
     if not isinstance(fig, plt.Figure):
         raise ValueError(valerror_text)
@@ -209,6 +214,7 @@ def create_cmap_legend_in_figure(ax,label, label_size, label_weight, cmap_object
                                  anchor = (30,10)):
 
     
+    import matplotlib.pyplot as plt
     from mpl_toolkits.axes_grid1.inset_locator import inset_axes
     
     #Create an inset axis within the main ax
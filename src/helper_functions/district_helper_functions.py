@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+------ What is this file? ------
+
+This script contains the district registry: the list of the districts of the
+city, with their English, Turkish and ASCII names, derived once from
+istanbul_districts.shp. The unit tests for these functions can be found at:
+     tests/unit_tests/helper_functions/test_district_helper_functions.py
+
+The district columns of every dataset are converted to the categorical dtypes of
+the registry with to_district_categorical. The English and Turkish dtypes share
+their codes, so the district columns of all datasets are integer codes into the
+same list: merges and groupbys on them compare integers, and each district name
+is stored once per dataset instead of once per row.
+
+Shapefiles can't store categorical columns. write_shapefile in
+data_io_helper_functions writes them as text, and the stages convert them back.
+
+"""
+#%% --- Import Required Packages ---
+
+import functools
+import unicodedata
+import numpy as np
+import pandas as pd
+from src.helper_functions.data_io_helper_functions import external_data_dir
+from src.helper_functions.data_io_helper_functions import load_reference_geodataframe
+from src.helper_functions.geocoding_helper_functions import normalize_text
+
+#%% --- DEFINITIONS ---
+
+istanbul_districts_fp = external_data_dir.joinpath("istanbul_districts.shp")
+
+#The languages of the names in the registry, see build_district_registry
+district_languages = ["eng", "tr", "ascii"]
+
+#English district names - Turkish district names, for the districts whose Turkish
+#names are misspelled in istanbul_districts.shp, e.g. "Kadiköy" and "Gazi osmanpaşa"
+district_name_tr_fixes = {"Avcilar": "Avcılar", "Bagcilar": "Bağcılar", "Bakirkoy": "Bakırköy",
+                          "Gaziosmanpasa": "Gaziosmanpaşa", "Kadikoy": "Kadıköy",
+                          "Kagithane": "Kağıthane", "Sariyer": "Sarıyer"}
+
+#Old ASCII district names - current ASCII district names.
+#InsideAirbnb still uses the old name of Eyupsultan.
+district_aliases = {"eyup": "eyupsultan"}
+
+#%% --- FUNCTION: get_district_ascii_name ---
+
+def get_district_ascii_name(name):
+    """
+    Returns the ASCII name of a district, which every spelling of its name
+    shares: "Kadıköy", "KADIKOY" and "Kadikoy" are all "kadikoy".
+    """
+    ascii_name = normalize_text(name).replace(" ", "")
+    return district_aliases.get(ascii_name, ascii_name)
+
+#%% --- FUNCTION: build_district_registry ---
+
+def build_district_registry(districts_gdf, eng_column = "district_e", tr_column = "district_t"):
+    """
+    Builds the district registry of a districts layer.
+
+    Parameters
+    ----------
+    districts_gdf : geopandas.GeoDataFrame or pandas.DataFrame
+        istanbul_districts.shp
+    eng_column : str, optional
+        The default is "district_e".
+    tr_column : str, optional
+        The default is "district_t".
+
+    Raises
+    ------
+    ValueError
+        If two districts share an ASCII name.
+
+    Returns
+    -------
+    pandas.DataFrame
+        A row per district, sorted by English name, with the columns district_eng,
+        district_tr and district_ascii. The row number of a district is its code.
+
+    """
+    valerror_text = "districts_gdf must be type pd.DataFrame, got {}".format(type(districts_gdf))
+    if not isinstance(districts_gdf, pd.DataFrame):
+        raise ValueError(valerror_text)
+
+    district_eng = districts_gdf.loc[:, eng_column].astype(str).tolist()
+
+    #The Turkish names of istanbul_districts.shp were lowercased in a non-Turkish
+    #locale, which turns "İ" into "i" followed by a combining dot, e.g. "Şi̇şli̇"
+    district_tr = [unicodedata.normalize("NFC", unicodedata.normalize("NFD", str(name)).replace("̇", ""))
+                   for name in districts_gdf.loc[:, tr_column]]
+    district_tr = [district_name_tr_fixes.get(eng, tr) for eng, tr in zip(district_eng, district_tr)]
+
+    registry = pd.DataFrame({"district_eng": district_eng,
+                             "district_tr": district_tr,
+                             "district_ascii": [get_district_ascii_name(name) for name in district_eng]})
+
+    duplicated_mask = registry.loc[:, "district_ascii"].duplicated(keep = False)
+    valerror_text = "Districts must have distinct names, got {}".format(registry.loc[duplicated_mask, "district_eng"].tolist())
+    if duplicated_mask.any():
+        raise ValueError(valerror_text)
+
+    return registry.sort_values("district_eng").reset_index(drop = True)
+
+#%% --- FUNCTION: read_district_registry ---
+
+@functools.lru_cache(maxsize = None)
+def read_district_registry(import_fp = istanbul_districts_fp):
+    """
+    Builds the district registry of the districts layer at import_fp, once per
+    process. The registry is shared by the callers, so it must not be modified.
+
+    Parameters
+    ----------
+    import_fp : pathlib.Path, optional
+        The default is data/external/istanbul_districts.shp.
+
+    Returns
+    -------
+    pandas.DataFrame
+        See build_district_registry.
+
+    """
+    return build_district_registry(load_reference_geodataframe(import_fp))
+
+#%% --- FUNCTION: get_district_dtype ---
+
+def get_district_dtype(registry, language = "eng"):
+    """
+    Returns the categorical dtype of the district names of registry in language.
+    The dtypes of all languages share their codes.
+
+    Parameters
+    ----------
+    registry : pandas.DataFrame
+        See build_district_registry.
+    language : str, optional
+        One of district_languages. The default is "eng".
+
+    Returns
+    -------
+    pandas.CategoricalDtype
+
+    """
+    valerror_text = "language must be one of {}, got {}".format(district_languages, language)
+    if language not in district_languages:
+        raise ValueError(valerror_text)
+
+    return pd.CategoricalDtype(registry.loc[:, "district_{}".format(language)].tolist(), ordered = False)
+
+#%% --- FUNCTION: to_district_categorical ---
+
+def to_district_categorical(names, registry, language = "eng"):
+    """
+    Converts district names in any spelling and language into the categorical
+    dtype of registry in language. Each distinct name is looked up once.
+
+    Parameters
+    ----------
+    names : pandas.Series or list-like
+    registry : pandas.DataFrame
+        See build_district_registry.
+    language : str, optional
+        One of district_languages. The default is "eng".
+
+    Raises
+    ------
+    ValueError
+        If a name is not a district of registry.
+
+    Returns
+    -------
+    pandas.Series
+        With the index and the name of names. Missing names stay missing.
+
+    """
+    dtype = get_district_dtype(registry, language)
+    names = pd.Series(names)
+
+    codes, unique_names = pd.factorize(names)
+    registry_codes = dict(zip(registry.loc[:, "district_ascii"], range(len(registry))))
+    unique_ascii_names = [get_district_ascii_name(name) for name in unique_names]
+
+    unknown_names = [name for name, ascii_name in zip(unique_names, unique_ascii_names)
+                     if ascii_name not in registry_codes]
+    valerror_text = "names must be districts of registry, got {}".format(unknown_names)
+    if len(unknown_names) > 0:
+        raise ValueError(valerror_text)
+
+    #The last code is for the missing names, which pd.factorize codes as -1
+    unique_codes = np.array([registry_codes[ascii_name] for ascii_name in unique_ascii_names] + [-1])
+    district_codes = unique_codes[codes]
+
+    return pd.Series(pd.Categorical.from_codes(district_codes, dtype = dtype),
+                     index = names.index, name = names.name)
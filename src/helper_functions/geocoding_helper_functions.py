@@ -0,0 +1,490 @@
+# -*- coding: utf-8 -*-
+"""
+------ What is this file? ------
+
+This script contains some helper functions that are used to find the coordinates
+of places, such as the hair transplant clinics of
+src/data_preparation/scrape_web_for_hclinics.py
+The unit tests for these functions can be found at:
+     tests/unit_tests/helper_functions/test_geocoding_helper_functions.py
+
+A geocoder backend is a function that is called as backend(name, address) and
+returns a (lat, lon) tuple, or None if it can't find the place. Two backends are
+available:
+    - create_selenium_backend: searches Google Maps with a pool of Selenium
+      webdrivers, as the scraper always did with a single one.
+    - create_gazetteer_backend: looks places up in a table of known places,
+      e.g. the existing hair_clinics_raw.csv. It works offline.
+
+geocode_all runs a backend on many places at once:
+    - Places are looked up in a SQLite cache first, keyed by their normalized
+      name and address, so a place is geocoded once.
+    - The other places are geocoded by a pool of worker threads, within a rate limit.
+    - Each result is written to the cache as soon as it arrives, so an
+      interrupted run loses nothing.
+seed_geocode_cache writes places whose coordinates are already known to the
+cache, so that only new or renamed places are geocoded.
+
+"""
+#%% --- Import Required Packages ---
+
+import re #RegEx
+import time
+import queue
+import sqlite3
+import threading
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import pandas as pd
+from src.helper_functions.data_io_helper_functions import data_dir
+
+#%% --- DEFINITIONS ---
+
+#The geocode cache lives under data/cache, which is not tracked.
+geocode_cache_fp = data_dir.joinpath("cache", "geocode_cache.sqlite")
+
+google_maps_search_url = "https://www.google.com/maps/search/"
+
+#Turkish letters that unicodedata doesn't decompose into a base letter
+turkish_letters = str.maketrans({"ı": "i", "İ": "i", "ş": "s", "Ş": "s", "ğ": "g", "Ğ": "g"})
+
+#%% --- FUNCTION: normalize_query ---
+
+def normalize_text(text):
+    """
+    Lowercases text, removes accents and punctuation and collapses whitespace.
+    """
+    text = unicodedata.normalize("NFKD", str(text).translate(turkish_letters))
+    text = "".join(character for character in text if not unicodedata.combining(character))
+    text = re.sub(r"[^\w]+", " ", text.casefold())
+    return " ".join(text.split())
+
+def normalize_query(name, address = None):
+    """
+    Returns the cache key of a place: its name and address, normalized so
+    that spelling variants such as "Saç Ekim" and "SAC EKIM" share a key.
+
+    Parameters
+    ----------
+    name : str
+    address : str, optional
+        The default is None.
+
+    Returns
+    -------
+    str
+
+    """
+    valerror_text = "name must be a non-empty string, got {}".format(repr(name))
+    if not isinstance(name, str) or normalize_text(name) == "":
+        raise ValueError(valerror_text)
+
+    if address is None or pd.isna(address) or normalize_text(address) == "":
+        return normalize_text(name)
+    return "{}|{}".format(normalize_text(name), normalize_text(address))
+
+#%% --- FUNCTION: create_rate_limiter ---
+
+def create_rate_limiter(calls_per_second = None):
+    """
+    Creates a function that blocks its caller until the next call is allowed.
+    It can be shared by threads.
+
+    Parameters
+    ----------
+    calls_per_second : float, optional
+        The default is None, which doesn't limit the rate.
+
+    Returns
+    -------
+    function
+        Called without arguments before each call to the rate limited service.
+
+    """
+    valerror_text = "calls_per_second must be positive, got {}".format(calls_per_second)
+    if calls_per_second is not None and calls_per_second <= 0:
+        raise ValueError(valerror_text)
+
+    lock = threading.Lock()
+    next_call = [0.0]
+
+    def wait():
+        if calls_per_second is None:
+            return
+        with lock:
+            now = time.monotonic()
+            call_time = max(now, next_call[0])
+            next_call[0] = call_time + 1 / calls_per_second
+        time.sleep(max(0, call_time - now))
+
+    return wait
+
+#%% --- FUNCTION: open_geocode_cache ---
+
+def open_geocode_cache(cache_fp = geocode_cache_fp):
+    """
+    Opens the geocode cache, and creates it if it doesn't exist.
+
+    Parameters
+    ----------
+    cache_fp : pathlib.Path, optional
+        The default is data/cache/geocode_cache.sqlite
+
+    Returns
+    -------
+    sqlite3.Connection
+
+    """
+    cache_fp.parent.mkdir(parents = True, exist_ok = True)
+    connection = sqlite3.connect(str(cache_fp))
+    with connection:
+        connection.execute("CREATE TABLE IF NOT EXISTS geocodes ("
+                           "query_key TEXT PRIMARY KEY, name TEXT, address TEXT, "
+                           "lat REAL, lon REAL, backend TEXT, geocoded_at REAL)")
+    return connection
+
+def read_cached_geocodes(connection, query_keys):
+    """
+    Returns {query key: (lat, lon)} for the query keys that are in the cache.
+    """
+    cached = {}
+    query_keys = list(query_keys)
+    #SQLite limits the number of parameters of a query
+    for start in range(0, len(query_keys), 500):
+        batch = query_keys[start:start + 500]
+        rows = connection.execute("SELECT query_key, lat, lon FROM geocodes WHERE query_key IN ({})"
+                                  .format(", ".join("?" * len(batch))), batch)
+        cached.update({query_key: (lat, lon) for query_key, lat, lon in rows})
+    return cached
+
+def write_cached_geocode(connection, query_key, name, address, coordinates, backend_name):
+    """
+    Writes the coordinates of a place to the cache.
+    """
+    with connection:
+        connection.execute("INSERT OR REPLACE INTO geocodes VALUES (?, ?, ?, ?, ?, ?, ?)",
+                           (query_key, name, address, coordinates[0], coordinates[1],
+                            backend_name, time.time()))
+
+#%% --- FUNCTION: seed_geocode_cache ---
+
+def seed_geocode_cache(known_places, cache_fp = geocode_cache_fp, name_column = "hclinic_name",
+                       lat_column = "lat", lon_column = "lon", address_column = None,
+                       backend_name = "known_places"):
+    """
+    Writes the coordinates of known places, e.g. the hair_clinics_raw.csv of an
+    earlier scrape, to the cache, so that geocode_all carries them forward
+    instead of geocoding them again. Places that are already cached keep their
+    cached coordinates.
+
+    Parameters
+    ----------
+    known_places : pandas.DataFrame
+    cache_fp : pathlib.Path, optional
+        The default is data/cache/geocode_cache.sqlite
+    name_column : str, optional
+        The default is "hclinic_name".
+    lat_column : str, optional
+        The default is "lat".
+    lon_column : str, optional
+        The default is "lon".
+    address_column : str, optional
+        The default is None.
+    backend_name : str, optional
+        Recorded in the cache. The default is "known_places".
+
+    Returns
+    -------
+    int
+        The number of places that were added to the cache.
+
+    """
+    missing_columns = [column for column in [name_column, lat_column, lon_column, address_column]
+                       if column is not None and column not in known_places.columns]
+    valerror_text = "known_places doesn't have the columns {}".format(missing_columns)
+    if len(missing_columns) > 0:
+        raise ValueError(valerror_text)
+
+    known_places = known_places.dropna(subset = [name_column, lat_column, lon_column])
+    addresses = [None] * len(known_places) if address_column is None else known_places.loc[:, address_column]
+    rows = [(normalize_query(name, address), name, None if pd.isna(address) else address,
+             float(lat), float(lon), backend_name, time.time())
+            for name, address, lat, lon in zip(known_places.loc[:, name_column], addresses,
+                                               known_places.loc[:, lat_column], known_places.loc[:, lon_column])]
+
+    connection = open_geocode_cache(cache_fp)
+    try:
+        with connection:
+            added_count = connection.total_changes
+            connection.executemany("INSERT OR IGNORE INTO geocodes VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            added_count = connection.total_changes - added_count
+    finally:
+        connection.close()
+    return added_count
+
+#%% --- FUNCTION: diff_place_names ---
+
+def diff_place_names(names, known_names):
+    """
+    Compares a fresh list of place names with the names of an earlier list.
+    Names are compared by their normalized form, see normalize_query. A renamed
+    place shows up as one new and one removed name.
+
+    Parameters
+    ----------
+    names : list-like
+    known_names : list-like
+
+    Returns
+    -------
+    dict
+        {"new": names that are not known, "removed": known names that are not
+        in names anymore, "kept": names that are known}, each in the order of
+        its list.
+
+    """
+    names = list(names)
+    known_names = list(known_names)
+    query_keys = {normalize_query(name) for name in names}
+    known_query_keys = {normalize_query(name) for name in known_names}
+    return {"new": [name for name in names if normalize_query(name) not in known_query_keys],
+            "removed": [name for name in known_names if normalize_query(name) not in query_keys],
+            "kept": [name for name in names if normalize_query(name) in known_query_keys]}
+
+#%% --- FUNCTION: create_selenium_backend ---
+
+def parse_google_maps_coordinates(raw_str):
+    """
+    Parses the coordinates out of the content of the meta[itemprop=image]
+    element of a Google Maps search result, which reads like
+    "https://maps.google.com/maps/api/staticmap?center=41.05%2C28.98&zoom=..."
+
+    Returns
+    -------
+    tuple
+        (lat, lon) as floats.
+
+    """
+    valerror_text = "No coordinates found in {}".format(raw_str)
+    if "?center=" not in raw_str:
+        raise ValueError(valerror_text)
+
+    center_str = raw_str.split("?center=")[1].split("&zoom=")[0]
+    lat, lon = center_str.split("%2C")
+    return float(lat), float(lon)
+
+def quit_driver(driver):
+    """
+    Quits a webdriver, even one that no longer responds.
+    """
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+def create_selenium_backend(create_driver, search_url = google_maps_search_url, pool_size = 4,
+                            page_load_timeout = 30, retries = 2):
+    """
+    Creates a backend that searches Google Maps for each place with a pool of
+    Selenium webdrivers. A call borrows an idle webdriver from the pool, or
+    starts a new one if there are fewer than pool_size, and gives it back when
+    it is done. If a search fails, e.g. the page doesn't load within
+    page_load_timeout, the webdriver is quit and the search is retried with a
+    new one, so a crashed or stuck browser doesn't slow down the next searches.
+
+    Parameters
+    ----------
+    create_driver : function
+        Called without arguments. Returns a new selenium webdriver.
+    search_url : str, optional
+        The default is google_maps_search_url.
+    pool_size : int, optional
+        The number of webdrivers running at once. Use the max_workers of
+        geocode_all. The default is 4.
+    page_load_timeout : float, optional
+        Seconds. The default is 30.
+    retries : int, optional
+        How many times a failed search is retried. The default is 2.
+
+    Returns
+    -------
+    backend : function
+        See the module docstring. Raises the exception of the last attempt if
+        every attempt fails.
+    drivers : list
+        The webdrivers that are running. Quit them when geocoding is done.
+
+    """
+    valerror_text = "pool_size must be a positive integer, got {}".format(pool_size)
+    if not isinstance(pool_size, int) or pool_size < 1:
+        raise ValueError(valerror_text)
+
+    drivers = []
+    drivers_lock = threading.Lock()
+    idle_drivers = queue.LifoQueue()
+    pool_slots = threading.BoundedSemaphore(pool_size)
+
+    def borrow_driver():
+        try:
+            return idle_drivers.get_nowait()
+        except queue.Empty:
+            driver = create_driver()
+            driver.set_page_load_timeout(page_load_timeout)
+            with drivers_lock:
+                drivers.append(driver)
+            return driver
+
+    def recycle_driver(driver):
+        with drivers_lock:
+            drivers.remove(driver)
+        quit_driver(driver)
+
+    def backend(name, address = None):
+        query = name if address is None else "{} {}".format(name, address)
+        with pool_slots:
+            for attempt in range(retries + 1):
+                driver = borrow_driver()
+                try:
+                    driver.get(search_url + query)
+                    raw_str = driver.find_element_by_css_selector("meta[itemprop=image]").get_attribute("content")
+                    coordinates = parse_google_maps_coordinates(raw_str)
+                except Exception:
+                    recycle_driver(driver)
+                    if attempt == retries:
+                        raise
+                    continue
+                idle_drivers.put(driver)
+                return coordinates
+
+    return backend, drivers
+
+#%% --- FUNCTION: create_gazetteer_backend ---
+
+def create_gazetteer_backend(gazetteer, name_column = "hclinic_name", lat_column = "lat",
+                             lon_column = "lon", address_column = None):
+    """
+    Creates a backend that looks places up in a table of known places.
+    A place with an address that isn't in the table is looked up by its name only.
+
+    Parameters
+    ----------
+    gazetteer : pandas.DataFrame
+        e.g. hair_clinics_raw.csv
+    name_column : str, optional
+        The default is "hclinic_name".
+    lat_column : str, optional
+        The default is "lat".
+    lon_column : str, optional
+        The default is "lon".
+    address_column : str, optional
+        The default is None, which looks places up by their name only.
+
+    Returns
+    -------
+    function
+        See the module docstring.
+
+    """
+    missing_columns = [column for column in [name_column, lat_column, lon_column, address_column]
+                       if column is not None and column not in gazetteer.columns]
+    valerror_text = "The gazetteer doesn't have the columns {}".format(missing_columns)
+    if len(missing_columns) > 0:
+        raise ValueError(valerror_text)
+
+    gazetteer = gazetteer.dropna(subset = [name_column, lat_column, lon_column])
+    lookup = {}
+    for row in gazetteer.itertuples(index = False):
+        row = row._asdict()
+        coordinates = (float(row[lat_column]), float(row[lon_column]))
+        lookup.setdefault(normalize_query(row[name_column]), coordinates)
+        if address_column is not None:
+            lookup.setdefault(normalize_query(row[name_column], row[address_column]), coordinates)
+
+    def backend(name, address = None):
+        return lookup.get(normalize_query(name, address), lookup.get(normalize_query(name)))
+
+    return backend
+
+#%% --- FUNCTION: geocode_all ---
+
+def geocode_all(names, backend, addresses = None, backend_name = "backend", cache_fp = geocode_cache_fp,
+                max_workers = 4, calls_per_second = None):
+    """
+    Finds the coordinates of places, see the module docstring.
+
+    Parameters
+    ----------
+    names : list-like
+    backend : function
+        See the module docstring.
+    addresses : list-like, optional
+        One address per name. The default is None.
+    backend_name : str, optional
+        Recorded in the cache and in the source column. The default is "backend".
+    cache_fp : pathlib.Path, optional
+        The default is data/cache/geocode_cache.sqlite. None doesn't use the cache.
+    max_workers : int, optional
+        The number of places that are geocoded at once. The default is 4.
+    calls_per_second : float, optional
+        The maximum rate of calls to backend. The default is None, which
+        doesn't limit the rate.
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per name, in order, with the columns name, address, lat, lon and
+        source. source is "cache", backend_name, "not_found" if the backend
+        returned None, or "failed" if it raised an exception. Places that were
+        not found or failed are not cached, and are tried again by the next run.
+
+    """
+    valerror_text = "max_workers must be a positive integer, got {}".format(max_workers)
+    if not isinstance(max_workers, int) or max_workers < 1:
+        raise ValueError(valerror_text)
+
+    names = list(names)
+    addresses = [None] * len(names) if addresses is None else list(addresses)
+    valerror_text = "Got {} names and {} addresses".format(len(names), len(addresses))
+    if len(names) != len(addresses):
+        raise ValueError(valerror_text)
+
+    query_keys = [normalize_query(name, address) for name, address in zip(names, addresses)]
+    queries = dict(zip(query_keys, zip(names, addresses)))
+
+    connection = None if cache_fp is None else open_geocode_cache(cache_fp)
+    try:
+        cached = {} if connection is None else read_cached_geocodes(connection, queries.keys())
+        results = {query_key: (coordinates, "cache") for query_key, coordinates in cached.items()}
+
+        wait = create_rate_limiter(calls_per_second)
+        def geocode(name, address):
+            wait()
+            return backend(name, address)
+
+        with ThreadPoolExecutor(max_workers = max_workers) as executor:
+            futures = {executor.submit(geocode, name, address): query_key
+                       for query_key, (name, address) in queries.items() if query_key not in results}
+            for future in as_completed(futures):
+                query_key = futures[future]
+                try:
+                    coordinates = future.result()
+                except Exception as exception:
+                    print("Geocoding {} failed: {}".format(queries[query_key][0], repr(exception)))
+                    results[query_key] = (None, "failed")
+                    continue
+                if coordinates is None:
+                    results[query_key] = (None, "not_found")
+                    continue
+                results[query_key] = (coordinates, backend_name)
+                if connection is not None:
+                    write_cached_geocode(connection, query_key, *queries[query_key], coordinates, backend_name)
+    finally:
+        if connection is not None:
+            connection.close()
+
+    rows = []
+    for name, address, query_key in zip(names, addresses, query_keys):
+        coordinates, source = results[query_key]
+        lat, lon = (None, None) if coordinates is None else coordinates
+        rows.append((name, address, lat, lon, source))
+    return pd.DataFrame(rows, columns = ["name", "address", "lat", "lon", "source"]).astype({"lat": float, "lon": float})
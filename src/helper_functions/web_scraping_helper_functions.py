@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+"""
+------ What is this file? ------
+
+This script contains some helper functions that are used to fetch web pages
+for the web scraping scripts, such as src/data_preparation/scrape_web_for_hclinics.py
+The unit tests for these functions can be found at:
+     tests/unit_tests/helper_functions/test_web_scraping_helper_functions.py
+
+Pages are fetched concurrently by an asyncio event loop. The requests go through
+a pooled requests.Session, so connections to a site are reused, and a semaphore
+bounds the number of requests in flight. Failed requests are retried with an
+exponential backoff. fetch_all can be called from IPython or Spyder, whose event
+loop is already running: the pages are then fetched by a loop in a worker thread.
+
+Every response is cached on disk under data/cache/http, keyed by its URL, along
+with its ETag and Last-Modified headers. A page that is fetched again is
+requested conditionally, and if the site answers "304 Not Modified", the cached
+copy is used. Re-running a scrape when nothing changed costs one small request per page.
+
+"""
+#%% --- Import Required Packages ---
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+import functools
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from src.helper_functions.data_io_helper_functions import data_dir, get_temporary_fp
+
+#%% --- DEFINITIONS ---
+
+#The HTTP cache lives under data/cache, which is not tracked.
+http_cache_dir = data_dir.joinpath("cache", "http")
+
+#Responses with these status codes are retried, the other errors are raised.
+retry_status_codes = [429, 500, 502, 503, 504]
+
+default_headers = {"User-Agent": "Mozilla/5.0 (compatible; istanbul-health-tourism-research)"}
+
+#%% --- FUNCTION: create_session ---
+
+def create_session(pool_size = 8):
+    """
+    Creates a requests.Session that keeps up to pool_size connections open per site.
+
+    Parameters
+    ----------
+    pool_size : int, optional
+        The default is 8.
+
+    Returns
+    -------
+    requests.Session
+
+    """
+    valerror_text = "pool_size must be a positive integer, got {}".format(pool_size)
+    if not isinstance(pool_size, int) or pool_size < 1:
+        raise ValueError(valerror_text)
+
+    session = requests.Session()
+    session.headers.update(default_headers)
+    #Retries are done by fetch_all, with a backoff
+    adapter = HTTPAdapter(pool_connections = pool_size, pool_maxsize = pool_size, max_retries = 0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+#%% --- FUNCTION: read_cached_response ---
+
+def get_cache_fps(url, cache_dir):
+    """
+    Returns the paths of the metadata and of the body of the cached response to url.
+    """
+    url_hash = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    return cache_dir.joinpath(url_hash + ".json"), cache_dir.joinpath(url_hash + ".body")
+
+def read_cached_response(url, cache_dir):
+    """
+    Reads the cached response to url.
+
+    Parameters
+    ----------
+    url : str
+    cache_dir : pathlib.Path
+
+    Returns
+    -------
+    dict or None
+        {"url", "etag", "last_modified", "fetched_at", "content"}, or None if
+        url is not cached.
+
+    """
+    metadata_fp, body_fp = get_cache_fps(url, cache_dir)
+    try:
+        with open(metadata_fp, encoding = "utf-8") as metadata_file:
+            cached_response = json.load(metadata_file)
+        cached_response["content"] = body_fp.read_bytes()
+    except (OSError, ValueError):
+        return None
+    return cached_response
+
+#%% --- FUNCTION: write_cached_response ---
+
+def write_cached_response(url, content, etag, last_modified, cache_dir):
+    """
+    Writes a response to the cache. The body is written before the metadata and
+    both are moved into place, so a reader never sees a half-written response.
+
+    Parameters
+    ----------
+    url : str
+    content : bytes
+    etag : str or None
+    last_modified : str or None
+    cache_dir : pathlib.Path
+
+    Returns
+    -------
+    None.
+
+    """
+    cache_dir.mkdir(parents = True, exist_ok = True)
+    metadata_fp, body_fp = get_cache_fps(url, cache_dir)
+    metadata = {"url": url,
+                "etag": etag,
+                "last_modified": last_modified,
+                "fetched_at": time.time()}
+
+    temporary_fp = get_temporary_fp(body_fp)
+    temporary_fp.write_bytes(content)
+    os.replace(temporary_fp, body_fp)
+
+    temporary_fp = get_temporary_fp(metadata_fp)
+    with open(temporary_fp, "w", encoding = "utf-8") as metadata_file:
+        json.dump(metadata, metadata_file)
+    os.replace(temporary_fp, metadata_fp)
+
+#%% --- FUNCTION: fetch_url ---
+
+def fetch_url(session, url, cache_dir = None, timeout = 30):
+    """
+    Fetches url with a conditional request if a response to it is cached, and
+    caches the new response.
+
+    Parameters
+    ----------
+    session : requests.Session
+        See create_session
+    url : str
+    cache_dir : pathlib.Path, optional
+        The default is None, which doesn't use the cache.
+    timeout : float, optional
+        Seconds. The default is 30.
+
+    Raises
+    ------
+    requests.HTTPError
+        If the response is an error.
+
+    Returns
+    -------
+    bytes
+        The body of the response.
+
+    """
+    cached_response = None if cache_dir is None else read_cached_response(url, cache_dir)
+
+    headers = {}
+    if cached_response is not None:
+        if cached_response["etag"] is not None:
+            headers["If-None-Match"] = cached_response["etag"]
+        if cached_response["last_modified"] is not None:
+            headers["If-Modified-Since"] = cached_response["last_modified"]
+
+    response = session.get(url, headers = headers, timeout = timeout)
+
+    if response.status_code == 304 and cached_response is not None:
+        write_cached_response(url, cached_response["content"], cached_response["etag"],
+                              cached_response["last_modified"], cache_dir)
+        return cached_response["content"]
+
+    response.raise_for_status()
+
+    if cache_dir is not None:
+        write_cached_response(url, response.content, response.headers.get("ETag"),
+                              response.headers.get("Last-Modified"), cache_dir)
+    return response.content
+
+#%% --- FUNCTION: fetch_all ---
+
+#%%     --- Helper Functions ---
+
+def is_retryable(exception):
+    """
+    Returns True for connection errors, timeouts and the responses in retry_status_codes.
+    """
+    if isinstance(exception, requests.HTTPError):
+        return exception.response is not None and exception.response.status_code in retry_status_codes
+    return isinstance(exception, (requests.ConnectionError, requests.Timeout))
+
+async def fetch_with_retries(session, url, semaphore, executor, cache_dir, timeout, retries, backoff, max_age):
+    """
+    Fetches url in executor, with at most as many requests in flight as semaphore allows.
+    A retryable failure is retried after backoff, 2 * backoff, 4 * backoff... seconds.
+    """
+    if cache_dir is not None and max_age is not None:
+        cached_response = read_cached_response(url, cache_dir)
+        if cached_response is not None and time.time() - cached_response["fetched_at"] < max_age:
+            return cached_response["content"]
+
+    loop = asyncio.get_running_loop()
+    for attempt in range(retries + 1):
+        try:
+            async with semaphore:
+                return await loop.run_in_executor(executor, functools.partial(fetch_url, session, url,
+                                                                               cache_dir, timeout))
+        except requests.RequestException as exception:
+            if attempt == retries or not is_retryable(exception):
+                raise
+        await asyncio.sleep(backoff * 2 ** attempt)
+
+async def fetch_all_async(urls, concurrency, cache_dir, timeout, retries, backoff, max_age):
+    semaphore = asyncio.Semaphore(concurrency)
+    with create_session(concurrency) as session, ThreadPoolExecutor(max_workers = concurrency) as executor:
+        return await asyncio.gather(*[fetch_with_retries(session, url, semaphore, executor, cache_dir,
+                                                         timeout, retries, backoff, max_age)
+                                      for url in urls])
+
+#%%     --- Main Function ---
+
+def fetch_all(urls, concurrency = 8, cache_dir = http_cache_dir, timeout = 30, retries = 3,
+              backoff = 0.5, max_age = None):
+    """
+    Fetches urls concurrently. See the module docstring.
+
+    Parameters
+    ----------
+    urls : list
+    concurrency : int, optional
+        The number of requests in flight at once. The default is 8.
+    cache_dir : pathlib.Path, optional
+        The default is data/cache/http. None doesn't use the cache.
+    timeout : float, optional
+        Seconds per request. The default is 30.
+    retries : int, optional
+        How many times a failed request is retried. The default is 3.
+    backoff : float, optional
+        Seconds before the first retry. Doubles with each retry. The default is 0.5.
+    max_age : float, optional
+        Seconds. A page that was fetched less than max_age seconds ago is read
+        from the cache without a request. The default is None, which always
+        asks the site whether the page changed.
+
+    Raises
+    ------
+    requests.RequestException
+        If a page can't be fetched after the retries.
+
+    Returns
+    -------
+    list
+        The bodies of the responses, as bytes, in the order of urls.
+
+    """
+    valerror_text = "concurrency must be a positive integer, got {}".format(concurrency)
+    if not isinstance(concurrency, int) or concurrency < 1:
+        raise ValueError(valerror_text)
+
+    unique_urls = list(dict.fromkeys(urls))
+    fetch = functools.partial(asyncio.run, fetch_all_async(unique_urls, concurrency, cache_dir, timeout,
+                                                           retries, backoff, max_age))
+
+    #asyncio.run can't be called while an event loop is running in this thread
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        contents = fetch()
+    else:
+        with ThreadPoolExecutor(max_workers = 1) as executor:
+            contents = executor.submit(fetch).result()
+    contents = dict(zip(unique_urls, contents))
+    return [contents[url] for url in urls]
+
+#%% --- FUNCTION: crawl ---
+
+def crawl(start_urls, find_next_urls, max_pages = 100, **fetch_kwargs):
+    """
+    Fetches start_urls and the pages they lead to, e.g. the next pages of a
+    paginated directory. The pages are fetched level by level, each level
+    concurrently with fetch_all.
+
+    Parameters
+    ----------
+    start_urls : list
+    find_next_urls : function
+        Called as find_next_urls(url, content) for every fetched page. Returns
+        the urls to fetch next.
+    max_pages : int, optional
+        The crawl stops after max_pages pages. The default is 100.
+    **fetch_kwargs
+        Passed to fetch_all.
+
+    Returns
+    -------
+    dict
+        {url: content}, in the order the pages were found.
+
+    """
+    pages = {}
+    level = list(dict.fromkeys(start_urls))[:max_pages]
+    while len(level) > 0:
+        for url, content in zip(level, fetch_all(level, **fetch_kwargs)):
+            pages[url] = content
+
+        next_level = []
+        for url in level:
+            for next_url in find_next_urls(url, pages[url]):
+                if next_url not in pages and next_url not in next_level:
+                    next_level.append(next_url)
+        level = next_level[:max_pages - len(pages)]
+    return pages
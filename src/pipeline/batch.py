@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""
+------ What is this file? ------
+
+This module runs the pipeline for several (city, snapshot) pairs on a pool of
+processes. See build_registry in src/pipeline/registry.py for where the inputs
+and outputs of each pair live.
+
+A batch runs in two steps:
+    1. The stages that don't depend on the airbnb snapshot (the health tourism
+       centers and the district layers) run once per city.
+    2. Every snapshot runs on its own, reading the outputs of step 1 from disk.
+Within each step, the runs don't depend on each other and run side by side.
+
+Usage, from the project root:
+    python -m src.pipeline.batch                                 # Every snapshot of every city
+    python -m src.pipeline.batch --city istanbul --snapshot 2020-06-30 --snapshot 2021-06-30
+    python -m src.pipeline.batch --workers 2
+    python -m src.pipeline.batch --city istanbul --shared-only   # Step 1 only
+    python -m src.pipeline.batch --reuse-shared                  # Step 2 only
+
+"""
+#%% --- Import Required Packages ---
+
+import os
+import sys
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from src.helper_functions import data_io_helper_functions as data_io
+from src.pipeline import registry
+from src.pipeline.runner import run_pipeline
+
+#%% --- FUNCTION: get_shared_outputs ---
+
+def get_shared_outputs(stages):
+    """
+    Returns the outputs of the stages in registry.shared_stage_names that the
+    other stages read. They are written to disk by the run of step 1.
+
+    Parameters
+    ----------
+    stages : dict
+        See src/pipeline/registry.py
+
+    Returns
+    -------
+    list
+        Artifact names.
+
+    """
+    shared_outputs = [name for stage_name in registry.shared_stage_names if stage_name in stages
+                      for name in stages[stage_name]["outputs"]]
+    input_names = []
+    for stage_name, stage in stages.items():
+        if stage_name not in registry.shared_stage_names:
+            input_names.extend(stage["inputs"].values() if isinstance(stage["inputs"], dict) else stage["inputs"])
+    return [name for name in shared_outputs if name in input_names]
+
+#%% --- FUNCTION: plan_runs ---
+
+def plan_runs(cities = None, snapshots = None, project_root = None):
+    """
+    Lists the (city, snapshot) pairs of a batch.
+
+    Parameters
+    ----------
+    cities : list, optional
+        The default is None, which uses every city in registry.cities
+    snapshots : list, optional
+        The default is None, which uses every snapshot of each city in
+        data/raw/airbnb_snapshots/<city>
+    project_root : pathlib.Path, optional
+        The default is None, which uses the root of this repository.
+
+    Returns
+    -------
+    list
+        (city, snapshot) tuples.
+
+    """
+    project_root = data_io.project_root if project_root is None else project_root
+    cities = list(registry.cities.keys()) if cities is None else cities
+
+    runs = []
+    for city in cities:
+        city_snapshots = registry.list_snapshots(city, project_root) if snapshots is None else snapshots
+        runs.extend((city, snapshot) for snapshot in city_snapshots)
+    return runs
+
+#%% --- FUNCTION: run_shared_stages ---
+
+def run_shared_stages(city, use_cache = True):
+    """
+    Runs the stages of city that don't depend on the airbnb snapshot, and writes
+    the outputs that the snapshot runs read. Used as step 1 of run_batch.
+
+    Parameters
+    ----------
+    city : str
+    use_cache : bool, optional
+        The default is True.
+
+    Returns
+    -------
+    str
+        city
+
+    """
+    artifacts, stages = registry.build_registry(city)
+    persist = ([name for name, artifact in artifacts.items() if artifact.get("persist", False)] +
+               get_shared_outputs(stages))
+    run_pipeline(targets = registry.shared_stage_names, persist = persist, include_visualizations = False,
+                 use_cache = use_cache, label = city, stages = stages, artifacts = artifacts)
+    return city
+
+#%% --- FUNCTION: run_snapshot ---
+
+def run_snapshot(city, snapshot, use_cache = True):
+    """
+    Runs the stages of a snapshot of city. The outputs of run_shared_stages are
+    read from disk. Used as step 2 of run_batch.
+
+    Parameters
+    ----------
+    city : str
+    snapshot : str
+    use_cache : bool, optional
+        The default is True.
+
+    Returns
+    -------
+    tuple
+        (city, snapshot)
+
+    """
+    artifacts, stages = registry.build_registry(city, snapshot, reuse_shared = True)
+    run_pipeline(include_visualizations = False, use_cache = use_cache,
+                 label = "{}/{}".format(city, snapshot), stages = stages, artifacts = artifacts)
+    return city, snapshot
+
+#%% --- FUNCTION: run_batch ---
+
+def run_batch(runs, max_workers = None, run_shared = True, use_cache = True):
+    """
+    Runs the pipeline for every (city, snapshot) pair in runs on a pool of processes.
+
+    Parameters
+    ----------
+    runs : list
+        (city, snapshot) tuples, see plan_runs
+    max_workers : int, optional
+        The number of processes. The default is None, which uses the number of CPUs.
+    run_shared : bool, optional
+        Whether step 1 runs. If False, the shared outputs must already be on disk.
+        The default is True.
+    use_cache : bool, optional
+        Whether the stage cache is used, see src/pipeline/cache.py. The default is True.
+
+    Returns
+    -------
+    list
+        The (city, snapshot) pairs that were run.
+
+    """
+    cities = []
+    for city, snapshot in runs:
+        if city not in cities:
+            cities.append(city)
+
+    with ProcessPoolExecutor(max_workers = max_workers) as executor:
+        if run_shared:
+            list(executor.map(run_shared_stages, cities, [use_cache] * len(cities)))
+        futures = [executor.submit(run_snapshot, city, snapshot, use_cache) for city, snapshot in runs]
+        return [future.result() for future in futures]
+
+#%% --- Command line interface ---
+
+def parse_arguments(arguments):
+    parser = argparse.ArgumentParser(prog = "python -m src.pipeline.batch",
+                                     description = "Run the pipeline for several cities and airbnb snapshots.")
+    parser.add_argument("--city", action = "append",
+                        help = "A city to run. Can be repeated. Default: every city.")
+    parser.add_argument("--snapshot", action = "append",
+                        help = "A snapshot date to run, e.g. 2020-06-30. Can be repeated. Default: every snapshot.")
+    parser.add_argument("--workers", type = int, default = os.cpu_count(),
+                        help = "The number of processes. Default: the number of CPUs.")
+    shared_group = parser.add_mutually_exclusive_group()
+    shared_group.add_argument("--shared-only", action = "store_true",
+                              help = "Only run the stages that are shared by the snapshots of a city.")
+    shared_group.add_argument("--reuse-shared", action = "store_true",
+                              help = "Don't run the shared stages, read their outputs from disk.")
+    parser.add_argument("--no-cache", action = "store_true",
+                        help = "Don't restore outputs from, or store them in, the stage cache.")
+    return parser.parse_args(arguments)
+
+def main(arguments = None):
+    arguments = parse_arguments(sys.argv[1:] if arguments is None else arguments)
+    use_cache = not arguments.no_cache
+
+    if arguments.shared_only:
+        cities = list(registry.cities.keys()) if arguments.city is None else arguments.city
+        with ProcessPoolExecutor(max_workers = arguments.workers) as executor:
+            list(executor.map(run_shared_stages, cities, [use_cache] * len(cities)))
+        return
+
+    runs = plan_runs(arguments.city, arguments.snapshot)
+    if len(runs) == 0:
+        print("No snapshots found in {}".format(data_io.project_root.joinpath(registry.snapshots_dir)))
+        return
+    run_batch(runs, max_workers = arguments.workers, run_shared = not arguments.reuse_shared,
+              use_cache = use_cache)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+"""
+------ What is this file? ------
+
+This module contains a content-addressed cache for the outputs of the pipeline
+stages, used by src/pipeline/runner.py
+
+The outputs of a stage are stored under data/cache/stages/<stage>/<key>, where
+the key is a hash of:
+    - the source code of the stage function and of the src functions it calls,
+      with the values of the module-level constants and of the default
+      arguments that they read
+    - its parameters, e.g. the IQR multiplier and the selected districts
+    - the contents of its inputs. An intermediary dataset is hashed through
+      its cached copy, so it doesn't need to be written to data/ to be hashed.
+    - how its outputs are written, and the pandas/geopandas versions
+
+The outputs are stored in the same format as on disk, so restoring a persisted
+output is a file copy. If a stage is re-run and its outputs don't change, the
+stages downstream of it are still restored from the cache.
+
+"""
+#%% --- Import Required Packages ---
+
+import os
+import json
+import types
+import re #RegEx
+import shutil
+import hashlib
+import inspect
+from pathlib import Path # To wrap around filepaths
+import pandas as pd
+import geopandas as gpd
+from src.helper_functions import data_io_helper_functions as data_io
+
+#%% --- DEFINITIONS ---
+
+#Relative to the project root. data/cache is not tracked and is not cleared by clear_data_output.py
+stage_cache_dir = Path("data/cache/stages")
+
+#%% --- FUNCTION: calculate_code_hash ---
+
+def get_referenced_names(code):
+    """
+    Returns the global names used by a code object and the code objects nested
+    in it (comprehensions, lambdas, inner functions).
+    """
+    names = set(code.co_names)
+    for constant in code.co_consts:
+        if isinstance(constant, types.CodeType):
+            names |= get_referenced_names(constant)
+    return names
+
+def describe_value(value):
+    """
+    Describes a constant as JSON-serializable data, or returns None if value is
+    not plain data, e.g. a lock or a client, whose repr changes from run to run.
+    """
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, bytes):
+        return value.hex()
+    if isinstance(value, Path):
+        return str(value)
+    if isinstance(value, re.Pattern):
+        return [value.pattern, value.flags]
+    if isinstance(value, (list, tuple)):
+        return [describe_value(item) for item in value]
+    if isinstance(value, (set, frozenset)):
+        #Sets are sorted, their order changes with the hash seed
+        return sorted((describe_value(item) for item in value), key = repr)
+    if isinstance(value, dict):
+        return sorted(([describe_value(key), describe_value(item)] for key, item in value.items()), key = repr)
+    return None
+
+def calculate_code_hash(function, seen = None):
+    """
+    Calculates a sha256 hash of the source code of function and of every
+    function of the src package that it calls, directly or indirectly.
+    The source files of the src modules it uses as modules are hashed as a whole.
+    For the functions of the src package, the values of the module-level
+    constants they read and of their default arguments are hashed too, so
+    editing e.g. institution_vocabulary changes the hash of the stages that use it.
+
+    Parameters
+    ----------
+    function : function
+    seen : set, optional
+        Used in recursion to visit each function once. The default is None.
+
+    Returns
+    -------
+    str
+        The hexdigest of the sha256 hash.
+
+    """
+    valerror_text = "function must be a python function, got {}".format(type(function))
+    if not inspect.isfunction(function):
+        raise ValueError(valerror_text)
+
+    seen = set() if seen is None else seen
+    seen.add(function)
+
+    code_hash = hashlib.sha256(inspect.getsource(function).encode("utf-8"))
+    is_src_function = function.__module__.startswith("src.")
+
+    #Default arguments are evaluated when the function is defined, possibly from
+    #constants of other modules
+    if is_src_function:
+        defaults = list(function.__defaults__ or ()) + sorted((function.__kwdefaults__ or {}).items())
+        code_hash.update(json.dumps(describe_value(defaults)).encode("utf-8"))
+        for default in list(function.__defaults__ or ()) + list((function.__kwdefaults__ or {}).values()):
+            if inspect.isfunction(default) and default.__module__.startswith("src.") and default not in seen:
+                code_hash.update(calculate_code_hash(default, seen).encode("utf-8"))
+
+    for name in sorted(get_referenced_names(function.__code__)):
+        referenced = function.__globals__.get(name)
+        if is_src_function and not callable(referenced) and not inspect.ismodule(referenced):
+            description = describe_value(referenced)
+            if description is not None:
+                code_hash.update(json.dumps([name, description]).encode("utf-8"))
+        if inspect.isfunction(referenced) and referenced.__module__.startswith("src."):
+            if referenced not in seen:
+                code_hash.update(calculate_code_hash(referenced, seen).encode("utf-8"))
+        elif inspect.ismodule(referenced) and referenced.__name__.startswith("src."):
+            if referenced not in seen:
+                seen.add(referenced)
+                code_hash.update(data_io.calculate_file_hash(inspect.getsourcefile(referenced)).encode("utf-8"))
+
+    return code_hash.hexdigest()
+
+#%% --- FUNCTION: calculate_stage_key ---
+
+def calculate_stage_key(stage_name, stage, input_keys, output_artifacts):
+    """
+    Calculates the cache key of a stage.
+
+    Parameters
+    ----------
+    stage_name : str
+    stage : dict
+        See src/pipeline/registry.py
+    input_keys : dict
+        {argument name: content hash of the input}, see calculate_source_key
+    output_artifacts : dict
+        {artifact name: artifact} for the outputs of the stage.
+
+    Returns
+    -------
+    str
+        The hexdigest of a sha256 hash.
+
+    """
+    description = {"stage": stage_name,
+                   "code": calculate_code_hash(stage["function"]),
+                   "params": stage.get("params", {}),
+                   "inputs": input_keys,
+                   "outputs": {name: {key: str(value) for key, value in artifact.items() if key != "persist"}
+                               for name, artifact in output_artifacts.items()},
+                   "versions": [pd.__version__, gpd.__version__]}
+    description = json.dumps(description, sort_keys = True, default = str)
+    return hashlib.sha256(description.encode("utf-8")).hexdigest()
+
+#%% --- FUNCTION: calculate_source_key ---
+
+def calculate_source_key(path):
+    """
+    Calculates the key of a dataset that is read from disk, i.e. a hash of its
+    contents. A folder (a partitioned dataset) is hashed file by file.
+
+    Parameters
+    ----------
+    path : pathlib.Path
+
+    Returns
+    -------
+    str
+
+    """
+    if path.is_dir():
+        source_hash = hashlib.sha256()
+        for fp in sorted(fp for fp in path.rglob("*") if fp.is_file()):
+            source_hash.update(str(fp.relative_to(path)).encode("utf-8"))
+            source_hash.update(data_io.calculate_file_hash(fp).encode("utf-8"))
+        return source_hash.hexdigest()
+    return data_io.calculate_file_hash(path)
+
+#%% --- FUNCTION: copy_artifact ---
+
+def copy_artifact(source_fp, target_fp, kind):
+    """
+    Copies the files of an artifact. The sidecar files of a shapefile are copied
+    along with it, and a partitioned dataset is copied as a folder.
+    Each file is copied to a temporary path first and then moved into place.
+
+    Parameters
+    ----------
+    source_fp : pathlib.Path
+    target_fp : pathlib.Path
+    kind : str
+        See src/pipeline/registry.py
+
+    Returns
+    -------
+    None.
+
+    """
+    target_fp.parent.mkdir(parents = True, exist_ok = True)
+
+    if kind == "partitioned":
+        temporary_dir = data_io.get_temporary_fp(target_fp)
+        shutil.copytree(source_fp, temporary_dir)
+        if target_fp.exists():
+            shutil.rmtree(target_fp)
+        os.replace(temporary_dir, target_fp)
+        return
+
+    if kind == "shapefile":
+        source_fps = [source_fp.with_suffix(extension) for extension in data_io.shapefile_sidecar_extensions]
+        source_fps = [fp for fp in source_fps if fp.is_file()]
+    else:
+        source_fps = [source_fp]
+
+    for fp in source_fps:
+        target_sidecar_fp = target_fp.with_suffix(fp.suffix)
+        temporary_fp = data_io.get_temporary_fp(target_sidecar_fp)
+        shutil.copyfile(fp, temporary_fp)
+        os.replace(temporary_fp, target_sidecar_fp)
+
+#%% --- FUNCTION: get_cache_entry ---
+
+def get_cache_entry(cache_dir, stage_name, key, output_artifacts):
+    """
+    Returns the location of the cached copies of the outputs of a stage.
+
+    Parameters
+    ----------
+    cache_dir : pathlib.Path
+    stage_name : str
+    key : str
+        See calculate_stage_key
+    output_artifacts : dict
+        {artifact name: artifact} for the outputs of the stage.
+
+    Returns
+    -------
+    entry_dir : pathlib.Path
+        The folder of the cached copies. It exists only if the outputs are cached.
+    cached_artifacts : dict
+        {artifact name: artifact}, with the path pointing at the cached copy.
+
+    """
+    entry_dir = cache_dir.joinpath(stage_name, key)
+    cached_artifacts = {name: dict(artifact, path = entry_dir.joinpath(Path(artifact["path"]).name))
+                        for name, artifact in output_artifacts.items()}
+    return entry_dir, cached_artifacts
+
+#%% --- FUNCTION: store_cache_entry ---
+
+def store_cache_entry(entry_dir, cached_artifacts, write_output):
+    """
+    Writes the cached copies of the outputs of a stage into a temporary folder and
+    moves the folder into place once every output is written. An interrupted
+    write never leaves an incomplete entry behind.
+
+    Parameters
+    ----------
+    entry_dir : pathlib.Path
+    cached_artifacts : dict
+        {artifact name: artifact}, as returned by get_cache_entry
+    write_output : function
+        Called as write_output(artifact name, cached artifact) for each output.
+        Writes the output to the path of the cached artifact.
+
+    Returns
+    -------
+    None.
+
+    """
+    temporary_dir = data_io.get_temporary_fp(entry_dir)
+    if temporary_dir.exists():
+        shutil.rmtree(temporary_dir)
+    temporary_dir.mkdir(parents = True)
+
+    for name, cached_artifact in cached_artifacts.items():
+        temporary_artifact = dict(cached_artifact, path = temporary_dir.joinpath(cached_artifact["path"].name))
+        write_output(name, temporary_artifact)
+
+    #Another run may have stored the same entry in the meantime. Both are equal.
+    if entry_dir.exists():
+        shutil.rmtree(temporary_dir)
+    else:
+        os.replace(temporary_dir, entry_dir)
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+------ What is this file? ------
+
+This module runs long computations in chunks and checkpoints each chunk, so that
+a run that crashes or is interrupted resumes from the last completed chunk
+instead of starting over. It is used by the nearest neighbor analysis.
+
+A checkpoint folder holds:
+    - chunk_<number>.pkl: the result of each completed chunk
+    - manifest.json: the key of the computation, its chunk size and the
+      completed chunks
+
+Each chunk and the manifest are written to a temporary file first and then moved
+into place, so a crash never leaves a half-written checkpoint behind. The key is
+a hash of the data and of anything else the result depends on. If the key of a
+run doesn't match the manifest, the old checkpoints are discarded.
+
+Checkpoints are kept under data/cache/checkpoints, which is not tracked.
+
+"""
+#%% --- Import Required Packages ---
+
+import os
+import json
+import shutil
+import hashlib
+from pathlib import Path # To wrap around filepaths
+import pandas as pd
+import geopandas as gpd
+from src.helper_functions import data_io_helper_functions as data_io
+
+#%% --- DEFINITIONS ---
+
+#Relative to the project root
+checkpoints_dir = Path("data/cache/checkpoints")
+
+manifest_name = "manifest.json"
+
+#%% --- FUNCTION: calculate_checkpoint_key ---
+
+def calculate_checkpoint_key(data, *parts):
+    """
+    Calculates the key of a chunked computation over data.
+
+    Parameters
+    ----------
+    data : pandas.DataFrame or geopandas.GeoDataFrame
+        The data that is split into chunks. Its values, index and column names are hashed.
+    *parts
+        Anything else the result depends on, e.g. the other inputs or the
+        parameters. Hashed through their string representation.
+
+    Returns
+    -------
+    str
+        The hexdigest of a sha256 hash.
+
+    """
+    valerror_text = "data must be a pandas.DataFrame, got {}".format(type(data))
+    if not isinstance(data, pd.DataFrame):
+        raise ValueError(valerror_text)
+
+    #Geometries are hashed as WKB, geometry by geometry as in
+    #data_io_helper_functions.geodataframe_to_table, since geopandas 0.8 has no to_wkb
+    if isinstance(data, gpd.GeoDataFrame):
+        geometry_wkb = [geom.wkb if geom is not None else None for geom in data.geometry]
+        data = pd.DataFrame(data).assign(**{data.geometry.name: geometry_wkb})
+    key = hashlib.sha256(pd.util.hash_pandas_object(data, index = True).values.tobytes())
+    key.update(json.dumps([str(column) for column in data.columns]).encode("utf-8"))
+    for part in parts:
+        key.update(str(part).encode("utf-8"))
+    return key.hexdigest()
+
+#%% --- FUNCTION: read_manifest ---
+
+def read_manifest(checkpoint_dir):
+    """
+    Reads the manifest of a checkpoint folder.
+
+    Parameters
+    ----------
+    checkpoint_dir : pathlib.Path
+
+    Returns
+    -------
+    dict or None
+        None if there is no manifest, or if it can't be read.
+
+    """
+    manifest_fp = checkpoint_dir.joinpath(manifest_name)
+    try:
+        with open(manifest_fp, encoding = "utf-8") as manifest_file:
+            return json.load(manifest_file)
+    except (OSError, ValueError):
+        return None
+
+#%% --- FUNCTION: write_manifest ---
+
+def write_manifest(manifest, checkpoint_dir):
+    """
+    Writes the manifest of a checkpoint folder to a temporary file and then moves it into place.
+
+    Parameters
+    ----------
+    manifest : dict
+    checkpoint_dir : pathlib.Path
+
+    Returns
+    -------
+    None.
+
+    """
+    manifest_fp = checkpoint_dir.joinpath(manifest_name)
+    temporary_fp = data_io.get_temporary_fp(manifest_fp)
+    with open(temporary_fp, "w", encoding = "utf-8") as manifest_file:
+        json.dump(manifest, manifest_file, indent = 1)
+    os.replace(temporary_fp, manifest_fp)
+
+#%% --- FUNCTION: run_in_chunks ---
+
+def get_chunk_fp(checkpoint_dir, chunk_number):
+    return checkpoint_dir.joinpath("chunk_{:05d}.pkl".format(chunk_number))
+
+def run_in_chunks(function, data, chunk_size, checkpoint_dir, key, **kwargs):
+    """
+    Calls function on consecutive chunks of the rows of data and concatenates the
+    results. The result of each chunk is checkpointed in checkpoint_dir. Chunks
+    that were completed by an earlier run with the same key and chunk size are
+    read from their checkpoints instead of being computed again.
+
+    Parameters
+    ----------
+    function : function
+        Called as function(chunk, **kwargs). Returns a pandas.DataFrame or a
+        geopandas.GeoDataFrame that only depends on the rows of chunk.
+    data : pandas.DataFrame or geopandas.GeoDataFrame
+    chunk_size : int
+        The number of rows of data per chunk.
+    checkpoint_dir : pathlib.Path
+        A folder used by this computation only.
+    key : str
+        See calculate_checkpoint_key
+    **kwargs
+        Passed to function.
+
+    Returns
+    -------
+    pandas.DataFrame or geopandas.GeoDataFrame
+        The results of the chunks in order, with a new RangeIndex.
+
+    """
+    valerror_text = "chunk_size must be a positive integer, got {}".format(chunk_size)
+    if not isinstance(chunk_size, int) or chunk_size < 1:
+        raise ValueError(valerror_text)
+
+    #An empty data still makes one chunk, so that the result has the right columns
+    chunk_count = max(1, -(-len(data) // chunk_size))
+
+    manifest = read_manifest(checkpoint_dir)
+    if manifest is None or manifest["key"] != key or manifest["chunk_size"] != chunk_size:
+        if checkpoint_dir.exists():
+            shutil.rmtree(checkpoint_dir)
+        manifest = {"key": key, "chunk_size": chunk_size, "chunk_count": chunk_count, "completed": []}
+    checkpoint_dir.mkdir(parents = True, exist_ok = True)
+
+    #Left behind by a run that was interrupted while writing a chunk
+    for temporary_fp in checkpoint_dir.glob("*.tmp"):
+        temporary_fp.unlink()
+
+    results = []
+    for chunk_number in range(chunk_count):
+        chunk_fp = get_chunk_fp(checkpoint_dir, chunk_number)
+        if chunk_number in manifest["completed"] and chunk_fp.is_file():
+            results.append(pd.read_pickle(chunk_fp))
+            continue
+
+        chunk = data.iloc[chunk_number * chunk_size:(chunk_number + 1) * chunk_size]
+        result = function(chunk, **kwargs)
+
+        temporary_fp = data_io.get_temporary_fp(chunk_fp)
+        result.to_pickle(temporary_fp)
+        os.replace(temporary_fp, chunk_fp)
+        manifest["completed"] = sorted(set(manifest["completed"]) | {chunk_number})
+        write_manifest(manifest, checkpoint_dir)
+
+        results.append(result)
+
+    return pd.concat(results, ignore_index = True)
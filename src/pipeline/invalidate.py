@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+------ What is this file? ------
+
+This module removes the outputs that depend on a change, and only those, so that
+the next run of doit or of src/pipeline/runner.py recomputes them and nothing else.
+
+A change is given as one of:
+    - a stage name: the stage changed. Its outputs and everything downstream
+      of them are removed.
+    - an artifact name or a path, e.g. data/raw/istanbul_airbnb_raw.csv: the
+      dataset changed. Everything downstream of it is removed, the dataset itself is kept.
+
+The stage cache entries of the removed stages are removed too, see src/pipeline/cache.py
+
+Usage, from the project root:
+    python -m src.pipeline.invalidate visualize_price_distribution_of_airbnb_rentals_kdeplot
+    python -m src.pipeline.invalidate data/raw/istanbul_airbnb_raw.csv --dry-run
+
+Unlike clear_data_output.py and clear_viz_output.py, which remove every output,
+this keeps the nearest neighbor analysis when only a visualization changes.
+
+"""
+#%% --- Import Required Packages ---
+
+import sys
+import shutil
+import argparse
+from pathlib import Path # To wrap around filepaths
+from src.helper_functions import data_io_helper_functions as data_io
+from src.pipeline import cache as stage_cache
+from src.pipeline.runner import resolve_stage_order
+from src.pipeline.registry import artifacts as registered_artifacts
+from src.pipeline.registry import stages as registered_stages
+
+#%% --- FUNCTION: find_artifact ---
+
+def find_artifact(path, artifacts, project_root):
+    """
+    Finds the artifact that is stored at path. A sidecar file of a shapefile
+    and a file within a partitioned dataset belong to their artifact.
+
+    Parameters
+    ----------
+    path : pathlib.Path or str
+        Relative to project_root, or absolute.
+    artifacts : dict
+    project_root : pathlib.Path
+
+    Returns
+    -------
+    str or None
+        The name of the artifact, or None if no artifact is stored at path.
+
+    """
+    path = project_root.joinpath(path).resolve()
+    for artifact_name, artifact in artifacts.items():
+        artifact_path = project_root.joinpath(artifact["path"]).resolve()
+        if path == artifact_path or artifact_path in path.parents:
+            return artifact_name
+        if artifact["kind"] in ["shapefile", "reference_shapefile"] and path.with_suffix(".shp") == artifact_path:
+            return artifact_name
+    return None
+
+#%% --- FUNCTION: get_invalidated_stages ---
+
+def get_invalidated_stages(changes, stages, artifacts, project_root):
+    """
+    Finds the stages that have to run again after changes.
+
+    Parameters
+    ----------
+    changes : list
+        Stage names, artifact names or paths, see the module docstring.
+    stages, artifacts : dict
+        See src/pipeline/registry.py
+    project_root : pathlib.Path
+
+    Returns
+    -------
+    list
+        Stage names, in the order they run.
+
+    """
+    changed_stages = set()
+    changed_artifacts = set()
+    unknown_changes = []
+    for change in changes:
+        if change in stages:
+            changed_stages.add(change)
+        elif change in artifacts:
+            changed_artifacts.add(change)
+        elif find_artifact(change, artifacts, project_root) is not None:
+            changed_artifacts.add(find_artifact(change, artifacts, project_root))
+        else:
+            unknown_changes.append(change)
+
+    valerror_text = "Unknown stages, artifacts or paths: {}".format(unknown_changes)
+    if len(unknown_changes) > 0:
+        raise ValueError(valerror_text)
+
+    #Stages come in dependency order, so one pass reaches everything downstream
+    invalidated = []
+    for stage_name in resolve_stage_order(stages):
+        stage = stages[stage_name]
+        input_names = stage["inputs"].values() if isinstance(stage["inputs"], dict) else stage["inputs"]
+        if stage_name in changed_stages or len(changed_artifacts.intersection(input_names)) > 0:
+            invalidated.append(stage_name)
+            changed_artifacts.update(stage["outputs"])
+    return invalidated
+
+#%% --- FUNCTION: remove_artifact ---
+
+def remove_artifact(path, kind, dry_run = False):
+    """
+    Removes the files of an artifact. The sidecar files of a shapefile are
+    removed along with it. Any other path is removed as a single file or folder.
+
+    Parameters
+    ----------
+    path : pathlib.Path
+    kind : str
+        See src/pipeline/registry.py
+    dry_run : bool, optional
+        If True, nothing is removed. The default is False.
+
+    Returns
+    -------
+    list
+        The paths that were removed, or would be removed if dry_run is True.
+
+    """
+    if kind == "shapefile":
+        paths = [path.with_suffix(extension) for extension in data_io.shapefile_sidecar_extensions]
+    else:
+        paths = [path]
+    paths = [fp for fp in paths if fp.exists()]
+
+    if not dry_run:
+        for fp in paths:
+            if fp.is_dir():
+                shutil.rmtree(fp)
+            else:
+                fp.unlink()
+    return paths
+
+#%% --- FUNCTION: invalidate ---
+
+def invalidate(changes, dry_run = False, stages = None, artifacts = None, project_root = None):
+    """
+    Removes the outputs, and the stage cache entries, of every stage downstream of changes.
+
+    Parameters
+    ----------
+    changes : list
+        Stage names, artifact names or paths, see the module docstring.
+    dry_run : bool, optional
+        If True, nothing is removed. The default is False.
+    stages, artifacts : dict, optional
+        The default is None, which uses src/pipeline/registry.py
+    project_root : pathlib.Path, optional
+        The default is None, which uses the root of this repository.
+
+    Returns
+    -------
+    invalidated_stages : list
+        See get_invalidated_stages
+    removed_paths : list
+        The paths that were removed, or would be removed if dry_run is True.
+
+    """
+    stages = registered_stages if stages is None else stages
+    artifacts = registered_artifacts if artifacts is None else artifacts
+    project_root = data_io.project_root if project_root is None else Path(project_root)
+    cache_dir = project_root.joinpath(stage_cache.stage_cache_dir)
+
+    invalidated_stages = get_invalidated_stages(changes, stages, artifacts, project_root)
+
+    removed_paths = []
+    for stage_name in invalidated_stages:
+        for artifact_name in stages[stage_name]["outputs"]:
+            artifact = artifacts[artifact_name]
+            removed_paths.extend(remove_artifact(project_root.joinpath(artifact["path"]),
+                                                 artifact["kind"], dry_run = dry_run))
+        removed_paths.extend(remove_artifact(cache_dir.joinpath(stage_name), "cache", dry_run = dry_run))
+
+    return invalidated_stages, removed_paths
+
+#%% --- Command line interface ---
+
+def parse_arguments(arguments):
+    parser = argparse.ArgumentParser(prog = "python -m src.pipeline.invalidate",
+                                     description = "Remove the outputs that depend on a changed stage or dataset.")
+    parser.add_argument("changes", nargs = "+",
+                        help = "Stage names, artifact names or paths of changed datasets.")
+    parser.add_argument("--dry-run", action = "store_true",
+                        help = "Only print what would be removed.")
+    return parser.parse_args(arguments)
+
+def main(arguments = None):
+    arguments = parse_arguments(sys.argv[1:] if arguments is None else arguments)
+    invalidated_stages, removed_paths = invalidate(arguments.changes, dry_run = arguments.dry_run)
+
+    print("--- Stages to run again ---")
+    for stage_name in invalidated_stages:
+        print(stage_name)
+    print("--- {} ---".format("Would remove" if arguments.dry_run else "Removed"))
+    for path in removed_paths:
+        print(path)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,390 @@
+# -*- coding: utf-8 -*-
+"""
+------ What is this file? ------
+
+This module keeps a ledger of the pipeline runs of src/pipeline/runner.py in
+reports/pipeline_runs.jsonl, one run per line. For every stage of a run, the
+ledger records:
+    - wall time and CPU time
+    - the peak memory (RSS) of the process during the stage, on Linux
+    - the row counts of the inputs and outputs that went through memory
+    - the bytes read from and written to disk
+
+A run that fails is recorded too, with the status "failed", its error, the stages
+that finished and the stage that failed.
+
+Only the runs of src/pipeline/runner.py are recorded. The scripts that doit runs
+one by one are not.
+
+Usage, from the project root:
+    python -m src.pipeline.ledger list                 # List the recorded runs
+    python -m src.pipeline.ledger summary              # Summarize the last run
+    python -m src.pipeline.ledger summary -2           # Summarize the run before it
+    python -m src.pipeline.ledger compare              # Compare the last two runs
+    python -m src.pipeline.ledger compare <run_id> -1  # Compare a run with the last run
+
+"""
+#%% --- Import Required Packages ---
+
+import os
+import sys
+import json
+import time
+import argparse
+import datetime
+import subprocess
+from pathlib import Path # To wrap around filepaths
+import pandas as pd
+from src.helper_functions import data_io_helper_functions as data_io
+
+#%% --- DEFINITIONS ---
+
+#Relative to the project root. The ledger is not tracked.
+ledger_fp = Path("reports/pipeline_runs.jsonl")
+
+#Measurements of a stage that are compared between runs
+compared_measurements = ["wall_time_s", "cpu_time_s", "peak_rss_mb", "bytes_read", "bytes_written"]
+
+#%% --- FUNCTION: reset_peak_rss ---
+
+def reset_peak_rss():
+    """
+    Resets the peak resident set size of the current process to its current
+    resident set size, so that get_peak_rss_mb measures the peak from now on.
+    Only Linux can reset it, through /proc/self/clear_refs.
+
+    Returns
+    -------
+    bool
+        False if the peak can't be reset on this platform.
+
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as clear_refs_file:
+            clear_refs_file.write("5")
+    except OSError:
+        return False
+    return True
+
+#%% --- FUNCTION: get_peak_rss_mb ---
+
+def get_peak_rss_mb():
+    """
+    Returns the peak resident set size of the current process since the last
+    reset_peak_rss, in megabytes. Returns None if it can't be read.
+    """
+    try:
+        with open("/proc/self/status") as status_file:
+            for line in status_file:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+#%% --- FUNCTION: get_artifact_size ---
+
+def get_artifact_size(path, kind):
+    """
+    Returns the size of an artifact on disk, in bytes. The sidecar files of a
+    shapefile and every file of a partitioned dataset are counted.
+
+    Parameters
+    ----------
+    path : pathlib.Path
+    kind : str
+        See src/pipeline/registry.py
+
+    Returns
+    -------
+    int
+        0 if the artifact doesn't exist.
+
+    """
+    path = Path(path)
+    if path.is_dir():
+        return sum(fp.stat().st_size for fp in path.rglob("*") if fp.is_file())
+    if kind in ["shapefile", "reference_shapefile"]:
+        sidecar_fps = [path.with_suffix(extension) for extension in data_io.shapefile_sidecar_extensions]
+        return sum(fp.stat().st_size for fp in sidecar_fps if fp.is_file())
+    return path.stat().st_size if path.is_file() else 0
+
+#%% --- FUNCTION: start_stage_record ---
+
+def start_stage_record(stage_name, status):
+    """
+    Starts the measurements of a stage.
+
+    Parameters
+    ----------
+    stage_name : str
+    status : str
+        "run" for a stage that is run, "cached" for a stage that is restored
+        from the stage cache and "script" for a visualization script.
+
+    Returns
+    -------
+    dict
+        The record of the stage. input_rows, output_rows, bytes_read and
+        bytes_written are filled in by the runner.
+
+    """
+    #The peak is only that of the stage if it was reset when the stage started
+    is_peak_rss_reset = reset_peak_rss()
+    return {"stage": stage_name,
+            "status": status,
+            "input_rows": {},
+            "output_rows": {},
+            "bytes_read": 0,
+            "bytes_written": 0,
+            "started": (time.perf_counter(), time.process_time(), is_peak_rss_reset)}
+
+#%% --- FUNCTION: finish_stage_record ---
+
+def finish_stage_record(record):
+    """
+    Finishes the measurements of a stage, in place. peak_rss_mb is the peak
+    memory of the runner process during the stage, or None where it can't be
+    measured per stage. A script runs in its own process, which isn't measured.
+
+    Parameters
+    ----------
+    record : dict
+        As returned by start_stage_record
+
+    Returns
+    -------
+    dict
+        record
+
+    """
+    wall_start, cpu_start, is_peak_rss_reset = record.pop("started")
+    record["wall_time_s"] = round(time.perf_counter() - wall_start, 3)
+    record["cpu_time_s"] = round(time.process_time() - cpu_start, 3)
+    record["peak_rss_mb"] = get_peak_rss_mb() if is_peak_rss_reset else None
+    return record
+
+#%% --- FUNCTION: get_git_commit ---
+
+def get_git_commit(project_root):
+    """
+    Returns the commit that project_root is checked out at, or None if it can't
+    be determined.
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd = str(project_root),
+                                stdout = subprocess.PIPE, stderr = subprocess.DEVNULL,
+                                universal_newlines = True, check = True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit.stdout.strip()
+
+#%% --- FUNCTION: start_run_record ---
+
+def start_run_record(project_root, **options):
+    """
+    Starts the record of a pipeline run.
+
+    Parameters
+    ----------
+    project_root : pathlib.Path
+    **options
+        The options the pipeline is run with, e.g. targets and persist.
+
+    Returns
+    -------
+    dict
+        status is "running" until the runner sets it to "succeeded" or "failed".
+
+    """
+    started = datetime.datetime.now()
+    return {"run_id": "{}-{}".format(started.strftime("%Y%m%dT%H%M%S"), os.getpid()),
+            "started": started.isoformat(timespec = "seconds"),
+            "commit": get_git_commit(project_root),
+            "status": "running",
+            "options": options,
+            "stages": []}
+
+#%% --- FUNCTION: append_run ---
+
+def append_run(run, ledger_fp):
+    """
+    Appends a run to the ledger at ledger_fp.
+
+    Parameters
+    ----------
+    run : dict
+    ledger_fp : pathlib.Path
+
+    Returns
+    -------
+    None.
+
+    """
+    ledger_fp.parent.mkdir(parents = True, exist_ok = True)
+    with open(ledger_fp, "a", encoding = "utf-8") as ledger_file:
+        ledger_file.write(json.dumps(run, default = str) + "\n")
+
+#%% --- FUNCTION: read_runs ---
+
+def read_runs(ledger_fp):
+    """
+    Reads every run in the ledger at ledger_fp, oldest first.
+
+    Parameters
+    ----------
+    ledger_fp : pathlib.Path
+
+    Returns
+    -------
+    list
+
+    """
+    if not ledger_fp.is_file():
+        return []
+    with open(ledger_fp, encoding = "utf-8") as ledger_file:
+        return [json.loads(line) for line in ledger_file if line.strip() != ""]
+
+#%% --- FUNCTION: select_run ---
+
+def select_run(runs, run):
+    """
+    Selects a run by its run id, or by its position in runs (e.g. -1 for the last run).
+
+    Parameters
+    ----------
+    runs : list
+        As returned by read_runs
+    run : str
+
+    Returns
+    -------
+    dict
+
+    """
+    for candidate in runs:
+        if candidate["run_id"] == run:
+            return candidate
+
+    valerror_text = "No run {} in the ledger, which has {} runs".format(run, len(runs))
+    try:
+        return runs[int(run)]
+    except (ValueError, IndexError):
+        raise ValueError(valerror_text)
+
+#%% --- FUNCTION: summarize_run ---
+
+def summarize_run(run):
+    """
+    Summarizes the stages of a run.
+
+    Parameters
+    ----------
+    run : dict
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per stage, with the measurements and the total input and output rows.
+
+    """
+    summary = pd.DataFrame(run["stages"])
+    if summary.empty:
+        return summary
+    for column in ["input_rows", "output_rows"]:
+        summary.loc[:,column] = [sum(rows.values()) if len(rows) > 0 else None
+                                 for rows in summary.loc[:,column]]
+    return summary.set_index("stage").loc[:,["status", "input_rows", "output_rows"] + compared_measurements]
+
+#%% --- FUNCTION: compare_runs ---
+
+def compare_runs(run_a, run_b):
+    """
+    Compares the stages of two runs.
+
+    Parameters
+    ----------
+    run_a, run_b : dict
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per stage, with each measurement in run_a and run_b and the
+        relative change from run_a to run_b in percent.
+
+    """
+    summary_a = summarize_run(run_a)
+    summary_b = summarize_run(run_b)
+    comparison = summary_a.join(summary_b, how = "outer", lsuffix = "_a", rsuffix = "_b")
+
+    columns = ["status_a", "status_b"]
+    for measurement in compared_measurements:
+        before = comparison.loc[:,measurement + "_a"].astype(float)
+        after = comparison.loc[:,measurement + "_b"].astype(float)
+        comparison.loc[:,measurement + "_change_%"] = ((after - before) / before * 100).round(1)
+        columns.extend([measurement + "_a", measurement + "_b", measurement + "_change_%"])
+
+    #Keep the stage order of the newer run
+    stage_order = list(summary_b.index) + [stage for stage in summary_a.index if stage not in summary_b.index]
+    return comparison.loc[stage_order, columns]
+
+#%% --- FUNCTION: describe_run ---
+
+def describe_run(run):
+    """
+    Describes a run in one line: its id, commit and status, and its error if it failed.
+    Runs recorded before the status was recorded only recorded successful runs.
+    """
+    description = "{} (commit {}, {})".format(run["run_id"], run["commit"], run.get("status", "succeeded"))
+    if "error" in run:
+        description += " {}".format(run["error"])
+    return description
+
+#%% --- Command line interface ---
+
+def parse_arguments(arguments):
+    parser = argparse.ArgumentParser(prog = "python -m src.pipeline.ledger",
+                                     description = "Summarize and compare the recorded pipeline runs.")
+    subparsers = parser.add_subparsers(dest = "command")
+    subparsers.required = True
+    subparsers.add_parser("list", help = "List the recorded runs.")
+    summary_parser = subparsers.add_parser("summary", help = "Summarize a run.")
+    summary_parser.add_argument("run", nargs = "?", default = "-1",
+                                help = "Run id or position in the ledger. Default: the last run.")
+    compare_parser = subparsers.add_parser("compare", help = "Compare two runs.")
+    compare_parser.add_argument("run_a", nargs = "?", default = "-2",
+                                help = "Run id or position in the ledger. Default: the run before the last run.")
+    compare_parser.add_argument("run_b", nargs = "?", default = "-1",
+                                help = "Run id or position in the ledger. Default: the last run.")
+    return parser.parse_args(arguments)
+
+def main(arguments = None):
+    arguments = parse_arguments(sys.argv[1:] if arguments is None else arguments)
+    runs = read_runs(data_io.project_root.joinpath(ledger_fp))
+
+    with pd.option_context("display.max_columns", None, "display.width", 250):
+        if arguments.command == "list":
+            for run in runs:
+                total_time = sum(stage["wall_time_s"] for stage in run["stages"])
+                print("{}  commit {}  {:<9}  {:>8.1f} s  {}".format(run["run_id"], run["commit"], run.get("status", "succeeded"),
+                                                                   total_time, run["options"]))
+        elif arguments.command == "summary":
+            if len(runs) == 0:
+                print("The ledger has no runs yet. Run the pipeline with python -m src.pipeline.runner first.")
+                return
+            run = select_run(runs, arguments.run)
+            print("--- {} ---".format(describe_run(run)))
+            print(summarize_run(run).to_string())
+        elif arguments.command == "compare":
+            if len(runs) < 2:
+                print("compare needs two runs, the ledger has {}. Run the pipeline with "
+                      "python -m src.pipeline.runner again, then compare the last two runs with:\n"
+                      "    python -m src.pipeline.ledger compare".format(len(runs)))
+                return
+            run_a = select_run(runs, arguments.run_a)
+            run_b = select_run(runs, arguments.run_b)
+            print("--- {} -> {} ---".format(describe_run(run_a), describe_run(run_b)))
+            print(compare_runs(run_a, run_b).to_string())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+"""
+------ What is this file? ------
+
+This module profiles pipeline stages without any change to their code. A profile
+is written to reports/profiles/<stage>/<timestamp>, and holds, depending on the mode:
+    - "cprofile": profile.prof, the cProfile statistics of the stage, which can
+      be opened with "python -m pstats" or snakeviz, and profile.txt, the 40
+      functions with the highest cumulative time.
+    - "sample": stacks.collapsed, the call stacks of the stage sampled every
+      5 milliseconds, in the collapsed format that py-spy writes with
+      "--format raw". It is the input of flamegraph.pl, and can be opened in
+      speedscope. Sampling adds little overhead, unlike cProfile.
+    - "all": both.
+
+The mode is taken from the PIPELINE_PROFILE environment variable, or from the
+--profile option of src/pipeline/runner.py
+
+Usage, from the project root:
+    python -m src.pipeline.runner --profile cprofile                      # Profile every stage
+    python -m src.pipeline.runner --profile sample --profile-stage run_nearest_neighbor_analysis
+    PIPELINE_PROFILE=all doit -a process_airbnb_data                      # Profile the script of a doit task
+    python -m src.pipeline.profiling src/data_preparation/process_airbnb_data.py --profile sample
+
+"""
+#%% --- Import Required Packages ---
+
+import os
+import sys
+import runpy
+import pstats
+import cProfile
+import argparse
+import datetime
+import threading
+import collections
+from pathlib import Path # To wrap around filepaths
+from src.helper_functions import data_io_helper_functions as data_io
+
+#%% --- DEFINITIONS ---
+
+#Relative to the project root. The profiles are not tracked.
+profiles_dir = Path("reports/profiles")
+
+profile_modes = ["cprofile", "sample", "all"]
+profile_env_var = "PIPELINE_PROFILE"
+
+#Seconds between two samples of the call stack
+sampling_interval = 0.005
+
+#The number of functions in profile.txt
+summary_length = 40
+
+#%% --- FUNCTION: get_profile_mode ---
+
+def get_profile_mode(mode = None):
+    """
+    Returns the profiling mode, or None if stages are not profiled.
+
+    Parameters
+    ----------
+    mode : str, optional
+        One of profile_modes, or "off". The default is None, which reads the
+        PIPELINE_PROFILE environment variable.
+
+    Returns
+    -------
+    str or None
+
+    """
+    mode = os.environ.get(profile_env_var, "") if mode is None else mode
+    mode = mode.strip().lower()
+    if mode in ["", "off"]:
+        return None
+
+    valerror_text = "The profile mode must be one of {} or off, got {}".format(profile_modes, mode)
+    if mode not in profile_modes:
+        raise ValueError(valerror_text)
+    return mode
+
+#%% --- FUNCTION: get_profile_dir ---
+
+def get_profile_dir(stage_name, project_root):
+    """
+    Returns a new folder for a profile of stage_name.
+
+    Parameters
+    ----------
+    stage_name : str
+    project_root : pathlib.Path
+
+    Returns
+    -------
+    pathlib.Path
+        reports/profiles/<stage_name>/<timestamp>-<process id>
+
+    """
+    timestamp = datetime.datetime.now().strftime("%Y%m%dT%H%M%S")
+    return project_root.joinpath(profiles_dir, stage_name, "{}-{}".format(timestamp, os.getpid()))
+
+#%% --- FUNCTION: collapse_stack ---
+
+def collapse_stack(frame, project_root):
+    """
+    Formats the call stack that ends at frame as a line of a collapsed stacks
+    file: the calls from the outermost to the innermost, separated by ";".
+    Each call reads "function (path:line)", with the line the function starts
+    at, so that samples from anywhere in a function add up.
+
+    Parameters
+    ----------
+    frame : frame
+    project_root : pathlib.Path
+        Paths within project_root are shown relative to it.
+
+    Returns
+    -------
+    str
+
+    """
+    calls = []
+    while frame is not None:
+        code = frame.f_code
+        path = Path(code.co_filename)
+        try:
+            path = path.relative_to(project_root)
+        except ValueError:
+            pass
+        calls.append("{} ({}:{})".format(code.co_name, path.as_posix(), code.co_firstlineno))
+        frame = frame.f_back
+    return ";".join(reversed(calls))
+
+#%% --- FUNCTION: start_sampler ---
+
+def start_sampler(thread_id, project_root, interval = sampling_interval):
+    """
+    Starts sampling the call stack of a thread from a background thread.
+
+    Parameters
+    ----------
+    thread_id : int
+        See threading.get_ident
+    project_root : pathlib.Path
+    interval : float, optional
+        Seconds between two samples. The default is sampling_interval.
+
+    Returns
+    -------
+    stop_event : threading.Event
+        Set it to stop sampling.
+    sampler : threading.Thread
+        Join it after stop_event is set.
+    stack_counts : collections.Counter
+        {collapsed stack: number of samples}, see collapse_stack
+
+    """
+    stop_event = threading.Event()
+    stack_counts = collections.Counter()
+
+    def sample():
+        while not stop_event.wait(interval):
+            frame = sys._current_frames().get(thread_id)
+            if frame is not None:
+                stack_counts[collapse_stack(frame, project_root)] += 1
+
+    sampler = threading.Thread(target = sample, name = "stack-sampler", daemon = True)
+    sampler.start()
+    return stop_event, sampler, stack_counts
+
+#%% --- FUNCTION: write_collapsed_stacks ---
+
+def write_collapsed_stacks(stack_counts, fp):
+    """
+    Writes sampled stacks as a collapsed stacks file: one "<stack> <samples>"
+    line per stack.
+
+    Parameters
+    ----------
+    stack_counts : collections.Counter
+        As returned by start_sampler
+    fp : pathlib.Path
+
+    Returns
+    -------
+    None.
+
+    """
+    with open(fp, "w", encoding = "utf-8") as stacks_file:
+        for stack, count in sorted(stack_counts.items()):
+            stacks_file.write("{} {}\n".format(stack, count))
+
+#%% --- FUNCTION: profile_call ---
+
+def profile_call(function, stage_name, mode, project_root, **kwargs):
+    """
+    Calls function(**kwargs) under the profiler and writes the profile, even if
+    function raises an exception.
+
+    Parameters
+    ----------
+    function : function
+    stage_name : str
+        The profile is written to a new folder in reports/profiles/<stage_name>
+    mode : str
+        One of profile_modes
+    project_root : pathlib.Path
+    **kwargs
+        Passed to function.
+
+    Returns
+    -------
+    result
+        What function returns.
+    profile_dir : pathlib.Path
+        The folder the profile was written to.
+
+    """
+    valerror_text = "The profile mode must be one of {}, got {}".format(profile_modes, mode)
+    if mode not in profile_modes:
+        raise ValueError(valerror_text)
+
+    profile_dir = get_profile_dir(stage_name, project_root)
+    profile_dir.mkdir(parents = True, exist_ok = True)
+
+    profiler = cProfile.Profile() if mode in ["cprofile", "all"] else None
+    sampling = start_sampler(threading.get_ident(), project_root) if mode in ["sample", "all"] else None
+
+    try:
+        if profiler is not None:
+            profiler.enable()
+        result = function(**kwargs)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        if sampling is not None:
+            stop_event, sampler, stack_counts = sampling
+            stop_event.set()
+            sampler.join()
+            write_collapsed_stacks(stack_counts, profile_dir.joinpath("stacks.collapsed"))
+        if profiler is not None:
+            profiler.dump_stats(str(profile_dir.joinpath("profile.prof")))
+            with open(profile_dir.joinpath("profile.txt"), "w", encoding = "utf-8") as summary_file:
+                pstats.Stats(profiler, stream = summary_file).sort_stats("cumulative").print_stats(summary_length)
+
+    return result, profile_dir
+
+#%% --- FUNCTION: profile_script ---
+
+def profile_script(script_fp, mode, project_root):
+    """
+    Runs a script under the profiler, as if it was run with "python script_fp".
+    The profile is stored under the name of the script, e.g. process_airbnb_data.
+
+    Parameters
+    ----------
+    script_fp : pathlib.Path
+    mode : str
+        One of profile_modes
+    project_root : pathlib.Path
+
+    Returns
+    -------
+    pathlib.Path
+        The folder the profile was written to.
+
+    """
+    script_fp = Path(script_fp).resolve()
+    working_directory = os.getcwd()
+    try:
+        _, profile_dir = profile_call(runpy.run_path, script_fp.stem, mode, project_root,
+                                      path_name = str(script_fp), run_name = "__main__")
+    finally:
+        os.chdir(working_directory)
+    return profile_dir
+
+#%% --- Command line interface ---
+
+def parse_arguments(arguments):
+    parser = argparse.ArgumentParser(prog = "python -m src.pipeline.profiling",
+                                     description = "Run a pipeline script under the profiler.")
+    parser.add_argument("script",
+                        help = "The script to run, e.g. src/data_preparation/process_airbnb_data.py")
+    parser.add_argument("--profile", choices = profile_modes,
+                        help = "Default: the PIPELINE_PROFILE environment variable, or cprofile if it isn't set.")
+    return parser.parse_args(arguments)
+
+def main(arguments = None):
+    arguments = parse_arguments(sys.argv[1:] if arguments is None else arguments)
+    mode = arguments.profile or get_profile_mode() or "cprofile"
+    profile_dir = profile_script(arguments.script, mode, data_io.project_root)
+    print("Profile written to {}".format(profile_dir))
+
+if __name__ == "__main__":
+    main()
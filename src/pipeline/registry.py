@@ -0,0 +1,388 @@
+# -*- coding: utf-8 -*-
+"""
+------ What is this file? ------
+
+This module describes the pipeline as two dictionaries, in the same spirit as
+the task dictionaries of dodo.py:
+
+    artifacts -- Every dataset that a stage reads or writes.
+        path : Location of the dataset, relative to the project root.
+        kind : How the dataset is read, written and handed over in memory. One of
+               "csv", "shapefile", "partitioned", "airbnb_listings",
+               "reference_shapefile", "reference_excel", or "figures" for the
+               folder of figures that a visualization script saves.
+        persist : Whether the runner writes the dataset to disk by default.
+                  Datasets that are read by the visualization scripts or by the
+                  data quality tests are persisted.
+        encoding, partition_column : Passed to the writer, where relevant.
+
+    stages -- Every step of the pipeline, in dodo.py order.
+        function : A stage function from src/pipeline/stages.py, or None for
+                   the visualization scripts, which are run as scripts.
+        script : The script that the stage belongs to.
+        inputs : {argument name of function: artifact name}. For scripts,
+                 a list of artifact names.
+        params : Keyword arguments that are passed to function as they are.
+        outputs : Artifact names that function returns.
+
+The pipeline can be run for any city in cities and any dated InsideAirbnb
+snapshot of it, see build_registry. Each (city, snapshot) run writes to its own
+folders. The health tourism centers and the district layers don't depend on the
+snapshot, so they are processed once per city and shared by its snapshots.
+The module level artifacts and stages describe the original run: Istanbul,
+with data/raw/istanbul_airbnb_raw.csv.
+
+"""
+#%% --- Import Required Packages ---
+
+import datetime
+from pathlib import Path # To wrap around filepaths
+from src.pipeline import stages as stage_functions
+from src.pipeline.checkpoints import checkpoints_dir
+
+#%% --- DEFINITIONS: parameters ---
+
+#Prices within +/- iqr_multiplier * IQR count as normalized
+iqr_multiplier = 1.5
+
+#%% --- DEFINITIONS: cities and snapshots ---
+
+#The city the project was built for. Its outputs stay at the top of data/processed,
+#data/final and media/figures/raw, the outputs of other cities go to a folder per city.
+home_city = "istanbul"
+
+#The inputs of each city that don't change from one airbnb snapshot to the next.
+#selected_districts: the five districts with the most health tourism centers
+cities = {
+    "istanbul": {"airbnb_raw": Path("data/raw/istanbul_airbnb_raw.csv"),
+                 "healthservices_raw": Path("data/raw/istanbul_healthservices_raw.csv"),
+                 "hair_clinics_raw": Path("data/raw/hair_clinics_raw.csv"),
+                 "districts": Path("data/external/istanbul_districts.shp"),
+                 "district_income": Path("data/external/district_income.xlsx"),
+                 "selected_districts": ["Sisli", "Besiktas", "Kadikoy", "Atasehir", "Uskudar"]},
+}
+
+selected_districts = cities[home_city]["selected_districts"]
+
+#Dated InsideAirbnb listings files go to data/raw/airbnb_snapshots/<city>/<snapshot>.csv,
+#where snapshot is the date of the snapshot, e.g. 2020-06-30
+snapshots_dir = Path("data/raw/airbnb_snapshots")
+snapshot_date_format = "%Y-%m-%d"
+
+#Stages that don't depend on the airbnb snapshot. They run once per city.
+shared_stage_names = ["process_health_services_data",
+                      "convert_hclinic_coords_to_points",
+                      "convert_aesthetic_clinic_to_shapefile",
+                      "combine_aesthethic_clinic_hclinic_shapefiles",
+                      "analyze_geographic_distribution_of_htourism_centers"]
+
+#The figure folder of each visualization script, as in dodo.py
+figure_folders = {
+    "visualize_geographic_distribution_of_htourism_centers": "visualize_geographic_distribution_of_htourism",
+    "visualize_bivariate_analysis_htourism_center_count_at_district_level": "visualize_bivariate_analysis_htourism_center_count_at_district_level",
+    "visualize_geographic_distribution_of_airbnb_rentals": "visualize_geographic_distribution_airbnb",
+    "visualize_bivariate_analysis_airbnb_count_at_district_level": "visualize_bivariate_analysis_airbnb_count_at_district_level",
+    "visualize_price_distribution_of_airbnb_rentals_kdeplot": "visualize_price_distribution_of_airbnb_rentals_kdeplot",
+    "visualize_nearest_neighbor_analysis_confirmation": "visualize_nearest_neighbor_analysis_confirmation",
+    "visualize_nearest_neighbor_analysis_correlation_results": "visualize_nearest_neighbor_analysis_correlation_results"}
+
+#%% --- FUNCTION: get_namespace ---
+
+def get_namespace(city, snapshot = None):
+    """
+    Returns the folder that the outputs of a run are written to, relative to
+    data/processed and data/final.
+
+    Parameters
+    ----------
+    city : str
+    snapshot : str, optional
+        The default is None, which returns the folder of the outputs that are
+        shared by the snapshots of city.
+
+    Returns
+    -------
+    pathlib.Path
+
+    """
+    namespace = Path() if city == home_city else Path(city)
+    return namespace if snapshot is None else namespace.joinpath(snapshot)
+
+#%% --- FUNCTION: list_snapshots ---
+
+def list_snapshots(city, project_root):
+    """
+    Lists the dated airbnb snapshots of city, oldest first.
+
+    Parameters
+    ----------
+    city : str
+    project_root : pathlib.Path
+
+    Returns
+    -------
+    list
+
+    """
+    city_snapshots_dir = project_root.joinpath(snapshots_dir, city)
+    if not city_snapshots_dir.is_dir():
+        return []
+    return sorted(fp.stem for fp in city_snapshots_dir.glob("*.csv"))
+
+#%% --- FUNCTION: build_registry ---
+
+def build_registry(city = home_city, snapshot = None, reuse_shared = False):
+    """
+    Builds the artifacts and stages of the run of the pipeline for city and snapshot.
+
+    Parameters
+    ----------
+    city : str, optional
+        One of the keys of cities. The default is home_city.
+    snapshot : str, optional
+        The date of a snapshot in data/raw/airbnb_snapshots/<city>, e.g. 2020-06-30.
+        The default is None, which uses the airbnb_raw file of the city.
+    reuse_shared : bool, optional
+        If True, the stages in shared_stage_names are left out and their outputs
+        are read from disk, where the run of the city without a snapshot
+        put them. The default is False.
+
+    Returns
+    -------
+    artifacts : dict
+    stages : dict
+
+    """
+    valerror_text = "Unknown city: {}. Known cities are {}".format(city, list(cities.keys()))
+    if city not in cities:
+        raise ValueError(valerror_text)
+
+    if snapshot is not None:
+        valerror_text = "snapshot must be a date formatted as YYYY-MM-DD, got {}".format(snapshot)
+        try:
+            datetime.datetime.strptime(snapshot, snapshot_date_format)
+        except (TypeError, ValueError):
+            raise ValueError(valerror_text)
+
+    city_inputs = cities[city]
+    city_selected_districts = city_inputs["selected_districts"]
+
+    #Outputs shared by the snapshots of the city, and outputs of this snapshot
+    shared_processed_dir = Path("data/processed").joinpath(get_namespace(city))
+    shared_final_dir = Path("data/final").joinpath(get_namespace(city))
+    processed_dir = Path("data/processed").joinpath(get_namespace(city, snapshot))
+    final_dir = Path("data/final").joinpath(get_namespace(city, snapshot))
+
+    if snapshot is None:
+        airbnb_raw_fp = city_inputs["airbnb_raw"]
+    else:
+        airbnb_raw_fp = snapshots_dir.joinpath(city, "{}.csv".format(snapshot))
+
+    #%% --- artifacts ---
+
+    artifacts = {
+        # --- Sources ---
+        "istanbul_airbnb_raw": {"path": airbnb_raw_fp,
+                                "kind": "airbnb_listings"},
+        "istanbul_healthservices_raw": {"path": city_inputs["healthservices_raw"],
+                                        "kind": "csv"},
+        "hair_clinics_raw": {"path": city_inputs["hair_clinics_raw"],
+                             "kind": "csv"},
+        "istanbul_districts": {"path": city_inputs["districts"],
+                               "kind": "reference_shapefile"},
+        "district_income": {"path": city_inputs["district_income"],
+                            "kind": "reference_excel"},
+        # --- data/processed ---
+        "istanbul_airbnb_processed": {"path": processed_dir.joinpath("istanbul_airbnb_processed.csv"),
+                                      "kind": "csv",
+                                      "persist": True},
+        "istanbul_airbnb_processed_shapefile": {"path": processed_dir.joinpath("istanbul_airbnb_processed_shapefile.shp"),
+                                                "kind": "shapefile",
+                                                "encoding": "utf-8-sig",
+                                                "persist": True},
+        "istanbul_airbnb_processed_partitioned": {"path": processed_dir.joinpath("istanbul_airbnb_processed_partitioned"),
+                                                  "kind": "partitioned",
+                                                  "partition_column": "district_eng",
+                                                  "persist": True},
+        "istanbul_aesthethic_centers_processed": {"path": shared_processed_dir.joinpath("istanbul_aesthethic_centers_processed.csv"),
+                                                  "kind": "csv",
+                                                  "persist": False},
+        "istanbul_aesthethic_centers_processed_shapefile": {"path": shared_processed_dir.joinpath("istanbul_aesthethic_centers_processed_shapefile.shp"),
+                                                            "kind": "shapefile",
+                                                            "encoding": "utf-8-sig",
+                                                            "persist": False},
+        "hair_clinics_processed": {"path": shared_processed_dir.joinpath("hair_clinics_processed.shp"),
+                                   "kind": "shapefile",
+                                   "encoding": "utf-8-sig",
+                                   "persist": False},
+        "htourism_centers_processed": {"path": shared_processed_dir.joinpath("htourism_centers_processed.shp"),
+                                       "kind": "shapefile",
+                                       "encoding": "utf-8-sig",
+                                       "persist": True},
+        # --- data/final ---
+        "nn_analysis_results_all": {"path": final_dir.joinpath("nn_analysis_results_all.csv"),
+                                    "kind": "csv",
+                                    "persist": True},
+        "nn_analysis_results_normalized": {"path": final_dir.joinpath("nn_analysis_results_normalized.csv"),
+                                           "kind": "csv",
+                                           "persist": True},
+        "distance_price_dataset": {"path": final_dir.joinpath("distance_price_dataset.shp"),
+                                   "kind": "shapefile",
+                                   "persist": True},
+        "distance_price_dataset_partitioned": {"path": final_dir.joinpath("distance_price_dataset_partitioned"),
+                                               "kind": "partitioned",
+                                               "partition_column": "district_e",
+                                               "persist": True},
+        "geographic_distribution_of_htourism_centers": {"path": shared_final_dir.joinpath("geographic_distribution_of_htourism_centers.shp"),
+                                                        "kind": "shapefile",
+                                                        "encoding": "utf-8",
+                                                        "persist": True},
+        "geographic_distribution_of_airbnb_rentals": {"path": final_dir.joinpath("geographic_distribution_of_airbnb_rentals.shp"),
+                                                      "kind": "shapefile",
+                                                      "encoding": "utf-8",
+                                                      "persist": True},
+    }
+
+    #One result per selected district
+    for district in city_selected_districts:
+        artifacts["nn_analysis_results_norm_{}".format(district.lower())] = {
+            "path": final_dir.joinpath("nn_analysis_results_norm_{}.csv".format(district.lower())),
+            "kind": "csv",
+            "persist": True}
+
+    #%% --- stages ---
+
+    stages = {
+        "process_airbnb_data": {
+            "function": stage_functions.process_airbnb_data,
+            "script": Path("src/data_preparation/process_airbnb_data.py"),
+            "inputs": {"airbnb_raw": "istanbul_airbnb_raw",
+                       "istanbul_districts": "istanbul_districts"},
+            "outputs": ["istanbul_airbnb_processed"]},
+        "process_health_services_data": {
+            "function": stage_functions.process_health_services_data,
+            "script": Path("src/data_preparation/process_health_services_data.py"),
+            "inputs": {"hservices": "istanbul_healthservices_raw",
+                       "istanbul_districts": "istanbul_districts"},
+            "outputs": ["istanbul_aesthethic_centers_processed"]},
+        "convert_hclinic_coords_to_points": {
+            "function": stage_functions.convert_hclinic_coords_to_points,
+            "script": Path("src/data_preparation/convert_hclinic_coords_to_points.py"),
+            "inputs": {"hclinic_df": "hair_clinics_raw",
+                       "istanbul_districts": "istanbul_districts"},
+            "outputs": ["hair_clinics_processed"]},
+        "convert_aesthetic_clinic_to_shapefile": {
+            "function": stage_functions.convert_aesthetic_clinic_to_shapefile,
+            "script": Path("src/data_preparation/convert_aesthethic_clinic_to_shapefile.py"),
+            "inputs": {"acenters_df": "istanbul_aesthethic_centers_processed",
+                       "hclinics_gdf": "hair_clinics_processed"},
+            "outputs": ["istanbul_aesthethic_centers_processed_shapefile"]},
+        "combine_aesthethic_clinic_hclinic_shapefiles": {
+            "function": stage_functions.combine_aesthethic_clinic_hclinic_shapefiles,
+            "script": Path("src/data_preparation/combine_aesthethic_clinic_hclinic_shapefiles.py"),
+            "inputs": {"hclinics_gdf": "hair_clinics_processed",
+                       "acenters_gdf": "istanbul_aesthethic_centers_processed_shapefile",
+                       "istanbul_districts": "istanbul_districts"},
+            "outputs": ["htourism_centers_processed"]},
+        "convert_airbnb_data_to_shapefile": {
+            "function": stage_functions.convert_airbnb_data_to_shapefile,
+            "script": Path("src/data_preparation/convert_airbnb_data_to_shapefile.py"),
+            "inputs": {"airbnb_df": "istanbul_airbnb_processed",
+                       "hclinics_gdf": "hair_clinics_processed",
+                       "istanbul_districts": "istanbul_districts"},
+            "outputs": ["istanbul_airbnb_processed_shapefile",
+                        "istanbul_airbnb_processed_partitioned"]},
+        "run_nearest_neighbor_analysis": {
+            "function": stage_functions.run_nearest_neighbor_analysis,
+            "script": Path("src/data_analysis/nearest_neighbor_analysis.py"),
+            "inputs": {"airbnb_gdf": "istanbul_airbnb_processed_shapefile",
+                       "htourism_gdf": "htourism_centers_processed"},
+            "params": {"selected_districts": city_selected_districts,
+                       "iqr_multiplier": iqr_multiplier,
+                       "checkpoint_dir": checkpoints_dir.joinpath(get_namespace(city, snapshot),
+                                                                  "run_nearest_neighbor_analysis")},
+            "outputs": ["nn_analysis_results_all",
+                        "nn_analysis_results_normalized"] +
+                       ["nn_analysis_results_norm_{}".format(district.lower()) for district in city_selected_districts]},
+        "process_nearest_neighbor_analysis_results": {
+            "function": stage_functions.process_nearest_neighbor_analysis_results,
+            "script": Path("src/data_preparation/process_nearest_neighbor_analysis_results.py"),
+            "inputs": {"nn_results": "nn_analysis_results_all",
+                       "airbnb": "istanbul_airbnb_processed_shapefile"},
+            "outputs": ["distance_price_dataset",
+                        "distance_price_dataset_partitioned"]},
+        "analyze_geographic_distribution_of_htourism_centers": {
+            "function": stage_functions.analyze_geographic_distribution_of_htourism_centers,
+            "script": Path("src/data_analysis/analyze_geographic_distribution_of_htourism_centers.py"),
+            "inputs": {"districts_gdf": "istanbul_districts",
+                       "htourism_gdf": "htourism_centers_processed",
+                       "extra_data": "district_income"},
+            "outputs": ["geographic_distribution_of_htourism_centers"]},
+        "analyze_geographic_distribution_of_airbnb_rentals": {
+            "function": stage_functions.analyze_geographic_distribution_of_airbnb_rentals,
+            "script": Path("src/data_analysis/analyze_geographic_distribution_of_airbnb_rentals.py"),
+            "inputs": {"districts_gdf": "istanbul_districts",
+                       "airbnb_gdf": "istanbul_airbnb_processed_shapefile",
+                       "extra_data": "district_income"},
+            "outputs": ["geographic_distribution_of_airbnb_rentals"]},
+    }
+
+    if reuse_shared:
+        stages = {name: stage for name, stage in stages.items() if name not in shared_stage_names}
+
+    #The visualization scripts read the outputs of the original run only
+    if city != home_city or snapshot is not None:
+        return artifacts, stages
+
+    for stage_name, folder_name in figure_folders.items():
+        artifacts["figures_of_{}".format(stage_name)] = {
+            "path": Path("media/figures/raw").joinpath(folder_name),
+            "kind": "figures"}
+
+    stages.update({
+        "visualize_geographic_distribution_of_htourism_centers": {
+            "function": None,
+            "script": Path("src/data_visualization/visualize_geographic_distribution_of_htourism_centers.py"),
+            "inputs": ["htourism_centers_processed",
+                       "geographic_distribution_of_htourism_centers"],
+            "outputs": ["figures_of_visualize_geographic_distribution_of_htourism_centers"]},
+        "visualize_bivariate_analysis_htourism_center_count_at_district_level": {
+            "function": None,
+            "script": Path("src/data_visualization/visualize_bivariate_analysis_htourism_center_count_at_district_level.py"),
+            "inputs": ["geographic_distribution_of_htourism_centers"],
+            "outputs": ["figures_of_visualize_bivariate_analysis_htourism_center_count_at_district_level"]},
+        "visualize_geographic_distribution_of_airbnb_rentals": {
+            "function": None,
+            "script": Path("src/data_visualization/visualize_geographic_distribution_airbnb_rentals.py"),
+            "inputs": ["istanbul_airbnb_processed_shapefile",
+                       "geographic_distribution_of_airbnb_rentals"],
+            "outputs": ["figures_of_visualize_geographic_distribution_of_airbnb_rentals"]},
+        "visualize_bivariate_analysis_airbnb_count_at_district_level": {
+            "function": None,
+            "script": Path("src/data_visualization/visualize_bivariate_analysis_airbnb_count_at_district_level.py"),
+            "inputs": ["geographic_distribution_of_airbnb_rentals"],
+            "outputs": ["figures_of_visualize_bivariate_analysis_airbnb_count_at_district_level"]},
+        "visualize_price_distribution_of_airbnb_rentals_kdeplot": {
+            "function": None,
+            "script": Path("src/data_visualization/visualize_price_distribution_of_airbnb_rentals_kdeplot.py"),
+            "inputs": ["istanbul_airbnb_processed_partitioned"],
+            "outputs": ["figures_of_visualize_price_distribution_of_airbnb_rentals_kdeplot"]},
+        "visualize_nearest_neighbor_analysis_confirmation": {
+            "function": None,
+            "script": Path("src/data_visualization/visualize_nearest_neighbor_analysis_confirmation.py"),
+            "inputs": ["nn_analysis_results_all",
+                       "nn_analysis_results_normalized"] +
+                      ["nn_analysis_results_norm_{}".format(district.lower()) for district in city_selected_districts],
+            "outputs": ["figures_of_visualize_nearest_neighbor_analysis_confirmation"]},
+        "visualize_nearest_neighbor_analysis_correlation_results": {
+            "function": None,
+            "script": Path("src/data_visualization/visualize_nearest_neighbor_analysis_correlation_results.py"),
+            "inputs": ["distance_price_dataset_partitioned"],
+            "outputs": ["figures_of_visualize_nearest_neighbor_analysis_correlation_results"]},
+    })
+
+    return artifacts, stages
+
+#%% --- DEFINITIONS: artifacts and stages of the original run ---
+
+artifacts, stages = build_registry()
@@ -0,0 +1,507 @@
+# -*- coding: utf-8 -*-
+"""
+------ What is this file? ------
+
+This module runs the pipeline described in src/pipeline/registry.py in a single
+Python process. Stages are run in dependency order and hand their outputs to the
+next stages in memory. Outputs are written to disk only if they are configured to
+be persisted, or if a visualization script needs to read them.
+
+An output that is handed over in memory looks exactly like the output that the
+next stage would read from disk: csv outputs go through an in-memory csv round
+trip and shapefile outputs get the 10 character column names of a shapefile.
+
+Usage, from the project root:
+    python -m src.pipeline.runner                       # Run every stage
+    python -m src.pipeline.runner run_nearest_neighbor_analysis   # Run a stage and its upstream stages
+    python -m src.pipeline.runner --persist none --skip-visualizations
+    python -m src.pipeline.runner --no-cache            # Run every stage, even if it is cached
+    python -m src.pipeline.runner --profile cprofile    # Profile every stage
+
+Stages whose code, parameters and inputs haven't changed since they were last
+run are restored from the stage cache, see src/pipeline/cache.py
+
+The time, memory, row counts and disk traffic of every stage are recorded in the
+run ledger, see src/pipeline/ledger.py
+
+Stages can be profiled with cProfile or a stack sampler, see src/pipeline/profiling.py
+
+"""
+#%% --- Import Required Packages ---
+
+import io
+import os
+import sys
+import runpy
+import argparse
+from pathlib import Path # To wrap around filepaths
+import pandas as pd
+import geopandas as gpd
+from src.helper_functions import data_io_helper_functions as data_io
+from src.pipeline import cache as stage_cache
+from src.pipeline import ledger as run_ledger
+from src.pipeline import profiling
+from src.pipeline.registry import artifacts as registered_artifacts
+from src.pipeline.registry import stages as registered_stages
+
+#%% --- DEFINITIONS ---
+
+#Shapefiles cut column names down to 10 characters
+shapefile_column_name_length = 10
+
+#%% --- FUNCTION: resolve_stage_order ---
+
+def resolve_stage_order(stages, targets = None):
+    """
+    Orders stages so that every stage comes after the stages that produce its inputs.
+    Stages that don't depend on each other keep their order in stages.
+
+    Parameters
+    ----------
+    stages : dict
+        {stage name: stage}, see src/pipeline/registry.py
+    targets : list, optional
+        Names of the stages to run. Their upstream stages are included.
+        The default is None, which runs every stage.
+
+    Returns
+    -------
+    list
+        Stage names in the order they should be run.
+
+    """
+    producers = {}
+    for stage_name, stage in stages.items():
+        for artifact_name in stage["outputs"]:
+            producers[artifact_name] = stage_name
+
+    upstream = {}
+    for stage_name, stage in stages.items():
+        input_names = stage["inputs"].values() if isinstance(stage["inputs"], dict) else stage["inputs"]
+        upstream[stage_name] = [producers[name] for name in input_names if name in producers]
+
+    if targets is None:
+        targets = list(stages.keys())
+
+    unknown_targets = [target for target in targets if target not in stages]
+    valerror_text = "Unknown stages: {}".format(unknown_targets)
+    if len(unknown_targets) > 0:
+        raise ValueError(valerror_text)
+
+    #Collect the targets and everything upstream of them
+    selected = set()
+    to_visit = list(targets)
+    while len(to_visit) > 0:
+        stage_name = to_visit.pop()
+        if stage_name not in selected:
+            selected.add(stage_name)
+            to_visit.extend(upstream[stage_name])
+
+    #Kahn's algorithm, taking stages in registry order
+    order = []
+    remaining = [stage_name for stage_name in stages if stage_name in selected]
+    while len(remaining) > 0:
+        ready = [stage_name for stage_name in remaining
+                 if all(dependency in order for dependency in upstream[stage_name])]
+        valerror_text = "The stages {} depend on each other in a cycle".format(remaining)
+        if len(ready) == 0:
+            raise ValueError(valerror_text)
+        order.append(ready[0])
+        remaining.remove(ready[0])
+
+    return order
+
+#%% --- FUNCTION: hand_over ---
+
+def hand_over(value, artifact):
+    """
+    Makes an in-memory stage output look like it was written to disk and read back.
+
+    Parameters
+    ----------
+    value : pandas.DataFrame or geopandas.GeoDataFrame
+    artifact : dict
+        The artifact that value is an instance of.
+
+    Returns
+    -------
+    pandas.DataFrame or geopandas.GeoDataFrame
+
+    """
+    if artifact["kind"] == "csv":
+        buffer = io.StringIO()
+        value.to_csv(buffer, index = False)
+        buffer.seek(0)
+        return pd.read_csv(buffer)
+
+    if artifact["kind"] == "shapefile":
+        geometry_column = value.geometry.name
+        value = value.reset_index(drop = True)
+        category_columns = value.select_dtypes(include = ["category"]).columns
+        value = value.astype({column: object for column in category_columns})
+        renamed_columns = {column: column[:shapefile_column_name_length] for column in value.columns
+                           if column != geometry_column}
+        return value.rename(columns = renamed_columns)
+
+    return value
+
+#%% --- FUNCTION: read_artifact ---
+
+def read_artifact(artifact, project_root):
+    """
+    Reads an artifact from disk.
+
+    Parameters
+    ----------
+    artifact : dict
+    project_root : pathlib.Path
+
+    Returns
+    -------
+    pandas.DataFrame or geopandas.GeoDataFrame
+
+    """
+    path = project_root.joinpath(artifact["path"])
+    kind = artifact["kind"]
+
+    if kind == "airbnb_listings":
+        return data_io.read_airbnb_listings(path, engine = "pyarrow")
+    elif kind == "csv":
+        return pd.read_csv(path, encoding = "utf-8-sig")
+    elif kind == "shapefile":
+        return gpd.read_file(path, encoding = artifact.get("encoding", "utf-8-sig"))
+    elif kind == "partitioned":
+        return data_io.read_partitioned_dataset(path)
+    elif kind == "reference_shapefile":
+        return data_io.load_reference_geodataframe(path)
+    elif kind == "reference_excel":
+        return data_io.load_reference_dataframe(path, engine = "openpyxl")
+
+    valerror_text = "Unknown artifact kind: {}".format(kind)
+    raise ValueError(valerror_text)
+
+#%% --- FUNCTION: write_artifact ---
+
+def write_artifact(value, artifact, project_root):
+    """
+    Writes an artifact to disk.
+
+    Parameters
+    ----------
+    value : pandas.DataFrame or geopandas.GeoDataFrame
+    artifact : dict
+    project_root : pathlib.Path
+
+    Returns
+    -------
+    None.
+
+    """
+    path = project_root.joinpath(artifact["path"])
+    path.parent.mkdir(parents = True, exist_ok = True)
+    kind = artifact["kind"]
+
+    if kind == "csv":
+        value.to_csv(path, encoding = "utf-8-sig", index = False)
+    elif kind == "shapefile":
+        if "encoding" in artifact:
+            data_io.write_shapefile(value, path, encoding = artifact["encoding"])
+        else:
+            data_io.write_shapefile(value, path)
+    elif kind == "partitioned":
+        data_io.write_partitioned_dataset(value, path, artifact["partition_column"])
+    else:
+        valerror_text = "Artifacts of kind {} are sources and can't be written".format(kind)
+        raise ValueError(valerror_text)
+
+#%% --- FUNCTION: run_script ---
+
+def run_script(script_fp, profile = None, project_root = None):
+    """
+    Runs a script in the current process, as if it was run with "python script_fp".
+    The working directory is restored afterwards and the figures are closed.
+
+    Parameters
+    ----------
+    script_fp : pathlib.Path
+    profile : str, optional
+        One of profiling.profile_modes to run the script under the profiler.
+        The default is None.
+    project_root : pathlib.Path, optional
+        Where the profile is written, see src/pipeline/profiling.py
+        The default is None, which uses the root of this repository.
+
+    Returns
+    -------
+    pathlib.Path or None
+        The folder the profile was written to, if the script was profiled.
+
+    """
+    import matplotlib.pyplot as plt
+
+    project_root = data_io.project_root if project_root is None else project_root
+    working_directory = os.getcwd()
+    try:
+        if profile is not None:
+            return profiling.profile_script(script_fp, profile, project_root)
+        runpy.run_path(str(script_fp), run_name = "__main__")
+    finally:
+        os.chdir(working_directory)
+        plt.close("all")
+
+#%% --- FUNCTION: run_pipeline ---
+
+def run_pipeline(targets = None, persist = "default", include_visualizations = True,
+                 use_cache = True, record_run = True, label = None, profile = None,
+                 profiled_stages = None, stages = None, artifacts = None, project_root = None):
+    """
+    Runs the pipeline in the current process.
+
+    Parameters
+    ----------
+    targets : list, optional
+        Names of the stages to run. Their upstream stages are included.
+        The default is None, which runs every stage.
+
+    persist : One of "default", "all", "none", or a list of artifact names.
+        Which outputs are written to disk. "default" writes the artifacts that
+        have persist set to True in the registry. Inputs of the visualization
+        scripts are always written before the scripts are run.
+
+    include_visualizations : bool, optional
+        Whether the visualization scripts are run. The default is True.
+
+    use_cache : bool, optional
+        Whether the outputs of the stages are restored from and stored in the
+        stage cache, see src/pipeline/cache.py. The default is True.
+
+    record_run : bool, optional
+        Whether the run is appended to the run ledger, see src/pipeline/ledger.py.
+        The default is True.
+
+    label : str, optional
+        Recorded in the run ledger along with the other options, e.g. the city
+        and the snapshot of the run. The default is None.
+
+    profile : str, optional
+        One of "cprofile", "sample", "all" or "off", see src/pipeline/profiling.py
+        The default is None, which reads the PIPELINE_PROFILE environment variable.
+        A profiled stage is run even if it is cached.
+
+    profiled_stages : list, optional
+        Names of the stages to profile. The default is None, which profiles
+        every stage that is run.
+
+    stages, artifacts : dict, optional
+        The default is None, which uses src/pipeline/registry.py
+
+    project_root : pathlib.Path, optional
+        The paths of the artifacts are relative to project_root.
+        The default is None, which uses the root of this repository.
+
+    Returns
+    -------
+    dict
+        {artifact name: value} for every artifact that was produced or restored
+        and then handed over in memory.
+
+    """
+    stages = registered_stages if stages is None else stages
+    artifacts = registered_artifacts if artifacts is None else artifacts
+    project_root = data_io.project_root if project_root is None else Path(project_root)
+    cache_dir = project_root.joinpath(stage_cache.stage_cache_dir)
+    profile = profiling.get_profile_mode(profile)
+
+    unknown_stages = [stage_name for stage_name in profiled_stages or [] if stage_name not in stages]
+    valerror_text = "Unknown stages to profile: {}".format(unknown_stages)
+    if len(unknown_stages) > 0:
+        raise ValueError(valerror_text)
+
+    if persist == "default":
+        persisted = {name for name, artifact in artifacts.items() if artifact.get("persist", False)}
+    elif persist == "all":
+        persisted = set(artifacts.keys())
+    elif persist == "none":
+        persisted = set()
+    elif isinstance(persist, (list, set, tuple)):
+        persisted = set(persist)
+    else:
+        valerror_text = "persist must be one of default, all, none or a list of artifact names. Got {}".format(persist)
+        raise ValueError(valerror_text)
+
+    if not include_visualizations:
+        stages = {name: stage for name, stage in stages.items() if stage["function"] is not None}
+        if targets is not None:
+            targets = [target for target in targets if target in stages]
+
+    values = {}
+    written = set()
+    #Where each artifact can be read from, if it is not in values
+    locations = dict(artifacts)
+    #Content hash of each artifact, see src/pipeline/cache.py
+    artifact_keys = {}
+    run = run_ledger.start_run_record(project_root, label = label, targets = targets, persist = persist,
+                                      include_visualizations = include_visualizations,
+                                      use_cache = use_cache, profile = profile)
+
+    def get_size(artifact_name):
+        artifact = artifacts[artifact_name]
+        return run_ledger.get_artifact_size(project_root.joinpath(artifact["path"]), artifact["kind"])
+
+    #A run that fails is recorded too, with the stages that finished before it
+    #and the stage that failed
+    record = None
+    try:
+        for stage_name in resolve_stage_order(stages, targets):
+            stage = stages[stage_name]
+            stage_profile = profile if profiled_stages is None or stage_name in profiled_stages else None
+
+            #Visualization scripts read their inputs from disk
+            if stage["function"] is None:
+                print("--- {} ---".format(stage_name))
+                record = run_ledger.start_stage_record(stage_name, "script")
+                for artifact_name in stage["inputs"]:
+                    if artifact_name in written:
+                        continue
+                    if artifact_name in values:
+                        write_artifact(values[artifact_name], artifacts[artifact_name], project_root)
+                        written.add(artifact_name)
+                        record["bytes_written"] += get_size(artifact_name)
+                    elif locations[artifact_name] is not artifacts[artifact_name]:
+                        stage_cache.copy_artifact(locations[artifact_name]["path"],
+                                                  project_root.joinpath(artifacts[artifact_name]["path"]),
+                                                  artifacts[artifact_name]["kind"])
+                        written.add(artifact_name)
+                        record["bytes_written"] += get_size(artifact_name)
+                record["bytes_read"] = sum(get_size(artifact_name) for artifact_name in stage["inputs"])
+                profile_dir = run_script(project_root.joinpath(stage["script"]), stage_profile, project_root)
+                if profile_dir is not None:
+                    record["profile"] = str(profile_dir)
+                    print("Profile written to {}".format(profile_dir))
+                run["stages"].append(run_ledger.finish_stage_record(record))
+                continue
+
+            output_artifacts = {name: artifacts[name] for name in stage["outputs"]}
+            record = run_ledger.start_stage_record(stage_name, "run")
+
+            if use_cache:
+                input_keys = {}
+                for argument_name, artifact_name in stage["inputs"].items():
+                    if artifact_name not in artifact_keys:
+                        artifact_keys[artifact_name] = stage_cache.calculate_source_key(project_root.joinpath(artifacts[artifact_name]["path"]))
+                    input_keys[argument_name] = artifact_keys[artifact_name]
+                key = stage_cache.calculate_stage_key(stage_name, stage, input_keys, output_artifacts)
+                entry_dir, cached_artifacts = stage_cache.get_cache_entry(cache_dir, stage_name, key, output_artifacts)
+
+                if entry_dir.exists() and stage_profile is None:
+                    print("--- {} (restored from cache) ---".format(stage_name))
+                    record["status"] = "cached"
+                    for artifact_name, cached_artifact in cached_artifacts.items():
+                        values.pop(artifact_name, None)
+                        written.discard(artifact_name)
+                        locations[artifact_name] = cached_artifact
+                        if artifact_name in persisted:
+                            stage_cache.copy_artifact(cached_artifact["path"],
+                                                      project_root.joinpath(artifacts[artifact_name]["path"]),
+                                                      cached_artifact["kind"])
+                            written.add(artifact_name)
+                            record["bytes_written"] += get_size(artifact_name)
+                        artifact_keys[artifact_name] = stage_cache.calculate_source_key(cached_artifact["path"])
+                    run["stages"].append(run_ledger.finish_stage_record(record))
+                    continue
+
+            print("--- {} ---".format(stage_name))
+
+            kwargs = {}
+            for argument_name, artifact_name in stage["inputs"].items():
+                if artifact_name not in values:
+                    location = locations[artifact_name]
+                    values[artifact_name] = read_artifact(location, project_root)
+                    record["bytes_read"] += run_ledger.get_artifact_size(project_root.joinpath(location["path"]),
+                                                                         location["kind"])
+                kwargs[argument_name] = values[artifact_name]
+                record["input_rows"][argument_name] = len(values[artifact_name])
+            kwargs.update(stage.get("params", {}))
+
+            if stage_profile is None:
+                outputs = stage["function"](**kwargs)
+            else:
+                outputs, profile_dir = profiling.profile_call(stage["function"], stage_name, stage_profile,
+                                                              project_root, **kwargs)
+                record["profile"] = str(profile_dir)
+                print("Profile written to {}".format(profile_dir))
+
+            for artifact_name, value in outputs.items():
+                written.discard(artifact_name)
+                locations[artifact_name] = artifacts[artifact_name]
+                record["output_rows"][artifact_name] = len(value)
+                if artifact_name in persisted:
+                    write_artifact(value, artifacts[artifact_name], project_root)
+                    written.add(artifact_name)
+                    record["bytes_written"] += get_size(artifact_name)
+
+            if use_cache:
+                #Persisted outputs are copied into the cache, the others are written there
+                def write_output(artifact_name, cached_artifact):
+                    if artifact_name in written:
+                        stage_cache.copy_artifact(project_root.joinpath(artifacts[artifact_name]["path"]),
+                                                  cached_artifact["path"], cached_artifact["kind"])
+                    else:
+                        write_artifact(outputs[artifact_name], cached_artifact, project_root)
+                stage_cache.store_cache_entry(entry_dir, cached_artifacts, write_output)
+                for artifact_name, cached_artifact in cached_artifacts.items():
+                    artifact_keys[artifact_name] = stage_cache.calculate_source_key(cached_artifact["path"])
+                    record["bytes_written"] += run_ledger.get_artifact_size(cached_artifact["path"], cached_artifact["kind"])
+
+            for artifact_name, value in outputs.items():
+                values[artifact_name] = hand_over(value, artifacts[artifact_name])
+            run["stages"].append(run_ledger.finish_stage_record(record))
+        run["status"] = "succeeded"
+    except BaseException as exception:
+        run["status"] = "failed"
+        run["error"] = "{}: {}".format(type(exception).__name__, exception)
+        if record is not None and all(record is not stage_record for stage_record in run["stages"]):
+            record["status"] = "failed"
+            run["stages"].append(run_ledger.finish_stage_record(record))
+        raise
+    finally:
+        if record_run:
+            run_ledger.append_run(run, project_root.joinpath(run_ledger.ledger_fp))
+
+    return values
+
+#%% --- Command line interface ---
+
+def parse_arguments(arguments):
+    parser = argparse.ArgumentParser(prog = "python -m src.pipeline.runner",
+                                     description = "Run the pipeline in a single process.")
+    parser.add_argument("targets", nargs = "*",
+                        help = "Stages to run, along with their upstream stages. Default: every stage.")
+    parser.add_argument("--persist", default = "default",
+                        help = "default, all, none, or a comma separated list of artifact names.")
+    parser.add_argument("--skip-visualizations", action = "store_true",
+                        help = "Don't run the visualization scripts.")
+    parser.add_argument("--no-cache", action = "store_true",
+                        help = "Don't restore outputs from, or store them in, the stage cache.")
+    parser.add_argument("--profile", choices = profiling.profile_modes + ["off"],
+                        help = "Profile the stages, see src/pipeline/profiling.py. Default: the PIPELINE_PROFILE environment variable.")
+    parser.add_argument("--profile-stage", action = "append",
+                        help = "A stage to profile. Can be repeated. Default: every stage.")
+    return parser.parse_args(arguments)
+
+def main(arguments = None):
+    arguments = parse_arguments(sys.argv[1:] if arguments is None else arguments)
+
+    persist = arguments.persist
+    if persist not in ["default", "all", "none"]:
+        persist = persist.split(",")
+
+    run_pipeline(targets = arguments.targets or None,
+                 persist = persist,
+                 include_visualizations = not arguments.skip_visualizations,
+                 use_cache = not arguments.no_cache,
+                 profile = arguments.profile,
+                 profiled_stages = arguments.profile_stage)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,536 @@
+# -*- coding: utf-8 -*-
+"""
+------ What is this file? ------
+
+This module contains the data transformations of the scripts found under
+src/data_preparation and src/data_analysis, one function per script.
+The scripts call these functions, and so does the pipeline runner at
+src/pipeline/runner.py, which chains them in a single process.
+
+Every stage function takes its inputs as dataframes, returns a dict of
+{artifact name: dataframe} and does not touch the disk, except for the
+checkpoints of run_nearest_neighbor_analysis, see src/pipeline/checkpoints.py
+The artifacts are described in src/pipeline/registry.py.
+
+"""
+#%% --- Import Required Packages ---
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+from pathlib import Path # To wrap around filepaths
+from scipy.stats import iqr
+from shapely.geometry import Point
+from src.helper_functions.data_preparation_helper_functions import clean_airbnb_listings
+from src.helper_functions.data_preparation_helper_functions import classify_names
+from src.helper_functions.data_preparation_helper_functions import drop_duplicate_places
+from src.helper_functions.district_helper_functions import build_district_registry
+from src.helper_functions.district_helper_functions import to_district_categorical
+from src.helper_functions.data_analysis_helper_functions import nearest_neighbor_analysis
+from src.helper_functions.data_io_helper_functions import sort_by_hilbert_key
+from src.helper_functions.data_io_helper_functions import project_root
+from src.pipeline.cache import calculate_code_hash
+from src.pipeline.checkpoints import calculate_checkpoint_key, run_in_chunks
+
+#%% --- Helper Functions ---
+
+def convert_to_point_geodataframe(dataframe, crs, x_column = "longitude", y_column = "latitude"):
+    """
+    Converts a dataframe with coordinate columns into a point GeoDataFrame.
+
+    Parameters
+    ----------
+    dataframe : pandas.DataFrame
+    crs : The crs of the returned GeoDataFrame.
+    x_column : str, optional
+        The default is "longitude".
+    y_column : str, optional
+        The default is "latitude".
+
+    Returns
+    -------
+    geopandas.GeoDataFrame
+
+    """
+    geometry = [Point(xy) for xy in zip(dataframe[x_column], dataframe[y_column])]
+    return gpd.GeoDataFrame(dataframe,
+                            crs = crs,
+                            geometry = geometry)
+
+def calculate_price_bounds(prices, iqr_multiplier = 1.5):
+    """
+    Calculates the lower and upper bounds of the prices that are within
+    +/- iqr_multiplier * IQR of the first and third quartiles.
+
+    Parameters
+    ----------
+    prices : pandas.Series
+    iqr_multiplier : float, optional
+        The default is 1.5.
+
+    Returns
+    -------
+    tuple
+        (lower bound, upper bound)
+
+    """
+    price_iqr = iqr(prices, axis = 0)
+    q1 = prices.quantile(0.25)
+    q3 = prices.quantile(0.75)
+    return q1 - (price_iqr * iqr_multiplier), q3 + (price_iqr * iqr_multiplier)
+
+def calculate_geographic_distribution(districts_gdf, points_gdf, extra_data, count_column):
+    """
+    Counts the points in each district and joins the counts, the population and
+    the yearly average household income to the district polygons.
+
+    Parameters
+    ----------
+    districts_gdf : geopandas.GeoDataFrame
+        istanbul_districts.shp, which gives the district registry.
+    points_gdf : geopandas.GeoDataFrame
+        A point layer with a "district_e" column.
+    extra_data : pandas.DataFrame
+        district_income.xlsx
+    count_column : str
+        Name of the column that holds the counts.
+
+    Returns
+    -------
+    geopandas.GeoDataFrame
+
+    """
+    #The district columns are codes into the district registry, so the counts
+    #and the joins below compare integers
+    district_registry = build_district_registry(districts_gdf)
+    districts_gdf = districts_gdf.assign(district_e = to_district_categorical(districts_gdf.loc[:,"district_e"],
+                                                                              district_registry))
+    points_districts = to_district_categorical(points_gdf.loc[:,"district_e"], district_registry)
+
+    #Aggregate point count per district. The districts without points are left out.
+    count_per_district = points_districts.value_counts()
+    count_per_district = count_per_district.loc[count_per_district > 0].rename_axis('district_e').reset_index(name = count_column)
+
+    #Join in with district data
+    districts_gdf = districts_gdf.merge(count_per_district,
+                                        on = "district_e",
+                                        how = "left")
+
+    #Subset only the info that you might need from districts_gdf
+    columns_to_drop = ["OBJECTID", "Shape_Leng", "Shape_Area",
+                       "continent"]
+    districts_gdf = districts_gdf.drop(columns_to_drop, axis = 1)
+
+    #Add in extra data
+    extra_data = extra_data.rename(columns = {"district_eng" : "district_e"})
+    extra_data = extra_data.assign(district_e = to_district_categorical(extra_data.loc[:,"district_e"],
+                                                                        district_registry))
+    districts_gdf = districts_gdf.merge(extra_data.loc[:,["district_e", "population", "yearly_average_household_income"]],
+                                        on = "district_e",
+                                        how = "left")
+    return districts_gdf
+
+#%% --- STAGE: process_airbnb_data ---
+
+def process_airbnb_data(airbnb_raw, istanbul_districts):
+    """
+    Cleans the raw airbnb listings. See clean_airbnb_listings.
+
+    Parameters
+    ----------
+    airbnb_raw : pandas.DataFrame
+        istanbul_airbnb_raw.csv, as returned by read_airbnb_listings.
+    istanbul_districts : geopandas.GeoDataFrame
+        istanbul_districts.shp, which gives the district registry.
+
+    Returns
+    -------
+    dict
+        {"istanbul_airbnb_processed": pandas.DataFrame}
+
+    """
+    district_registry = build_district_registry(istanbul_districts)
+    return {"istanbul_airbnb_processed": clean_airbnb_listings(airbnb_raw, district_registry)}
+
+#%% --- STAGE: process_health_services_data ---
+
+def process_health_services_data(hservices, istanbul_districts):
+    """
+    Cleans the raw health services data and keeps only the institutions that are
+    related to health tourism, i.e. aesthetic surgery centers.
+
+    Parameters
+    ----------
+    hservices : pandas.DataFrame
+        istanbul_healthservices_raw.csv
+    istanbul_districts : geopandas.GeoDataFrame
+        istanbul_districts.shp, which gives the district registry.
+
+    Returns
+    -------
+    dict
+        {"istanbul_aesthethic_centers_processed": pandas.DataFrame}
+
+    """
+    #Information related to icu, n#_beds, ambulance and care_type is not needed.
+    columns_to_drop = ["icu", "n#_beds", "ambulance", "care_type"]
+    hservices = hservices.drop(labels = columns_to_drop, axis = 1)
+
+    #The few rows with missing values are dropped
+    hservices = hservices.dropna(axis = 0)
+
+    #Aesthetic surgery centers are related to health tourism. Find them by their names,
+    #see institution_vocabulary.
+    related_to_htourism = classify_names(hservices.loc[:,"institution_name"]).loc[:,"aesthetic"]
+
+    #The raw related_to_htourism column is replaced by related_to_htourism above
+    columns_to_drop = ["institution_id","institution_type","address",
+                       "neighborhood_tr","related_to_htourism","institution_type_eng",
+                       "institution_type_abbrv_tr","institution_type_abbrv_eng"]
+    hservices = hservices.drop(labels = columns_to_drop, axis = 1)
+
+    #Keep only the rows that are related to health tourism
+    hservices = hservices.loc[related_to_htourism,:].copy()
+
+    #Convert the district columns to the categories of the district registry
+    district_registry = build_district_registry(istanbul_districts)
+    hservices = hservices.assign(district_tr = to_district_categorical(hservices.loc[:,"district_tr"],
+                                                                       district_registry, "tr"),
+                                 district_eng = to_district_categorical(hservices.loc[:,"district_eng"],
+                                                                        district_registry, "eng"))
+
+    #Institutions that share a name but not a location are named as x_0, x_1, ...
+    institution_name_counts = hservices["institution_name"].value_counts()
+    suspects = institution_name_counts.index[institution_name_counts > 1]
+
+    for suspect in suspects:
+        suspect_mask = hservices.loc[:,"institution_name"] == suspect
+        suspect_coords = hservices.loc[suspect_mask, ["latitude", "longitude"]].values
+        assert not np.array_equal(suspect_coords[0], suspect_coords[1])
+
+        for i, suspect_coord in enumerate(suspect_coords):
+            coord_mask = (hservices.loc[:,"latitude"] == suspect_coord[0])
+            hservices.loc[coord_mask,"institution_name"] = hservices.loc[coord_mask,"institution_name"] + str("_" + str(i))
+
+    return {"istanbul_aesthethic_centers_processed": hservices}
+
+#%% --- STAGE: convert_hclinic_coords_to_points ---
+
+def convert_hclinic_coords_to_points(hclinic_df, istanbul_districts):
+    """
+    Converts the hair clinics into points and finds the district that each
+    of them is in. Hair clinics that are not in any district are dropped.
+
+    Parameters
+    ----------
+    hclinic_df : pandas.DataFrame
+        hair_clinics_raw.csv
+    istanbul_districts : geopandas.GeoDataFrame
+        istanbul_districts.shp
+
+    Returns
+    -------
+    dict
+        {"hair_clinics_processed": geopandas.GeoDataFrame}
+
+    """
+    hclinic_gdf = convert_to_point_geodataframe(hclinic_df, istanbul_districts.crs,
+                                                x_column = "lon", y_column = "lat")
+
+    #Point in polygon query for each district
+    in_any_district = pd.Series(False, index = hclinic_gdf.index)
+    for district_index in istanbul_districts.index.tolist():
+        district_name = istanbul_districts.iloc[district_index]["district_e"]
+        district_polygon = istanbul_districts.iloc[district_index]["geometry"]
+        p_in_p_mask = hclinic_gdf.within(district_polygon)
+
+        hclinic_gdf.loc[p_in_p_mask,"in_district_eng"] = district_name
+        in_any_district |= p_in_p_mask
+
+    #Location info of the two clinics that the query misses, inserted by hand
+    hclinic_gdf.iloc[23,-1] = "Atasehir"
+    hclinic_gdf.iloc[25,-1] = "Bakirkoy"
+
+    #The clinics outside of every district can't be located programatically. Drop them.
+    hclinic_gdf = hclinic_gdf.loc[in_any_district,:]
+
+    district_registry = build_district_registry(istanbul_districts)
+    hclinic_gdf = hclinic_gdf.assign(in_district_eng = to_district_categorical(hclinic_gdf.loc[:,"in_district_eng"],
+                                                                               district_registry))
+
+    return {"hair_clinics_processed": hclinic_gdf}
+
+#%% --- STAGE: convert_aesthetic_clinic_to_shapefile ---
+
+def convert_aesthetic_clinic_to_shapefile(acenters_df, hclinics_gdf):
+    """
+    Converts the aesthetic centers into points, with the crs of the hair clinics.
+
+    Parameters
+    ----------
+    acenters_df : pandas.DataFrame
+        istanbul_aesthethic_centers_processed.csv
+    hclinics_gdf : geopandas.GeoDataFrame
+        hair_clinics_processed.shp
+
+    Returns
+    -------
+    dict
+        {"istanbul_aesthethic_centers_processed_shapefile": geopandas.GeoDataFrame}
+
+    """
+    acenters_gdf = convert_to_point_geodataframe(acenters_df, hclinics_gdf.crs)
+    return {"istanbul_aesthethic_centers_processed_shapefile": acenters_gdf}
+
+#%% --- STAGE: combine_aesthethic_clinic_hclinic_shapefiles ---
+
+def combine_aesthethic_clinic_hclinic_shapefiles(hclinics_gdf, acenters_gdf, istanbul_districts):
+    """
+    Combines the hair clinics and the aesthetic centers into a single layer of
+    health tourism centers without duplicates, sorted along a Hilbert curve.
+
+    Parameters
+    ----------
+    hclinics_gdf : geopandas.GeoDataFrame
+        hair_clinics_processed.shp
+    acenters_gdf : geopandas.GeoDataFrame
+        istanbul_aesthethic_centers_processed_shapefile.shp
+    istanbul_districts : geopandas.GeoDataFrame
+        istanbul_districts.shp, which gives the district registry and the
+        bounds of the Hilbert curve.
+
+    Returns
+    -------
+    dict
+        {"htourism_centers_processed": geopandas.GeoDataFrame}
+
+    """
+    #Drop the URL column and rename hair clinic columns
+    hclinics_gdf = hclinics_gdf.drop("hclinic_se", axis = 1)
+    hclinics_gdf = hclinics_gdf.rename(columns = {"hclinic_na" : "institution",
+                                                  "in_distric": "district_eng",
+                                                  "lat" : "latitude",
+                                                  "lon" : "longitude"})
+
+    #Drop the pub_or_priv column and rename aesthetic center columns
+    acenters_gdf = acenters_gdf.drop("private_or", axis = 1)
+    acenters_gdf = acenters_gdf.rename(columns = {"institutio" : "institution",
+                                                  "district_e": "district_eng",
+                                                  "district_t" : "district_tr"})
+
+    #Convert the district columns of both to the categories of the district registry,
+    #and add district_tr information to hclinics_gdf from the registry
+    district_registry = build_district_registry(istanbul_districts)
+    hclinics_gdf = hclinics_gdf.assign(district_eng = to_district_categorical(hclinics_gdf.loc[:,"district_eng"],
+                                                                              district_registry, "eng"),
+                                       district_tr = to_district_categorical(hclinics_gdf.loc[:,"district_eng"],
+                                                                             district_registry, "tr"))
+    acenters_gdf = acenters_gdf.assign(district_eng = to_district_categorical(acenters_gdf.loc[:,"district_eng"],
+                                                                              district_registry, "eng"),
+                                       district_tr = to_district_categorical(acenters_gdf.loc[:,"district_tr"],
+                                                                             district_registry, "tr"))
+
+    #Combine, then sort along a Hilbert curve over the bounds of the city.
+    #A hair clinic and an aesthetic center that refer to the same place are
+    #merged, and the hair clinic is kept.
+    htourism_centers = pd.concat([hclinics_gdf, acenters_gdf])
+    htourism_centers = drop_duplicate_places(htourism_centers, "institution",
+                                             latitude_column = "latitude",
+                                             longitude_column = "longitude")
+    htourism_centers = sort_by_hilbert_key(htourism_centers,
+                                           bounds = istanbul_districts.total_bounds)
+
+    return {"htourism_centers_processed": htourism_centers}
+
+#%% --- STAGE: convert_airbnb_data_to_shapefile ---
+
+def convert_airbnb_data_to_shapefile(airbnb_df, hclinics_gdf, istanbul_districts):
+    """
+    Converts the processed airbnb listings into points, with the crs of the
+    hair clinics, sorted along a Hilbert curve.
+
+    Parameters
+    ----------
+    airbnb_df : pandas.DataFrame
+        istanbul_airbnb_processed.csv
+    hclinics_gdf : geopandas.GeoDataFrame
+        hair_clinics_processed.shp
+    istanbul_districts : geopandas.GeoDataFrame
+        istanbul_districts.shp, which gives the district registry and the
+        bounds of the Hilbert curve.
+
+    Returns
+    -------
+    dict
+        {"istanbul_airbnb_processed_shapefile": geopandas.GeoDataFrame,
+         "istanbul_airbnb_processed_partitioned": geopandas.GeoDataFrame}
+
+    """
+    #The district columns are read back from a .csv file as text
+    district_registry = build_district_registry(istanbul_districts)
+    airbnb_df = airbnb_df.assign(district_eng = to_district_categorical(airbnb_df.loc[:,"district_eng"],
+                                                                        district_registry, "eng"),
+                                 district_tr = to_district_categorical(airbnb_df.loc[:,"district_tr"],
+                                                                       district_registry, "tr"))
+    airbnb_gdf = convert_to_point_geodataframe(airbnb_df, hclinics_gdf.crs)
+    airbnb_gdf = sort_by_hilbert_key(airbnb_gdf,
+                                     bounds = istanbul_districts.total_bounds)
+
+    return {"istanbul_airbnb_processed_shapefile": airbnb_gdf,
+            "istanbul_airbnb_processed_partitioned": airbnb_gdf}
+
+#%% --- STAGE: run_nearest_neighbor_analysis ---
+
+def checkpointed_nearest_neighbor_analysis(reference_gdf, comparison_gdf, checkpoint_dir = None,
+                                           chunk_size = 2000):
+    """
+    Runs nearest_neighbor_analysis on chunks of reference_gdf and checkpoints
+    each chunk in checkpoint_dir, so that an interrupted run resumes from the
+    last completed chunk. The result is the same as without checkpoints.
+    If checkpoint_dir is None, the analysis runs in one go.
+    """
+    if checkpoint_dir is None:
+        return nearest_neighbor_analysis(reference_gdf, comparison_gdf)
+
+    key = calculate_checkpoint_key(reference_gdf,
+                                   calculate_checkpoint_key(comparison_gdf),
+                                   calculate_code_hash(nearest_neighbor_analysis))
+    return run_in_chunks(nearest_neighbor_analysis, reference_gdf, chunk_size,
+                         project_root.joinpath(checkpoint_dir), key,
+                         comparison_geodataframe = comparison_gdf)
+
+def run_nearest_neighbor_analysis(airbnb_gdf, htourism_gdf, selected_districts, iqr_multiplier = 1.5,
+                                  checkpoint_dir = None, chunk_size = 2000):
+    """
+    Finds the nearest health tourism center to each airbnb rental for:
+        - all rentals
+        - rentals priced within +/- iqr_multiplier * IQR
+        - rentals priced within +/- iqr_multiplier * IQR, per selected district.
+          The bounds are city-wide.
+
+    Parameters
+    ----------
+    airbnb_gdf : geopandas.GeoDataFrame
+        istanbul_airbnb_processed_shapefile.shp
+    htourism_gdf : geopandas.GeoDataFrame
+        htourism_centers_processed.shp
+    selected_districts : list
+        English names of the districts to analyze one by one.
+    iqr_multiplier : float, optional
+        The default is 1.5.
+    checkpoint_dir : pathlib.Path, optional
+        If given, each analysis runs in chunks of chunk_size rentals, which are
+        checkpointed in a subfolder of checkpoint_dir named after its output.
+        A relative path is relative to the project root. The default is None.
+    chunk_size : int, optional
+        The default is 2000.
+
+    Returns
+    -------
+    dict
+        {"nn_analysis_results_all": geopandas.GeoDataFrame,
+         "nn_analysis_results_normalized": geopandas.GeoDataFrame,
+         "nn_analysis_results_norm_<district>": geopandas.GeoDataFrame, ...}
+
+    """
+    def analyze(reference_gdf, output_name):
+        output_checkpoint_dir = None if checkpoint_dir is None else Path(checkpoint_dir).joinpath(output_name)
+        outputs[output_name] = checkpointed_nearest_neighbor_analysis(reference_gdf, htourism_gdf,
+                                                                      output_checkpoint_dir, chunk_size)
+
+    outputs = {}
+    analyze(airbnb_gdf, "nn_analysis_results_all")
+
+    price_min, price_max = calculate_price_bounds(airbnb_gdf.loc[:,"price"], iqr_multiplier)
+    price_mask = airbnb_gdf.loc[:,"price"].between(price_min, price_max)
+    airbnb_gdf_normalized = airbnb_gdf.loc[price_mask,:]
+
+    analyze(airbnb_gdf_normalized, "nn_analysis_results_normalized")
+
+    for district in selected_districts:
+        district_mask = airbnb_gdf_normalized.loc[:,"district_e"] == district
+        selection = airbnb_gdf_normalized.loc[district_mask,:]
+        analyze(selection, "nn_analysis_results_norm_{}".format(district.lower()))
+
+    return outputs
+
+#%% --- STAGE: process_nearest_neighbor_analysis_results ---
+
+def decode_recode_point_str(point_str):
+    """
+    Turns a "POINT (lon lat)" string into a shapely Point object.
+    """
+    split = point_str.split()
+    lon = float(split[1].strip("("))
+    lat = float(split[2].strip(")"))
+    return Point(lon,lat)
+
+def process_nearest_neighbor_analysis_results(nn_results, airbnb):
+    """
+    Merges the nearest neighbor analysis results with the district and the
+    price of each airbnb rental.
+
+    Parameters
+    ----------
+    nn_results : pandas.DataFrame
+        nn_analysis_results_all.csv
+    airbnb : geopandas.GeoDataFrame
+        istanbul_airbnb_processed_shapefile.shp
+
+    Returns
+    -------
+    dict
+        {"distance_price_dataset": geopandas.GeoDataFrame,
+         "distance_price_dataset_partitioned": geopandas.GeoDataFrame}
+
+    """
+    #Keep only the colums that will be needed in masking/viz./analysis
+    columns_to_keep = ["district_e", "price", "geometry"]
+    airbnb = airbnb.loc[:,columns_to_keep]
+
+    #Decode and recode point info, goes from str to shapely Point object.
+    nn_results = nn_results.assign(point_of_origin = nn_results.loc[:,"point_of_origin"]
+                                                     .apply(decode_recode_point_str))
+
+    nn_results_gdf = gpd.GeoDataFrame(nn_results,
+                                      crs = airbnb.crs,
+                                      geometry = "point_of_origin")
+    nn_results_gdf = nn_results_gdf.rename_geometry("geometry")
+
+    distance_price_dataset = airbnb.merge(nn_results_gdf,
+                                          on = "geometry")
+
+    return {"distance_price_dataset": distance_price_dataset,
+            "distance_price_dataset_partitioned": distance_price_dataset}
+
+#%% --- STAGE: analyze_geographic_distribution_of_htourism_centers ---
+
+def analyze_geographic_distribution_of_htourism_centers(districts_gdf, htourism_gdf, extra_data):
+    """
+    Counts the health tourism centers per district. See calculate_geographic_distribution.
+
+    Returns
+    -------
+    dict
+        {"geographic_distribution_of_htourism_centers": geopandas.GeoDataFrame}
+
+    """
+    districts_gdf = calculate_geographic_distribution(districts_gdf, htourism_gdf, extra_data,
+                                                      count_column = "htourism_count")
+    return {"geographic_distribution_of_htourism_centers": districts_gdf}
+
+#%% --- STAGE: analyze_geographic_distribution_of_airbnb_rentals ---
+
+def analyze_geographic_distribution_of_airbnb_rentals(districts_gdf, airbnb_gdf, extra_data):
+    """
+    Counts the airbnb rentals per district. See calculate_geographic_distribution.
+
+    Returns
+    -------
+    dict
+        {"geographic_distribution_of_airbnb_rentals": geopandas.GeoDataFrame}
+
+    """
+    districts_gdf = calculate_geographic_distribution(districts_gdf, airbnb_gdf, extra_data,
+                                                      count_column = "airbnb_count")
+    return {"geographic_distribution_of_airbnb_rentals": districts_gdf}
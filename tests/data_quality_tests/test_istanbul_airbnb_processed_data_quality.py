@@ -9,28 +9,22 @@ The file can be found at:
 """
 #%% --- Import Required Packages ---
 
-import os
-from pathlib import Path # To wrap around filepaths
 import pytest
 import numpy as np
 import pandas as pd
-import geopandas as gpd
 import textdistance
-#%% --- Set proper directory to assure integration with doit ---
-
-abspath = os.path.abspath(__file__)
-dname = os.path.dirname(abspath)
-os.chdir(dname)
-
+from src.helper_functions.data_io_helper_functions import load_reference_geodataframe
+from src.helper_functions.data_io_helper_functions import processed_data_dir
+from src.helper_functions.data_io_helper_functions import external_data_dir
 #%% --- Import data ---
 
 # Dataset to test for quality
-import_fp = Path("../../data/processed/istanbul_airbnb_processed.csv")
+import_fp = processed_data_dir.joinpath("istanbul_airbnb_processed.csv")
 airbnb = pd.read_csv(import_fp, encoding = "utf-8-sig")
 
 # Dataset to take as reference for lat/lon boundaries
-import_fp = Path("../../data/external/istanbul_districts.shp")
-istanbul_districts = gpd.read_file(import_fp)
+import_fp = external_data_dir.joinpath("istanbul_districts.shp")
+istanbul_districts = load_reference_geodataframe(import_fp)
 
 #%% --- Data quality tests ---
  
@@ -9,7 +9,6 @@ The script can be found at:
 """
 #%% --- Import Required Packages ---
 
-import os
 import pytest
 import numpy as np
 import pandas as pd
@@ -17,12 +16,6 @@ import geopandas as gpd
 from shapely.geometry import Point, Polygon, MultiPoint
 from src.helper_functions import data_analysis_helper_functions as functions
 
-#%% --- Set proper directory to assure integration with doit ---
-
-abspath = os.path.abspath(__file__)
-dname = os.path.dirname(abspath)
-os.chdir(dname)
-
 #%% --- Create test data ---
 #%%     --- Mock DataFrame ---
 
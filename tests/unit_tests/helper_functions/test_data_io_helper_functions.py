@@ -0,0 +1,404 @@
+# -*- coding: utf-8 -*-
+"""
+------ What is this file? ------
+
+This test module contains some tests for the data_io_helper_functions.py script.
+The script can be found at:
+    src/helper_functions/data_io_helper_functions.py
+
+"""
+#%% --- Import Required Packages ---
+
+import threading
+from pathlib import Path # To wrap around filepaths
+import pytest
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+from shapely.geometry import Point
+from src.helper_functions import data_io_helper_functions as functions
+
+#%% --- Create test data ---
+#%%     --- Mock DataFrame ---
+
+#Create a random seed
+np.random.seed([3,1415])
+#Create a dataframe from random np numbers
+test_df = pd.DataFrame(np.random.randint(10, size=(100, 5)),
+                       columns=list('ABCDE'))
+
+#%%     --- Mock GeoDataFrame ---
+
+random_points_basis_x = np.random.randint(low = 20, high = 40, size = 100)
+random_points_basis_y = np.random.randint(low = 20, high = 40, size = 100)
+random_points = [Point(x,y) for (x,y) in zip(random_points_basis_x,random_points_basis_y)]
+
+test_gdf = gpd.GeoDataFrame(test_df.copy(),
+                            geometry = random_points,
+                            crs = "EPSG:4326")
+
+    #%% --- other  ---
+
+test_int = 10
+test_float = 10.5
+
+#%% --- Testing ---
+#%%     --- Test: calculate_file_hash ---
+
+class TestProjectPaths(object):
+    def test_paths_do_not_depend_on_working_directory(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        error_message = "Expected the project paths to point at existing files from any working directory."
+        assert functions.raw_data_dir.joinpath("istanbul_airbnb_raw.csv").is_file(), error_message
+        assert functions.matplotlib_stylesheet_fp.is_file(), error_message
+
+class TestGetTemporaryFp(object):
+    def test_threads_get_different_paths(self):
+        test_export_fp = Path("test.csv")
+        temporary_fps = []
+        thread = threading.Thread(target = lambda: temporary_fps.append(functions.get_temporary_fp(test_export_fp)))
+        thread.start()
+        thread.join()
+        temporary_fps.append(functions.get_temporary_fp(test_export_fp))
+        error_message = "Expected two different paths next to test.csv, got {}".format(temporary_fps)
+        assert temporary_fps[0] != temporary_fps[1], error_message
+        assert all(fp.parent == test_export_fp.parent for fp in temporary_fps), error_message
+
+class TestCalculateFileHash(object):
+    def test_valerror_on_nonpath_filepath_int(self):
+        test_filepath = test_int
+        expected_message = "filepath must be type pathlib.Path or str, got {}".format(type(test_filepath))
+        with pytest.raises(ValueError) as exception_info:
+            functions.calculate_file_hash(test_filepath)
+        error_message = "Expected the following message: {}. Got the following: {}".format(expected_message, exception_info)
+        assert exception_info.match(expected_message), error_message
+
+    def test_filenotfounderror_on_missing_file(self, tmp_path):
+        test_filepath = tmp_path / "missing.csv"
+        with pytest.raises(FileNotFoundError):
+            functions.calculate_file_hash(test_filepath)
+
+    def test_hash_changes_with_content(self, tmp_path):
+        test_filepath = tmp_path / "test.csv"
+        test_df.to_csv(test_filepath, index = False)
+        hash_before = functions.calculate_file_hash(test_filepath)
+        test_df.iloc[:50].to_csv(test_filepath, index = False)
+        hash_after = functions.calculate_file_hash(test_filepath)
+        error_message = "Hash did not change after the content of the file changed."
+        assert hash_before != hash_after, error_message
+
+    def test_hash_changes_with_shapefile_sidecar(self, tmp_path):
+        test_filepath = tmp_path / "test.shp"
+        test_gdf.to_file(test_filepath)
+        hash_before = functions.calculate_file_hash(test_filepath)
+        test_gdf.assign(A = test_gdf["A"] + 1).to_file(test_filepath)
+        hash_after = functions.calculate_file_hash(test_filepath)
+        error_message = "Hash did not change after the .dbf file of the shapefile changed."
+        assert hash_before != hash_after, error_message
+
+#%%     --- Test: load_reference_geodataframe ---
+
+class TestLoadReferenceGeodataframe(object):
+    def test_valerror_on_nonpath_import_fp_float(self):
+        test_import_fp = test_float
+        expected_message = "import_fp must be type pathlib.Path or str, got {}".format(type(test_import_fp))
+        with pytest.raises(ValueError) as exception_info:
+            functions.load_reference_geodataframe(test_import_fp)
+        error_message = "Expected the following message: {}. Got the following: {}".format(expected_message, exception_info)
+        assert exception_info.match(expected_message), error_message
+
+    def test_cached_copy_is_created(self, tmp_path):
+        test_filepath = tmp_path / "test.shp"
+        test_gdf.to_file(test_filepath)
+        cache_dir = tmp_path / "cache"
+        functions.load_reference_geodataframe(test_filepath, cache_dir = cache_dir)
+        expected = 1
+        actual = len(list(cache_dir.glob("test.*.arrow")))
+        error_message = "Expected {} cached copy, found {}".format(expected, actual)
+        assert expected == actual, error_message
+
+    def test_cached_copy_equals_source(self, tmp_path):
+        test_filepath = tmp_path / "test.shp"
+        test_gdf.to_file(test_filepath)
+        cache_dir = tmp_path / "cache"
+        expected = functions.load_reference_geodataframe(test_filepath, cache_dir = cache_dir)
+        actual = functions.load_reference_geodataframe(test_filepath, cache_dir = cache_dir)
+        error_message = "Cached copy does not equal the GeoDataFrame read from the source file."
+        assert expected.equals(actual), error_message
+        assert expected.crs == actual.crs, error_message
+
+    def test_stale_copy_is_replaced(self, tmp_path):
+        test_filepath = tmp_path / "test.shp"
+        test_gdf.to_file(test_filepath)
+        cache_dir = tmp_path / "cache"
+        functions.load_reference_geodataframe(test_filepath, cache_dir = cache_dir)
+        test_gdf.iloc[:10].to_file(test_filepath)
+        actual_gdf = functions.load_reference_geodataframe(test_filepath, cache_dir = cache_dir)
+        expected = (10, 1)
+        actual = (len(actual_gdf), len(list(cache_dir.glob("test.*.arrow"))))
+        error_message = "Expected (row count, cached copy count) {}, got {}".format(expected, actual)
+        assert expected == actual, error_message
+
+#%%     --- Test: load_reference_dataframe ---
+
+class TestLoadReferenceDataframe(object):
+    def test_valerror_on_unsupported_extension(self, tmp_path):
+        test_import_fp = tmp_path / "test.json"
+        expected_message = "import_fp must point to one of .xlsx, .xls, .csv files. Got .json"
+        with pytest.raises(ValueError) as exception_info:
+            functions.load_reference_dataframe(test_import_fp)
+        error_message = "Expected the following message: {}. Got the following: {}".format(expected_message, exception_info)
+        assert exception_info.match(expected_message), error_message
+
+    def test_cached_copy_equals_source(self, tmp_path):
+        test_filepath = tmp_path / "test.csv"
+        test_df.to_csv(test_filepath, index = False)
+        cache_dir = tmp_path / "cache"
+        expected = functions.load_reference_dataframe(test_filepath, cache_dir = cache_dir)
+        actual = functions.load_reference_dataframe(test_filepath, cache_dir = cache_dir)
+        error_message = "Cached copy does not equal the DataFrame read from the source file."
+        assert expected.equals(actual), error_message
+
+    def test_read_kwargs_are_cached_separately(self, tmp_path):
+        test_filepath = tmp_path / "test.csv"
+        test_df.to_csv(test_filepath, index = False)
+        cache_dir = tmp_path / "cache"
+        functions.load_reference_dataframe(test_filepath, cache_dir = cache_dir)
+        functions.load_reference_dataframe(test_filepath, cache_dir = cache_dir, usecols = ["A"])
+        expected = 2
+        actual = len(list(cache_dir.glob("test.*.parquet")))
+        error_message = "Expected {} cached copies, found {}".format(expected, actual)
+        assert expected == actual, error_message
+
+#%%     --- Test: read_airbnb_listings ---
+
+#%%         --- Mock listings files ---
+
+test_listings_summary = pd.DataFrame({"id": [1, 2, 3],
+                                      "name": ["a", None, "c"],
+                                      "host_id": [10, 20, 30],
+                                      "host_name": ["x", "y", None],
+                                      "neighbourhood_group": [None, None, None],
+                                      "neighbourhood": ["Fatih", "Eyup", "Fatih"],
+                                      "latitude": [41.01, 41.05, 41.02],
+                                      "longitude": [28.97, 28.93, 28.95],
+                                      "room_type": ["Private room", "Entire home/apt", "Private room"],
+                                      "price": [100, 250, 0],
+                                      "minimum_nights": [1, 2, 3]})
+
+test_listings_full = (test_listings_summary
+                      .rename(columns = {"neighbourhood": "neighbourhood_cleansed"})
+                      .assign(neighbourhood = "Istanbul, Turkey",
+                              price = ["$100.00", "$1,250.00", "$0.00"]))
+
+class TestReadAirbnbListings(object):
+    def test_valerror_on_nonpath_import_fp_int(self):
+        test_import_fp = test_int
+        expected_message = "import_fp must be type pathlib.Path or str, got {}".format(type(test_import_fp))
+        with pytest.raises(ValueError) as exception_info:
+            functions.read_airbnb_listings(test_import_fp)
+        error_message = "Expected the following message: {}. Got the following: {}".format(expected_message, exception_info)
+        assert exception_info.match(expected_message), error_message
+
+    def test_valerror_on_unknown_engine(self, tmp_path):
+        test_filepath = tmp_path / "listings.csv"
+        test_listings_summary.to_csv(test_filepath, index = False)
+        test_engine = "python"
+        expected_message = "Parameter engine must be one of c or pyarrow. Got \"{}\" as type {}.".format(test_engine, type(test_engine))
+        with pytest.raises(ValueError) as exception_info:
+            functions.read_airbnb_listings(test_filepath, engine = test_engine)
+        error_message = "Expected the following message: {}. Got the following: {}".format(expected_message, exception_info)
+        assert exception_info.match(expected_message), error_message
+
+    @pytest.mark.parametrize("engine", ["c", "pyarrow"])
+    def test_columns_and_dtypes_match_schema(self, tmp_path, engine):
+        test_filepath = tmp_path / "listings.csv"
+        test_listings_summary.to_csv(test_filepath, index = False)
+        listings = functions.read_airbnb_listings(test_filepath, engine = engine)
+        expected = functions.airbnb_listings_schema
+        actual = {column: str(dtype) for column, dtype in listings.dtypes.items()}
+        error_message = "Expected columns and dtypes {}, got {}".format(expected, actual)
+        assert list(expected.items()) == list(actual.items()), error_message
+
+    def test_engines_return_equal_dataframes(self, tmp_path):
+        test_filepath = tmp_path / "listings.csv"
+        test_listings_summary.to_csv(test_filepath, index = False)
+        expected = functions.read_airbnb_listings(test_filepath, engine = "c")
+        actual = functions.read_airbnb_listings(test_filepath, engine = "pyarrow")
+        error_message = "The c and pyarrow engines returned different dataframes."
+        assert expected.equals(actual), error_message
+
+    @pytest.mark.parametrize("engine", ["c", "pyarrow"])
+    def test_full_format_is_normalized(self, tmp_path, engine):
+        test_filepath = tmp_path / "listings.csv"
+        test_listings_full.to_csv(test_filepath, index = False)
+        listings = functions.read_airbnb_listings(test_filepath, engine = engine)
+        expected = (["Fatih", "Eyup", "Fatih"], [100, 1250, 0])
+        actual = (listings["neighbourhood"].tolist(), listings["price"].tolist())
+        error_message = "Expected (districts, prices) {}, got {}".format(expected, actual)
+        assert expected == actual, error_message
+
+    @pytest.mark.parametrize("engine", ["c", "pyarrow"])
+    def test_gzipped_full_format_is_read(self, tmp_path, engine):
+        test_filepath = tmp_path / "listings.csv.gz"
+        test_listings_full.to_csv(test_filepath, index = False, encoding = "utf-8-sig")
+        listings = functions.read_airbnb_listings(test_filepath, engine = engine)
+        expected = [100, 1250, 0]
+        actual = listings["price"].tolist()
+        error_message = "Expected prices {}, got {}".format(expected, actual)
+        assert expected == actual, error_message
+
+    @pytest.mark.parametrize("test_listings", [test_listings_summary.assign(price = [100, None, np.inf]),
+                                               test_listings_full.assign(price = ["$100.00", None, "$inf"])])
+    @pytest.mark.parametrize("engine", ["c", "pyarrow"])
+    def test_listings_without_finite_price_are_dropped(self, tmp_path, test_listings, engine):
+        test_filepath = tmp_path / "listings.csv"
+        test_listings.to_csv(test_filepath, index = False)
+        listings = functions.read_airbnb_listings(test_filepath, engine = engine)
+        expected = ([1], [100], "int32")
+        actual = (listings["id"].tolist(), listings["price"].tolist(), str(listings["price"].dtype))
+        error_message = "Expected (ids, prices, dtype) {}, got {}".format(expected, actual)
+        assert expected == actual, error_message
+
+    def test_valerror_on_missing_columns(self, tmp_path):
+        test_filepath = tmp_path / "listings.csv"
+        test_listings_summary.drop(columns = ["price"]).to_csv(test_filepath, index = False)
+        with pytest.raises(ValueError) as exception_info:
+            functions.read_airbnb_listings(test_filepath)
+        error_message = "Expected a ValueError naming the missing column. Got the following: {}".format(exception_info)
+        assert exception_info.match("price"), error_message
+
+#%%     --- Test: iter_airbnb_listings ---
+
+class TestIterAirbnbListings(object):
+    def test_valerror_on_nonpositive_chunksize(self, tmp_path):
+        test_filepath = tmp_path / "listings.csv"
+        test_listings_summary.to_csv(test_filepath, index = False)
+        test_chunksize = 0
+        expected_message = "chunksize must be a positive int, got {}".format(test_chunksize)
+        with pytest.raises(ValueError) as exception_info:
+            next(functions.iter_airbnb_listings(test_filepath, chunksize = test_chunksize))
+        error_message = "Expected the following message: {}. Got the following: {}".format(expected_message, exception_info)
+        assert exception_info.match(expected_message), error_message
+
+    def test_chunks_add_up_to_full_read(self, tmp_path):
+        test_filepath = tmp_path / "listings.csv"
+        test_listings_full.to_csv(test_filepath, index = False)
+        chunks = list(functions.iter_airbnb_listings(test_filepath, chunksize = 2))
+        expected = functions.read_airbnb_listings(test_filepath).astype({"neighbourhood": object, "room_type": object})
+        actual = pd.concat(chunks).astype({"neighbourhood": object, "room_type": object})
+        error_message = "Expected 2 chunks that add up to the full read, got {} chunks.".format(len(chunks))
+        assert len(chunks) == 2, error_message
+        assert expected.equals(actual), error_message
+
+#%%     --- Test: write_partitioned_dataset ---
+
+test_partitioned_gdf = test_gdf.assign(district = np.where(test_gdf["A"] < 5, "Sisli", "Kadikoy"))
+
+class TestWritePartitionedDataset(object):
+    def test_valerror_on_missing_partition_column(self, tmp_path):
+        test_partition_column = "district"
+        expected_message = "partition_column must be a column of dataframe, got {}".format(test_partition_column)
+        with pytest.raises(ValueError) as exception_info:
+            functions.write_partitioned_dataset(test_df, tmp_path / "dataset", test_partition_column)
+        error_message = "Expected the following message: {}. Got the following: {}".format(expected_message, exception_info)
+        assert exception_info.match(expected_message), error_message
+
+    def test_valerror_on_null_partition_values(self, tmp_path):
+        test_dataframe = test_df.assign(district = None)
+        expected_message = "partition_column district must not contain null values"
+        with pytest.raises(ValueError) as exception_info:
+            functions.write_partitioned_dataset(test_dataframe, tmp_path / "dataset", "district")
+        error_message = "Expected the following message: {}. Got the following: {}".format(expected_message, exception_info)
+        assert exception_info.match(expected_message), error_message
+
+    def test_one_folder_per_partition(self, tmp_path):
+        export_dir = tmp_path / "dataset"
+        functions.write_partitioned_dataset(test_partitioned_gdf, export_dir, "district")
+        expected = ["district=Kadikoy", "district=Sisli"]
+        actual = sorted(path.name for path in export_dir.iterdir() if path.is_dir())
+        error_message = "Expected partition folders {}, got {}".format(expected, actual)
+        assert expected == actual, error_message
+
+#%%     --- Test: read_partitioned_dataset ---
+
+class TestReadPartitionedDataset(object):
+    def test_valerror_on_missing_dataset(self, tmp_path):
+        test_import_dir = tmp_path / "dataset"
+        expected_message = "import_dir {} does not contain a partitioned dataset".format(test_import_dir)
+        with pytest.raises(ValueError) as exception_info:
+            functions.read_partitioned_dataset(test_import_dir)
+        error_message = "Expected the following message: {}. Got the following: {}".format(expected_message, exception_info)
+        assert exception_info.match(expected_message), error_message
+
+    def test_selected_partition_equals_mask(self, tmp_path):
+        export_dir = tmp_path / "dataset"
+        functions.write_partitioned_dataset(test_partitioned_gdf, export_dir, "district")
+        actual = functions.read_partitioned_dataset(export_dir, partitions = ["Sisli"])
+        expected = test_partitioned_gdf.loc[test_partitioned_gdf["district"] == "Sisli", actual.columns].reset_index(drop = True)
+        error_message = "The Sisli partition does not equal the rows of Sisli in the source GeoDataFrame."
+        assert isinstance(actual, gpd.GeoDataFrame), error_message
+        assert expected.equals(actual), error_message
+        assert expected.crs == actual.crs, error_message
+
+    def test_columns_without_geometry_return_dataframe(self, tmp_path):
+        export_dir = tmp_path / "dataset"
+        functions.write_partitioned_dataset(test_partitioned_gdf, export_dir, "district")
+        actual = functions.read_partitioned_dataset(export_dir, columns = ["A"])
+        expected = (pd.DataFrame, ["A", "district"], len(test_partitioned_gdf))
+        actual = (type(actual), actual.columns.tolist(), len(actual))
+        error_message = "Expected (type, columns, row count) {}, got {}".format(expected, actual)
+        assert expected == actual, error_message
+
+    def test_unknown_partition_returns_empty_dataframe(self, tmp_path):
+        export_dir = tmp_path / "dataset"
+        functions.write_partitioned_dataset(test_df.assign(district = "Sisli"), export_dir, "district")
+        actual = functions.read_partitioned_dataset(export_dir, partitions = ["Fatih"])
+        expected = (0, list("ABCDE") + ["district"])
+        actual = (len(actual), actual.columns.tolist())
+        error_message = "Expected (row count, columns) {}, got {}".format(expected, actual)
+        assert expected == actual, error_message
+
+#%%     --- Test: calculate_hilbert_key ---
+
+class TestCalculateHilbertKey(object):
+    def test_valerror_on_order_out_of_range(self):
+        test_order = 32
+        expected_message = "order must be an int between 1 and 31, got {}".format(test_order)
+        with pytest.raises(ValueError) as exception_info:
+            functions.calculate_hilbert_key([0], [0], (0, 0, 1, 1), order = test_order)
+        error_message = "Expected the following message: {}. Got the following: {}".format(expected_message, exception_info)
+        assert exception_info.match(expected_message), error_message
+
+    def test_first_order_curve(self):
+        expected = [0, 1, 2, 3]
+        actual = functions.calculate_hilbert_key([0, 0, 1, 1], [0, 1, 1, 0], (0, 0, 2, 2), order = 1).tolist()
+        error_message = "Expected keys {} for the first order curve, got {}".format(expected, actual)
+        assert expected == actual, error_message
+
+    def test_consecutive_keys_are_neighboring_cells(self):
+        x_cells, y_cells = np.meshgrid(np.arange(16), np.arange(16))
+        x_cells, y_cells = x_cells.ravel(), y_cells.ravel()
+        keys = functions.calculate_hilbert_key(x_cells + 0.5, y_cells + 0.5, (0, 0, 16, 16), order = 4)
+        curve_order = np.argsort(keys)
+        steps = np.abs(np.diff(x_cells[curve_order])) + np.abs(np.diff(y_cells[curve_order]))
+        error_message = "Expected 256 unique keys with unit steps between consecutive cells."
+        assert len(np.unique(keys)) == 256, error_message
+        assert (steps == 1).all(), error_message
+
+#%%     --- Test: sort_by_hilbert_key ---
+
+class TestSortByHilbertKey(object):
+    def test_valerror_on_nongdf_geodataframe(self):
+        test_geodataframe = test_df
+        expected_message = "geodataframe must be type geopandas.GeoDataFrame, got {}".format(type(test_geodataframe))
+        with pytest.raises(ValueError) as exception_info:
+            functions.sort_by_hilbert_key(test_geodataframe)
+        error_message = "Expected the following message: {}. Got the following: {}".format(expected_message, exception_info)
+        assert exception_info.match(expected_message), error_message
+
+    def test_sorted_by_key_with_same_rows(self):
+        sorted_gdf = functions.sort_by_hilbert_key(test_gdf)
+        error_message = "Expected the same rows sorted by the hilbert column."
+        assert sorted_gdf["hilbert"].is_monotonic_increasing, error_message
+        assert sorted(sorted_gdf["A"].tolist()) == sorted(test_gdf["A"].tolist()), error_message
@@ -9,22 +9,15 @@ The script can be found at:
 """
 #%% --- Import Required Packages ---
 
-import os
-from pathlib import Path # To wrap around filepaths
 import pytest
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 from src.helper_functions import data_preparation_helper_functions as functions
+from src.helper_functions.data_io_helper_functions import read_airbnb_listings
 from numpy import arange
 
-#%% --- Set proper directory to assure integration with doit ---
-
-abspath = os.path.abspath(__file__)
-dname = os.path.dirname(abspath)
-os.chdir(dname)
-
 #%% --- Create mock test objects ---
 
     #%% --- Normal dataframe ---
@@ -57,6 +50,19 @@ test_null_values_df_extended = pd.DataFrame(np.random.randint(10, size = (5,2)),
                                    columns = column_names_extended,
                                    index = index_names)
     
+    #%% --- raw airbnb listings dataframe ---
+
+test_listings = pd.DataFrame({"id": [1, 2, 3, 4, 5],
+                              "name": ["a", None, "c", "d", "e"],
+                              "host_id": [10, 20, 30, 40, 50],
+                              "host_name": ["v", "w", "x", "y", "z"],
+                              "neighbourhood_group": [None, None, None, None, None],
+                              "neighbourhood": ["Fatih", "Eyup", "Sisli", "Eyup", "Kadikoy"],
+                              "latitude": [41.01, 41.05, 41.06, 41.07, 40.99],
+                              "longitude": [28.97, 28.93, 28.98, 28.92, 29.02],
+                              "room_type": ["Private room"] * 5,
+                              "price": [100, 250, 0, 300, 80]})
+
     #%% --- other  ---
 
 test_str = "Test"
@@ -67,6 +73,20 @@ test_sample_size_int_correct = 5
 test_sample_size_int_wrong = 105
     
 #%% --- Testing ---
+#%%     --- Test: is_eda_enabled
+
+class TestIsEdaEnabled(object):
+    def test_enabled_by_default(self, monkeypatch):
+        monkeypatch.delenv("EDA", raising = False)
+        error_message = "Expected EDA to be enabled when the EDA variable is not set."
+        assert functions.is_eda_enabled(), error_message
+
+    @pytest.mark.parametrize("value", ["off", "OFF", "0", "false", " no "])
+    def test_disabled_by_off_values(self, monkeypatch, value):
+        monkeypatch.setenv("EDA", value)
+        error_message = "Expected EDA={} to disable EDA.".format(value)
+        assert not functions.is_eda_enabled(), error_message
+
 #%%     --- Test: sample_and_read_from_df
 
 class TestSampleAndReadFromDf(object):
@@ -116,6 +136,56 @@ class TestSampleAndReadFromDf(object):
         error_message = "Expected the following message: {}. Got the following: {}".format(expected_message, exception_info)
         assert exception_info.match(expected_message), error_message
         
+#%%     --- Test: sample_and_read_from_file
+
+class TestSampleAndReadFromFile(object):
+    def test_valerror_on_nonpath_import_fp_int(self):
+        expected_message = "import_fp must be type pathlib.Path or str, got {}".format(type(test_int))
+        with pytest.raises(ValueError) as exception_info:
+            functions.sample_and_read_from_file(test_int, test_sample_size_int_correct)
+        error_message = "Expected the following message: {}. Got the following: {}".format(expected_message, exception_info)
+        assert exception_info.match(expected_message), error_message
+
+    @pytest.mark.parametrize("sample_function", [functions.sample_and_read_from_file, functions.sample_rows_from_file])
+    def test_valerror_on_negative_sample_size(self, tmp_path, sample_function):
+        test_fp = tmp_path.joinpath("test.csv")
+        test_df.to_csv(test_fp, index = False)
+        expected_message = "sample_size must be a non-negative integer, got -1"
+        with pytest.raises(ValueError) as exception_info:
+            sample_function(test_fp, -1)
+        error_message = "Expected the following message: {}. Got the following: {}".format(expected_message, exception_info)
+        assert exception_info.match(expected_message), error_message
+
+    def test_indexerror_on_wrong_sample_size(self, tmp_path):
+        test_fp = tmp_path.joinpath("test.csv")
+        test_df.to_csv(test_fp, index = False)
+        expected_message = "file length must be larger than or equal to sample_size. file length is 100, sample_size is 105"
+        with pytest.raises(IndexError) as exception_info:
+            functions.sample_and_read_from_file(test_fp, test_sample_size_int_wrong, output = tmp_path.joinpath("sample.txt"))
+        error_message = "Expected the following message: {}. Got the following: {}".format(expected_message, exception_info)
+        assert exception_info.match(expected_message), error_message
+
+    @pytest.mark.parametrize("suffix", [".csv", ".parquet"])
+    def test_sample_rows_are_rows_of_the_file(self, tmp_path, suffix):
+        test_fp = tmp_path.joinpath("test" + suffix)
+        test_df.to_csv(test_fp, index = False) if suffix == ".csv" else test_df.to_parquet(test_fp, index = False)
+        sample = functions.sample_rows_from_file(test_fp, 10, chunksize = 7, random_state = 0)
+        expected = test_df.loc[sample.index, :]
+        error_message = "Expected 10 rows of the file in order, got {}".format(sample)
+        assert len(sample) == 10 and sample.index.is_monotonic_increasing, error_message
+        assert np.allclose(expected.values, sample.values, equal_nan = True), error_message
+
+    def test_sample_is_written_once(self, tmp_path):
+        test_fp = tmp_path.joinpath("test.csv")
+        test_listings.to_csv(test_fp, index = False)
+        output_fp = tmp_path.joinpath("sample.txt")
+        sample = functions.sample_and_read_from_file(test_fp, 2, output = output_fp, chunksize = 2)
+        expected = functions.format_sample(sample)
+        actual = output_fp.read_text(encoding = "utf-8")
+        error_message = "Expected {}, got {}".format(expected, actual)
+        assert expected == actual, error_message
+        assert actual.startswith("Commencing with id column of the dataframe\n\n{}\n\n".format(sample.iloc[0, 0])), error_message
+
 #%%     --- Test: report_null_values ---
 #%%         --- Test helper function: is_null_values_dataframe ---
 
@@ -259,6 +329,42 @@ class TestPlotNullValuesMatrix(object):
         error_message = "Expected the following message: {}. Got the following: {}".format(expected_message, exception_info)
         assert exception_info.match(expected_message), error_message
     
+#%%         --- Test helper function: calculate_binned_nullity ---
+
+class TestCalculateBinnedNullity(object):
+    def test_valerror_on_nonint_bin_count(self):
+        expected_message = "bin_count must be a positive integer, got 0"
+        with pytest.raises(ValueError) as exception_info:
+            functions.calculate_binned_nullity(test_df, bin_count = 0)
+        error_message = "Expected the following message: {}. Got the following: {}".format(expected_message, exception_info)
+        assert exception_info.match(expected_message), error_message
+
+    def test_buckets_add_up_to_null_counts(self):
+        binned_nullity = functions.calculate_binned_nullity(test_df, bin_count = 7)
+        bin_sizes = np.diff(np.append(binned_nullity.index, len(test_df)))
+        expected = test_df.isnull().sum().values
+        actual = (binned_nullity.values * bin_sizes[:, np.newaxis]).sum(axis = 0).round()
+        error_message = "Expected {} buckets that add up to {}, got {}".format(7, expected, actual)
+        assert binned_nullity.shape == (7, 5) and (expected == actual).all(), error_message
+
+    def test_bucket_per_row_for_small_dataframe(self):
+        actual = functions.calculate_binned_nullity(test_df.iloc[:3], bin_count = 200)
+        expected = test_df.iloc[:3].isnull().astype(float).reset_index(drop = True)
+        error_message = "Expected {}, got {}".format(expected, actual)
+        assert (actual.values == expected.values).all(), error_message
+
+#%%         --- Test helper function: plot_null_values_heatmap ---
+
+class TestPlotNullValuesHeatmap(object):
+    def test_draws_one_image_with_colorbar(self):
+        large_df = pd.DataFrame({"A": np.where(np.arange(100000) % 3 == 0, np.nan, 1.0), "B": 1.0})
+        fig = functions.plot_null_values_heatmap(large_df)
+        images = fig.axes[0].get_images()
+        error_message = "Expected a 200 x 2 image and a colorbar, got {} axes".format(len(fig.axes))
+        assert len(images) == 1 and images[0].get_array().shape == (200, 2), error_message
+        assert len(fig.axes) == 2, error_message
+        plt.close(fig)
+
 #%%     --- Test subfunction: calculate_null_values ---
 
 class TestCalculateNullValues(object):
@@ -400,6 +506,19 @@ class TestVisualizeNullValues(object):
         error_message = "Expected the following message: {}. Got the following: {}".format(expected_message, exception_info)
         assert exception_info.match(expected_message), error_message
 
+    def test_valerror_on_matrix_without_dataframe(self):
+        expected_message = "Parameter kind matrix needs the dataframe that null_values_dataframe was calculated from."
+        with pytest.raises(ValueError) as exception_info:
+            functions.visualize_null_values(test_null_values_df, kind = "matrix")
+        error_message = "Expected the following message: {}. Got the following: {}".format(expected_message, exception_info)
+        assert exception_info.match(expected_message), error_message
+
+    def test_matrix_of_profile(self):
+        fig = functions.visualize_null_values(functions.profile_columns(test_df), kind = "matrix", dataframe = test_df)
+        error_message = "Expected a single image of {} columns, got {}".format(len(test_df.columns), fig.axes)
+        assert len(fig.axes) == 1 and fig.axes[0].get_images()[0].get_array().shape == (100, 5), error_message
+        plt.close(fig)
+
 #%% --- Test main function: report_null_values ---
 
 class TestReportNullValues(object):
@@ -443,13 +562,184 @@ class TestReportNullValues(object):
         actual = type(functions.report_null_values(test_dataframe, calculate_percentages = False))
         error_message = "Return object is not correct. Expected {}, got {}".format(expected,actual)
         assert not isinstance(actual, expected), error_message
-        
 
-    
-    
+#%%     --- Test: profile_columns ---
 
-        
-        
-        
+class TestProfileColumns(object):
+    def test_valerror_on_nondf_data_int(self):
+        expected_message = "data must be type pd.DataFrame, pathlib.Path or str, got {}".format(type(test_int))
+        with pytest.raises(ValueError) as exception_info:
+            functions.profile_columns(test_int)
+        error_message = "Expected the following message: {}. Got the following: {}".format(expected_message, exception_info)
+        assert exception_info.match(expected_message), error_message
+
+    def test_null_values_match_calculate_null_values(self):
+        expected = functions.calculate_null_values(test_df)
+        actual = functions.profile_columns(test_df).loc[:, ["null_count", "null_percentage"]]
+        error_message = "Expected {}, got {}".format(expected, actual)
+        assert np.allclose(expected.values, actual.values.astype(float)), error_message
+
+    def test_chunks_give_the_same_profile(self):
+        expected = functions.profile_columns(test_df)
+        actual = functions.profile_columns(test_df, chunksize = 7)
+        error_message = "Expected {}, got {}".format(expected, actual)
+        assert expected.equals(actual), error_message
+
+    def test_statistics(self):
+        actual = functions.profile_columns(test_df).loc["A", :]
+        expected = [test_df.loc[:, "A"].nunique(), test_df.loc[:, "A"].min(), test_df.loc[:, "A"].max(),
+                    test_df.loc[:, "A"].quantile(0.25), test_df.loc[:, "A"].median(), test_df.loc[:, "A"].quantile(0.75)]
+        error_message = "Expected {}, got {}".format(expected, actual)
+        assert list(actual.loc[["distinct_count", "min", "max", "q25", "q50", "q75"]]) == expected, error_message
+
+    def test_mixed_types_in_csv_chunks(self, tmp_path):
+        test_fp = tmp_path.joinpath("mixed.csv")
+        pd.DataFrame({"A": ["1", "2", "3", "x"], "B": [1.5, 2.5, None, 4.5]}).to_csv(test_fp, index = False)
+        actual = functions.profile_columns(test_fp, chunksize = 2)
+        error_message = "Expected column A to be read as int64|object, got {}".format(actual)
+        assert actual.loc["A", "dtype"] == "int64|object" and actual.loc["A", "mixed_types"], error_message
+        assert actual.loc["B", "null_count"] == 1 and not actual.loc["B", "mixed_types"], error_message
+
+    def test_print_null_values_renders_profile(self, capsys):
+        functions.print_null_values(functions.profile_columns(test_df))
+        captured = capsys.readouterr()
+        error_message = "Expected a report of 5 columns, got {}".format(captured.out)
+        assert captured.out.count("null values.") == 10, error_message
+
+#%%     --- Test: classify_names ---
+
+test_institution_names = pd.Series(["Özel Maya Estetik", "Özel Avrupa Göz Merkezi", "Göztepe Aile Sağliği Merkezi",
+                                    "Sariyer Ağiz ve Diş Sağliği Merkezi", "Aesthetic Hairtrans Saç Ekim Merkezi",
+                                    "İfakat Saçmaci Aile Sağliği Merkezi", None],
+                                   index = [5, 5, 6, 7, 8, 9, 10])
+
+class TestClassifyNames(object):
+    def test_valerror_on_invalid_category(self):
+        expected_message = "Categories must be valid Python identifiers, got \\['hair transplant'\\]"
+        with pytest.raises(ValueError) as exception_info:
+            functions.classify_names(test_institution_names, {"hair transplant": [r"hair\w*"]})
+        error_message = "Expected the following message: {}. Got the following: {}".format(expected_message, exception_info)
+        assert exception_info.match(expected_message), error_message
+
+    def test_categories(self):
+        actual = functions.classify_names(test_institution_names)
+        expected = pd.DataFrame({"aesthetic": [True, False, False, False, True, False, False],
+                                 "hair_transplant": [False, False, False, False, True, False, False],
+                                 "dental": [False, False, False, True, False, False, False],
+                                 "eye": [False, True, False, False, False, False, False]},
+                                index = test_institution_names.index)
+        error_message = "Expected {}, got {}".format(expected, actual)
+        assert expected.equals(actual), error_message
+
+    def test_aesthetic_matches_the_word_stems(self):
+        names = pd.Series(["Plastik Cerrahi", "Newest Klinik", "ESTETIK", "Astım Merkezi", "Test Merkezi"])
+        actual = list(functions.classify_names(names).loc[:, "aesthetic"])
+        expected = [True, False, True, True, False]
+        error_message = "Expected {}, got {}".format(expected, actual)
+        assert expected == actual, error_message
+
+    def test_dental_matches_the_word_and_its_derivatives(self):
+        names = pd.Series(["Verem Savaş Dispanseri", "Özel Diş Kliniği", "Dişçi Ali", "DİŞLER", "Dishane"])
+        actual = list(functions.classify_names(names).loc[:, "dental"])
+        expected = [False, True, True, True, False]
+        error_message = "Expected {}, got {}".format(expected, actual)
+        assert expected == actual, error_message
+
+#%%     --- Test: drop_duplicate_places ---
+
+#Rows 0 and 3 are the same clinic, row 1 is a different clinic in the same building,
+#row 4 has the name of row 0 on the other side of the city.
+test_places = pd.DataFrame({"institution": ["Aesthetic Hairtrans Saç Ekim Merkezi", "Özel Maya Estetik",
+                                            "Dr.İbrahim AŞKAR", "AESTHETIC HAIRTRANS SAC EKIM MERKEZI",
+                                            "Aesthetic Hairtrans Saç Ekim Merkezi", None, None],
+                            "latitude": [41.0500, 41.0500, 41.0600, 41.0502, 40.9000, 41.0700, 41.0700],
+                            "longitude": [28.9800, 28.9800, 28.9900, 28.9801, 29.2000, 29.0000, 29.0000]},
+                           index = [10, 11, 12, 13, 14, 15, 16])
+
+class TestDropDuplicatePlaces(object):
+    def test_valerror_on_nondf_dataframe(self):
+        expected_message = "dataframe must be type pd.DataFrame, got {}".format(type(test_str))
+        with pytest.raises(ValueError) as exception_info:
+            functions.drop_duplicate_places(test_str, "institution")
+        error_message = "Expected the following message: {}. Got the following: {}".format(expected_message, exception_info)
+        assert exception_info.match(expected_message), error_message
+
+    def test_valerror_on_bad_threshold(self):
+        expected_message = "similarity_threshold must be between 0 and 1, got 2"
+        with pytest.raises(ValueError) as exception_info:
+            functions.drop_duplicate_places(test_places, "institution", similarity_threshold = 2)
+        error_message = "Expected the following message: {}. Got the following: {}".format(expected_message, exception_info)
+        assert exception_info.match(expected_message), error_message
+
+    def test_same_place_is_merged(self):
+        actual = functions.drop_duplicate_places(test_places, "institution", "latitude", "longitude")
+        expected = test_places.loc[[10, 11, 12, 14, 15, 16], :]
+        error_message = "Expected {}, got {}".format(expected, actual)
+        assert expected.equals(actual), error_message
+
+    def test_names_only(self):
+        actual = list(functions.drop_duplicate_places(test_places, "institution").index)
+        expected = [10, 11, 12, 15, 16]
+        error_message = "Expected {}, got {}".format(expected, actual)
+        assert expected == actual, error_message
+
+    def test_duplicates_are_clustered_transitively(self):
+        pairs = pd.DataFrame({"left": [3, 0, 5], "right": [4, 3, 6]})
+        actual = list(functions.cluster_duplicates(pairs, 7))
+        expected = [0, 1, 2, 0, 0, 5, 5]
+        error_message = "Expected {}, got {}".format(expected, actual)
+        assert expected == actual, error_message
+
+#%%     --- Test: clean_airbnb_listings ---
+
+class TestCleanAirbnbListings(object):
+    def test_valerror_on_nondf_listings_str(self):
+        test_listings_input = test_str
+        expected_message = "listings must be type pd.DataFrame, got {}".format(type(test_listings_input))
+        with pytest.raises(ValueError) as exception_info:
+            functions.clean_airbnb_listings(test_listings_input)
+        error_message = "Expected the following message: {}. Got the following: {}".format(expected_message, exception_info)
+        assert exception_info.match(expected_message), error_message
+
+    def test_valerror_on_wrong_column_count(self):
+        test_listings_input = test_df
+        expected_message = "listings must have 9 columns, got 5"
+        with pytest.raises(ValueError) as exception_info:
+            functions.clean_airbnb_listings(test_listings_input)
+        error_message = "Expected the following message: {}. Got the following: {}".format(expected_message, exception_info)
+        assert exception_info.match(expected_message), error_message
+
+    def test_cleaned_rows_and_districts(self, tmp_path):
+        test_filepath = tmp_path / "listings.csv"
+        test_listings.to_csv(test_filepath, index = False)
+        listings = read_airbnb_listings(test_filepath)
+        cleaned = functions.clean_airbnb_listings(listings)
+        expected = ([1, 4, 5], ["Fatih", "Eyupsultan", "Kadikoy"], ["Fatih", "Eyüpsultan", "Kadıköy"])
+        actual = (cleaned["listing_id"].tolist(), cleaned["district_eng"].tolist(), cleaned["district_tr"].tolist())
+        error_message = "Expected (ids, district_eng, district_tr) {}, got {}".format(expected, actual)
+        assert expected == actual, error_message
+
+#%%     --- Test: stream_clean_airbnb_listings ---
+
+class TestStreamCleanAirbnbListings(object):
+    def test_valerror_on_nonpath_export_fp_int(self, tmp_path):
+        test_export_fp = test_int
+        expected_message = "export_fp must be type pathlib.Path or str, got {}".format(type(test_export_fp))
+        with pytest.raises(ValueError) as exception_info:
+            functions.stream_clean_airbnb_listings(tmp_path / "listings.csv", test_export_fp)
+        error_message = "Expected the following message: {}. Got the following: {}".format(expected_message, exception_info)
+        assert exception_info.match(expected_message), error_message
+
+    @pytest.mark.parametrize("chunksize", [1, 2, 100])
+    def test_streamed_output_equals_in_memory_output(self, tmp_path, chunksize):
+        import_fp = tmp_path / "listings.csv"
+        export_fp = tmp_path / "listings_processed.csv"
+        test_listings.to_csv(import_fp, index = False)
+        row_count = functions.stream_clean_airbnb_listings(import_fp, export_fp, chunksize = chunksize)
+        expected = functions.clean_airbnb_listings(read_airbnb_listings(import_fp)).astype({"district_eng": object, "district_tr": object})
+        actual = pd.read_csv(export_fp, encoding = "utf-8-sig", dtype = {"latitude": "float32", "longitude": "float32",
+                                                                         "price": "int32", "room_type": "category"})
+        error_message = "Streamed output with chunksize {} does not match the in-memory output.".format(chunksize)
+        assert row_count == len(expected), error_message
+        assert expected.reset_index(drop = True).equals(actual), error_message
 
-        
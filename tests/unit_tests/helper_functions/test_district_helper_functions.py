@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+------ What is this file? ------
+
+This test module contains some tests for the district_helper_functions.py script.
+The script can be found at:
+    src/helper_functions/district_helper_functions.py
+
+"""
+#%% --- Import Required Packages ---
+
+import pytest
+import pandas as pd
+from src.helper_functions import district_helper_functions as functions
+
+#%% --- Create test data ---
+
+#Spelled as in istanbul_districts.shp
+test_districts = pd.DataFrame({"district_e": ["Sisli", "Kadikoy", "Eyupsultan", "Gaziosmanpasa"],
+                               "district_t": ["Şi̇şli̇", "Kadiköy", "Eyüpsultan", "Gazi̇ osmanpaşa"]})
+
+test_registry = functions.build_district_registry(test_districts)
+
+test_str = "Test"
+
+#%% --- Run tests ---
+
+class TestBuildDistrictRegistry(object):
+    def test_valerror_on_nondf_districts(self):
+        expected_message = "districts_gdf must be type pd.DataFrame, got {}".format(type(test_str))
+        with pytest.raises(ValueError) as exception_info:
+            functions.build_district_registry(test_str)
+        error_message = "Expected the following message: {}. Got the following: {}".format(expected_message, exception_info)
+        assert exception_info.match(expected_message), error_message
+
+    def test_valerror_on_duplicated_district(self):
+        test_districts_input = test_districts.assign(district_e = ["Sisli", "Kadikoy", "Eyupsultan", "SISLI"])
+        expected_message = "Districts must have distinct names, got \\['Sisli', 'SISLI'\\]"
+        with pytest.raises(ValueError) as exception_info:
+            functions.build_district_registry(test_districts_input)
+        error_message = "Expected the following message: {}. Got the following: {}".format(expected_message, exception_info)
+        assert exception_info.match(expected_message), error_message
+
+    def test_names_are_fixed_and_sorted(self):
+        expected = pd.DataFrame({"district_eng": ["Eyupsultan", "Gaziosmanpasa", "Kadikoy", "Sisli"],
+                                 "district_tr": ["Eyüpsultan", "Gaziosmanpaşa", "Kadıköy", "Şişli"],
+                                 "district_ascii": ["eyupsultan", "gaziosmanpasa", "kadikoy", "sisli"]})
+        error_message = "Expected {}, got {}".format(expected, test_registry)
+        assert expected.equals(test_registry), error_message
+
+class TestToDistrictCategorical(object):
+    def test_valerror_on_unknown_district(self):
+        expected_message = "names must be districts of registry, got \\['Atlantis'\\]"
+        with pytest.raises(ValueError) as exception_info:
+            functions.to_district_categorical(["Sisli", "Atlantis"], test_registry)
+        error_message = "Expected the following message: {}. Got the following: {}".format(expected_message, exception_info)
+        assert exception_info.match(expected_message), error_message
+
+    def test_valerror_on_unknown_language(self):
+        expected_message = "language must be one of \\['eng', 'tr', 'ascii'\\], got de"
+        with pytest.raises(ValueError) as exception_info:
+            functions.to_district_categorical(["Sisli"], test_registry, "de")
+        error_message = "Expected the following message: {}. Got the following: {}".format(expected_message, exception_info)
+        assert exception_info.match(expected_message), error_message
+
+    def test_spellings_share_a_code(self):
+        test_names = pd.Series(["Kadıköy", "KADIKOY", "Eyup", None, "Şi̇şli̇"], index = [3, 4, 5, 6, 7], name = "district")
+        actual = functions.to_district_categorical(test_names, test_registry, "tr")
+        expected = pd.Series(["Kadıköy", "Kadıköy", "Eyüpsultan", None, "Şişli"], index = test_names.index, name = "district",
+                             dtype = functions.get_district_dtype(test_registry, "tr"))
+        error_message = "Expected {}, got {}".format(expected, actual)
+        assert expected.equals(actual), error_message
+
+    def test_languages_share_their_codes(self):
+        test_names = ["Sisli", "Eyüpsultan", "kadikoy"]
+        codes = [list(functions.to_district_categorical(test_names, test_registry, language).cat.codes)
+                 for language in functions.district_languages]
+        error_message = "Expected the same codes in every language, got {}".format(codes)
+        assert codes[0] == codes[1] == codes[2] == [3, 0, 2], error_message
+
+    def test_datasets_merge_on_codes(self):
+        left = pd.DataFrame({"district": functions.to_district_categorical(["Sisli", "Kadikoy"], test_registry),
+                             "price": [100, 200]})
+        right = pd.DataFrame({"district": functions.to_district_categorical(["KADIKÖY", "ŞİŞLİ"], test_registry),
+                              "count": [1, 2]})
+        actual = left.merge(right, on = "district")
+        error_message = "Expected a categorical join on both districts, got {}".format(actual)
+        assert isinstance(actual.loc[:, "district"].dtype, pd.CategoricalDtype), error_message
+        assert actual.loc[:, "count"].tolist() == [2, 1], error_message
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+------ What is this file? ------
+
+This test module contains some tests for the geocoding_helper_functions.py script.
+The script can be found at:
+    src/helper_functions/geocoding_helper_functions.py
+
+The Selenium backend is tested with a stand-in webdriver.
+
+"""
+#%% --- Import Required Packages ---
+
+import time
+import threading
+import pytest
+import pandas as pd
+from src.helper_functions import geocoding_helper_functions as functions
+
+#%% --- Create test data ---
+
+test_gazetteer = pd.DataFrame({"hclinic_name": ["Aesthetic Hairtrans Saç Ekim Merkezi", "Dr.İbrahim AŞKAR", "Clinic C"],
+                               "lat": [41.05, 41.06, None],
+                               "lon": [28.98, 28.99, 29.00]})
+
+class StandInDriver(object):
+    """
+    A webdriver whose page loads fail for the urls in failing_urls, until their count runs out.
+    """
+    failing_urls = {}
+    lock = threading.Lock()
+
+    def __init__(self):
+        self.url = None
+        self.page_load_timeout = None
+        self.quit_called = False
+
+    def set_page_load_timeout(self, seconds):
+        self.page_load_timeout = seconds
+
+    def get(self, url):
+        with self.lock:
+            failures_left = self.failing_urls.get(url, 0)
+            self.failing_urls[url] = max(0, failures_left - 1)
+        if failures_left > 0:
+            raise TimeoutError("The page didn't load")
+        time.sleep(0.01)
+        self.url = url
+
+    def quit(self):
+        self.quit_called = True
+
+    def find_element_by_css_selector(self, selector):
+        return self
+
+    def get_attribute(self, name):
+        return "https://maps.google.com/maps/api/staticmap?center=41.05%2C28.98&zoom=15&size=900x900"
+
+class CountingBackend(object):
+    """
+    Geocodes every place to (41.0, 29.0) after delay seconds, and counts the calls.
+    """
+    def __init__(self, delay = 0, missing = (), failing = ()):
+        self.lock = threading.Lock()
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.delay = delay
+        self.missing = missing
+        self.failing = failing
+
+    def __call__(self, name, address = None):
+        with self.lock:
+            self.calls.append((time.monotonic(), name))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            if name in self.failing:
+                raise RuntimeError("The page didn't load")
+            return None if name in self.missing else (41.0, 29.0)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+#%% --- Run tests ---
+
+class TestNormalizeQuery(object):
+    def test_spelling_variants_share_a_key(self):
+        expected = functions.normalize_query("Dr. İbrahim Aşkar - Saç Ekim")
+        actual = functions.normalize_query("DR IBRAHIM ASKAR  sac ekim")
+        error_message = "Expected {}, got {}".format(expected, actual)
+        assert expected == actual == "dr ibrahim askar sac ekim", error_message
+
+    def test_address_is_part_of_the_key(self):
+        expected = "clinic c|sisli istanbul"
+        actual = functions.normalize_query("Clinic C", "Şişli, İstanbul")
+        error_message = "Expected {}, got {}".format(expected, actual)
+        assert expected == actual, error_message
+
+    def test_valerror_on_empty_name(self):
+        expected_message = "name must be a non-empty string, got ' - '"
+        with pytest.raises(ValueError) as exception_info:
+            functions.normalize_query(" - ")
+        error_message = "Expected the following message: {}. Got the following: {}".format(expected_message, exception_info)
+        assert exception_info.match(expected_message), error_message
+
+class TestCreateRateLimiter(object):
+    def test_calls_are_spaced(self):
+        wait = functions.create_rate_limiter(20)
+        call_times = []
+        for _ in range(4):
+            wait()
+            call_times.append(time.monotonic())
+        error_message = "Expected 4 calls to take 0.15 seconds at least, got {}".format(call_times[-1] - call_times[0])
+        assert call_times[-1] - call_times[0] >= 0.14, error_message
+
+    def test_valerror_on_bad_rate(self):
+        expected_message = "calls_per_second must be positive, got 0"
+        with pytest.raises(ValueError) as exception_info:
+            functions.create_rate_limiter(0)
+        error_message = "Expected the following message: {}. Got the following: {}".format(expected_message, exception_info)
+        assert exception_info.match(expected_message), error_message
+
+class TestBackends(object):
+    def test_gazetteer_backend(self):
+        backend = functions.create_gazetteer_backend(test_gazetteer)
+        actual = [backend("DR. IBRAHIM ASKAR"), backend("Dr.İbrahim AŞKAR", "Şişli"), backend("Clinic C")]
+        expected = [(41.06, 28.99), (41.06, 28.99), None]
+        error_message = "Expected {}, got {}".format(expected, actual)
+        assert expected == actual, error_message
+
+    def test_selenium_backend(self):
+        backend, drivers = functions.create_selenium_backend(StandInDriver, page_load_timeout = 5)
+        actual = backend("Clinic C")
+        error_message = "Expected (41.05, 28.98) from one driver, got {} from {}".format(actual, drivers)
+        assert actual == (41.05, 28.98) and len(drivers) == 1, error_message
+        assert drivers[0].url == functions.google_maps_search_url + "Clinic C", error_message
+        assert drivers[0].page_load_timeout == 5, error_message
+
+class TestSeleniumDriverPool(object):
+    def test_failed_driver_is_recycled(self, monkeypatch):
+        monkeypatch.setattr(StandInDriver, "failing_urls", {functions.google_maps_search_url + "Clinic C": 1})
+        created = []
+        def create_driver():
+            created.append(StandInDriver())
+            return created[-1]
+        backend, drivers = functions.create_selenium_backend(create_driver, retries = 1)
+        actual = backend("Clinic C")
+        error_message = "Expected a retry with a new driver, got {} from {}".format(actual, created)
+        assert actual == (41.05, 28.98), error_message
+        assert len(created) == 2 and created[0].quit_called and drivers == [created[1]], error_message
+
+    def test_raises_after_the_retries(self, monkeypatch):
+        monkeypatch.setattr(StandInDriver, "failing_urls", {functions.google_maps_search_url + "Clinic C": 3})
+        backend, drivers = functions.create_selenium_backend(StandInDriver, retries = 2)
+        with pytest.raises(TimeoutError):
+            backend("Clinic C")
+        error_message = "Expected no driver to be left running, got {}".format(drivers)
+        assert drivers == [], error_message
+
+    def test_pool_size_bounds_the_drivers(self, tmp_path):
+        created = []
+        def create_driver():
+            created.append(StandInDriver())
+            return created[-1]
+        backend, drivers = functions.create_selenium_backend(create_driver, pool_size = 2)
+        names = ["Clinic {}".format(number) for number in range(12)]
+        actual = functions.geocode_all(names, backend, cache_fp = None, max_workers = 4)
+        error_message = "Expected 12 places from 2 drivers, got {} from {}".format(len(actual), len(created))
+        assert list(actual.loc[:, "name"]) == names and actual.loc[:, "lat"].notna().all(), error_message
+        assert len(created) == 2 and len(drivers) == 2, error_message
+
+class TestGeocodeAll(object):
+    def test_results_are_in_order(self, tmp_path):
+        backend = CountingBackend(missing = ["Clinic B"], failing = ["Clinic C"])
+        actual = functions.geocode_all(["Clinic A", "Clinic B", "Clinic C", "clinic a"], backend,
+                                       cache_fp = tmp_path.joinpath("geocode_cache.sqlite"))
+        expected = pd.DataFrame({"name": ["Clinic A", "Clinic B", "Clinic C", "clinic a"],
+                                 "address": [None] * 4,
+                                 "lat": [41.0, None, None, 41.0],
+                                 "lon": [29.0, None, None, 29.0],
+                                 "source": ["backend", "not_found", "failed", "backend"]})
+        error_message = "Expected {}, got {}".format(expected, actual)
+        assert actual.equals(expected), error_message
+        assert len(backend.calls) == 3, "Expected the spelling variants to be geocoded once"
+
+    def test_cached_places_skip_the_backend(self, tmp_path):
+        cache_fp = tmp_path.joinpath("geocode_cache.sqlite")
+        functions.geocode_all(["Clinic A", "Clinic B"], CountingBackend(missing = ["Clinic B"]), cache_fp = cache_fp)
+        backend = CountingBackend()
+        actual = functions.geocode_all(["Clinic A", "Clinic B"], backend, cache_fp = cache_fp)
+        error_message = "Expected only the place that wasn't found to be geocoded again, got {}".format(backend.calls)
+        assert [name for _, name in backend.calls] == ["Clinic B"], error_message
+        assert list(actual.loc[:, "source"]) == ["cache", "backend"], error_message
+
+    def test_workers_run_concurrently(self, tmp_path):
+        backend = CountingBackend(delay = 0.05)
+        functions.geocode_all(["Clinic {}".format(number) for number in range(8)], backend,
+                              cache_fp = None, max_workers = 4)
+        error_message = "Expected 4 places to be geocoded at once, got {}".format(backend.max_in_flight)
+        assert backend.max_in_flight == 4, error_message
+
+class TestSeedGeocodeCache(object):
+    def test_known_places_are_carried_forward(self, tmp_path):
+        cache_fp = tmp_path.joinpath("geocode_cache.sqlite")
+        functions.geocode_all(["Clinic A"], CountingBackend(), cache_fp = cache_fp)
+        added_count = functions.seed_geocode_cache(test_gazetteer.assign(hclinic_name = ["Clinic A", "Clinic B", "Clinic C"]),
+                                                   cache_fp = cache_fp)
+        backend = CountingBackend()
+        actual = functions.geocode_all(["Clinic A", "CLINIC B", "Clinic D"], backend, cache_fp = cache_fp)
+        error_message = "Expected only Clinic D to be geocoded, got {}".format(backend.calls)
+        assert added_count == 1, "Expected Clinic B to be added to the cache, got {} places".format(added_count)
+        assert [name for _, name in backend.calls] == ["Clinic D"], error_message
+        error_message = "Expected the cached coordinates to be kept, got {}".format(actual)
+        assert list(actual.loc[:, "lat"]) == [41.0, 41.06, 41.0], error_message
+
+class TestDiffPlaceNames(object):
+    def test_diff(self):
+        actual = functions.diff_place_names(["Clinic A", "CLINIC B", "Clinic D"], ["Clinic A", "Clinic B", "Clinic C"])
+        expected = {"new": ["Clinic D"], "removed": ["Clinic C"], "kept": ["Clinic A", "CLINIC B"]}
+        error_message = "Expected {}, got {}".format(expected, actual)
+        assert expected == actual, error_message
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+------ What is this file? ------
+
+This test module keeps the import time of the helper modules in check.
+The modules can be found at:
+    src/helper_functions
+
+Each import is timed in a fresh Python process, so that modules that are
+already imported by pytest don't hide the cost.
+
+"""
+#%% --- Import Required Packages ---
+
+import os
+import sys
+import subprocess
+import pytest
+from src.helper_functions.data_io_helper_functions import project_root
+
+#%% --- DEFINITIONS ---
+
+helper_modules = ["src.helper_functions.data_io_helper_functions",
+                  "src.helper_functions.data_preparation_helper_functions",
+                  "src.helper_functions.data_analysis_helper_functions",
+                  "src.helper_functions.data_visualization_helper_functions",
+                  "src.helper_functions.web_scraping_helper_functions",
+                  "src.helper_functions.geocoding_helper_functions",
+                  "src.helper_functions.district_helper_functions"]
+
+#Packages that only some helper functions need. They are imported on first use.
+lazy_packages = ["matplotlib", "seaborn", "geopy", "scipy"]
+
+#Seconds. Importing every helper module costs about as much as importing
+#pandas and geopandas, well under a second on a laptop.
+import_time_budget = 2.5
+
+#%% --- Helper function ---
+
+def time_import(modules):
+    """
+    Imports modules in a fresh Python process.
+    Returns the import time in seconds and the lazy packages that were imported.
+    """
+    import_script = ("import sys, time\n"
+                     "start = time.perf_counter()\n"
+                     "import {}\n"
+                     "print(time.perf_counter() - start)\n"
+                     "print(','.join(sorted({{name.split('.')[0] for name in sys.modules}} & set({}))))"
+                     ).format(", ".join(modules), lazy_packages)
+    environment = dict(os.environ, PYTHONPATH = str(project_root))
+    result = subprocess.run([sys.executable, "-c", import_script], cwd = str(project_root), env = environment,
+                            stdout = subprocess.PIPE, universal_newlines = True, check = True)
+    import_time, imported_packages = result.stdout.splitlines()[-2:]
+    return float(import_time), [name for name in imported_packages.split(",") if name != ""]
+
+#%% --- Run tests ---
+
+class TestHelperFunctionsImportTime(object):
+    @pytest.mark.parametrize("module", helper_modules)
+    def test_lazy_packages_are_not_imported(self, module):
+        expected = []
+        actual = time_import([module])[1]
+        error_message = "Expected importing {} not to import any of {}, got {}".format(module, lazy_packages, actual)
+        assert expected == actual, error_message
+
+    def test_import_time_within_budget(self):
+        #The fastest of three imports, to leave out a cold disk cache
+        actual = min(time_import(helper_modules)[0] for i in range(3))
+        error_message = "Expected the helper modules to import in under {} s, took {:.2f} s".format(import_time_budget, actual)
+        assert actual < import_time_budget, error_message
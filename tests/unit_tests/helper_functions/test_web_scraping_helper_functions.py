@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+------ What is this file? ------
+
+This test module contains some tests for the web_scraping_helper_functions.py script.
+The script can be found at:
+    src/helper_functions/web_scraping_helper_functions.py
+
+The pages are served by a local stand-in HTTP server.
+
+"""
+#%% --- Import Required Packages ---
+
+import time
+import asyncio
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import pytest
+import requests
+from src.helper_functions import web_scraping_helper_functions as functions
+
+#%% --- Create test data ---
+
+#path: (body, ETag)
+test_pages = {"/clinics?page=1": (b"<a href='/clinics?page=2'>Clinic A</a>", '"v1"'),
+              "/clinics?page=2": (b"<a href='/clinics?page=3'>Clinic B</a>", '"v2"'),
+              "/clinics?page=3": (b"Clinic C", '"v3"')}
+
+class StandInHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append(self.path)
+            failures_left = server.failures.get(self.path, 0)
+            server.failures[self.path] = max(0, failures_left - 1)
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            if failures_left > 0:
+                self.send_response(503)
+                self.end_headers()
+            elif self.path.startswith("/slow"):
+                time.sleep(0.05)
+                self.send_response(200)
+                self.send_header("Content-Length", "4")
+                self.end_headers()
+                self.wfile.write(b"slow")
+            elif self.path not in test_pages:
+                self.send_response(404)
+                self.end_headers()
+            else:
+                body, etag = test_pages[self.path]
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.end_headers()
+                else:
+                    self.send_response(200)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server():
+    stand_in = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    stand_in.lock = threading.Lock()
+    stand_in.requests = []
+    stand_in.failures = {}
+    stand_in.in_flight = 0
+    stand_in.max_in_flight = 0
+    thread = threading.Thread(target = stand_in.serve_forever, kwargs = {"poll_interval": 0.05}, daemon = True)
+    thread.start()
+    stand_in.base_url = "http://127.0.0.1:{}".format(stand_in.server_address[1])
+    yield stand_in
+    stand_in.shutdown()
+    stand_in.server_close()
+
+#%% --- Run tests ---
+
+class TestCreateSession(object):
+    def test_valerror_on_bad_pool_size(self):
+        expected_message = "pool_size must be a positive integer, got 0"
+        with pytest.raises(ValueError) as exception_info:
+            functions.create_session(0)
+        error_message = "Expected the following message: {}. Got the following: {}".format(expected_message, exception_info)
+        assert exception_info.match(expected_message), error_message
+
+class TestFetchAll(object):
+    def test_pages_are_returned_in_order(self, server, tmp_path):
+        urls = [server.base_url + path for path in ["/clinics?page=3", "/clinics?page=1", "/clinics?page=3"]]
+        expected = [test_pages["/clinics?page=3"][0], test_pages["/clinics?page=1"][0], test_pages["/clinics?page=3"][0]]
+        actual = functions.fetch_all(urls, cache_dir = tmp_path)
+        error_message = "Expected {}, got {}".format(expected, actual)
+        assert expected == actual, error_message
+        assert len(server.requests) == 2, "Expected a duplicated url to be fetched once"
+
+    def test_unchanged_pages_come_from_cache(self, server, tmp_path):
+        urls = [server.base_url + path for path in test_pages]
+        first = functions.fetch_all(urls, cache_dir = tmp_path)
+        second = functions.fetch_all(urls, cache_dir = tmp_path)
+        error_message = "Expected the cached pages on the second fetch, got {}".format(second)
+        assert first == second, error_message
+
+    def test_max_age_skips_requests(self, server, tmp_path):
+        urls = [server.base_url + path for path in test_pages]
+        functions.fetch_all(urls, cache_dir = tmp_path)
+        functions.fetch_all(urls, cache_dir = tmp_path, max_age = 3600)
+        error_message = "Expected no requests within max_age, got {}".format(server.requests)
+        assert len(server.requests) == len(urls), error_message
+
+    def test_retries_with_backoff(self, server, tmp_path):
+        server.failures["/clinics?page=1"] = 2
+        actual = functions.fetch_all([server.base_url + "/clinics?page=1"], cache_dir = tmp_path, backoff = 0.01)
+        error_message = "Expected the page after two failures, got {}".format(actual)
+        assert actual == [test_pages["/clinics?page=1"][0]], error_message
+        assert len(server.requests) == 3, error_message
+
+    def test_client_errors_are_not_retried(self, server, tmp_path):
+        with pytest.raises(requests.HTTPError):
+            functions.fetch_all([server.base_url + "/missing"], cache_dir = tmp_path, backoff = 0.01)
+        error_message = "Expected a single request, got {}".format(server.requests)
+        assert len(server.requests) == 1, error_message
+
+    def test_concurrency_is_bounded(self, server, tmp_path):
+        urls = [server.base_url + "/slow?page={}".format(number) for number in range(10)]
+        functions.fetch_all(urls, concurrency = 2, cache_dir = None)
+        error_message = "Expected 2 requests in flight at most and at times, got {}".format(server.max_in_flight)
+        assert server.max_in_flight == 2, error_message
+
+    def test_fetches_within_running_event_loop(self, server, tmp_path):
+        #As in IPython and Spyder, whose event loop is already running
+        async def fetch_in_loop():
+            return functions.fetch_all([server.base_url + "/clinics?page=1"], cache_dir = tmp_path)
+        actual = asyncio.run(fetch_in_loop())
+        error_message = "Expected the page from within a running event loop, got {}".format(actual)
+        assert actual == [test_pages["/clinics?page=1"][0]], error_message
+
+class TestCrawl(object):
+    def test_follows_pagination(self, server, tmp_path):
+        def find_next_urls(url, content):
+            if b"href='" not in content:
+                return []
+            return [server.base_url + content.split(b"href='")[1].split(b"'")[0].decode()]
+        pages = functions.crawl([server.base_url + "/clinics?page=1"], find_next_urls, cache_dir = tmp_path)
+        expected = [server.base_url + path for path in test_pages]
+        error_message = "Expected {}, got {}".format(expected, list(pages.keys()))
+        assert list(pages.keys()) == expected, error_message
+
+    def test_stops_at_max_pages(self, server, tmp_path):
+        def find_next_urls(url, content):
+            return [server.base_url + "/clinics?page=2", server.base_url + "/clinics?page=3"]
+        pages = functions.crawl([server.base_url + "/clinics?page=1"], find_next_urls, max_pages = 2,
+                                cache_dir = tmp_path)
+        error_message = "Expected 2 pages, got {}".format(list(pages.keys()))
+        assert len(pages) == 2, error_message
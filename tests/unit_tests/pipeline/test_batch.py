@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""
+------ What is this file? ------
+
+This test module contains some tests for the batch.py script.
+The script can be found at:
+    src/pipeline/batch.py
+
+"""
+#%% --- Import Required Packages ---
+
+from src.pipeline import batch as functions
+from src.pipeline import registry
+
+#%% --- Run tests ---
+
+class TestPlanRuns(object):
+    def test_every_snapshot_of_every_city(self, tmp_path):
+        snapshots_dir = tmp_path.joinpath(registry.snapshots_dir, "istanbul")
+        snapshots_dir.mkdir(parents = True)
+        for snapshot in ["2020-06-30", "2021-06-30"]:
+            snapshots_dir.joinpath("{}.csv".format(snapshot)).write_text("id\n1\n")
+        expected = [("istanbul", "2020-06-30"), ("istanbul", "2021-06-30")]
+        actual = functions.plan_runs(project_root = tmp_path)
+        error_message = "Expected {}, got {}".format(expected, actual)
+        assert expected == actual, error_message
+
+    def test_given_snapshots(self, tmp_path):
+        expected = [("istanbul", "2019-06-30")]
+        actual = functions.plan_runs(["istanbul"], ["2019-06-30"], project_root = tmp_path)
+        error_message = "Expected {}, got {}".format(expected, actual)
+        assert expected == actual, error_message
+
+class TestGetSharedOutputs(object):
+    def test_shared_outputs_read_by_snapshot_stages(self):
+        artifacts, stages = registry.build_registry(registry.home_city, "2020-06-30")
+        expected = ["hair_clinics_processed", "htourism_centers_processed"]
+        actual = functions.get_shared_outputs(stages)
+        error_message = "Expected {}, got {}".format(expected, actual)
+        assert expected == actual, error_message
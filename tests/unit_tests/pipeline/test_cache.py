@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+------ What is this file? ------
+
+This test module contains some tests for the cache.py script.
+The script can be found at:
+    src/pipeline/cache.py
+
+"""
+#%% --- Import Required Packages ---
+
+import pytest
+import pandas as pd
+from pathlib import Path # To wrap around filepaths
+from src.pipeline import cache as functions
+from src.pipeline import runner
+from src.pipeline import stages
+from src.helper_functions import data_preparation_helper_functions
+from src.helper_functions import district_helper_functions
+
+#%% --- Create test data ---
+
+test_df = pd.DataFrame({"name": ["a", "b", "c"],
+                        "price": [10, 20, 30]})
+
+call_counts = {"double_price": 0}
+
+def double_price(prices, multiplier = 2):
+    call_counts["double_price"] += 1
+    prices = prices.copy()
+    prices.loc[:,"price"] = prices.loc[:,"price"] * multiplier
+    return {"doubled": prices}
+
+def triple_price(prices):
+    prices = prices.copy()
+    prices.loc[:,"price"] = prices.loc[:,"price"] * 3
+    return {"doubled": prices}
+
+test_artifacts = {"prices": {"path": Path("prices.csv"), "kind": "csv"},
+                  "doubled": {"path": Path("doubled.csv"), "kind": "csv", "persist": True}}
+
+test_stages = {"double_price": {"function": double_price,
+                                "inputs": {"prices": "prices"},
+                                "outputs": ["doubled"]}}
+
+#%% --- Run tests ---
+
+class TestCalculateCodeHash(object):
+    def test_valerror_on_non_function(self):
+        expected_message = "function must be a python function, got <class 'str'>"
+        with pytest.raises(ValueError) as exception_info:
+            functions.calculate_code_hash("double_price")
+        error_message = "Expected the following message: {}. Got the following: {}".format(expected_message, exception_info)
+        assert exception_info.match(expected_message), error_message
+
+    def test_different_functions_have_different_hashes(self):
+        expected = functions.calculate_code_hash(double_price)
+        actual = functions.calculate_code_hash(triple_price)
+        error_message = "Expected two different hashes, got {} twice".format(actual)
+        assert expected != actual, error_message
+
+    def test_hash_changes_with_constants(self, monkeypatch):
+        expected = functions.calculate_code_hash(stages.process_airbnb_data)
+        monkeypatch.setattr(district_helper_functions, "district_aliases", {"eyup": "eyupsultan", "gop": "gaziosmanpasa"})
+        actual = functions.calculate_code_hash(stages.process_airbnb_data)
+        error_message = "Expected the hash to change with district_aliases, got {} twice".format(actual)
+        assert expected != actual, error_message
+
+    def test_hash_changes_with_defaults(self, monkeypatch):
+        expected = functions.calculate_code_hash(stages.process_health_services_data)
+        monkeypatch.setattr(data_preparation_helper_functions.classify_names, "__defaults__",
+                            ({"aesthetic": [r"est\w+"]},))
+        actual = functions.calculate_code_hash(stages.process_health_services_data)
+        error_message = "Expected the hash to change with the vocabulary, got {} twice".format(actual)
+        assert expected != actual, error_message
+
+    def test_hash_is_stable(self):
+        expected = functions.calculate_code_hash(stages.process_airbnb_data)
+        actual = functions.calculate_code_hash(stages.process_airbnb_data)
+        error_message = "Expected the same hash twice, got {} and {}".format(expected, actual)
+        assert expected == actual, error_message
+
+class TestCalculateStageKey(object):
+    def test_key_changes_with_params(self):
+        test_stage = dict(test_stages["double_price"], params = {"multiplier": 2})
+        expected = functions.calculate_stage_key("double_price", test_stage, {"prices": "x"}, {})
+        test_stage = dict(test_stages["double_price"], params = {"multiplier": 3})
+        actual = functions.calculate_stage_key("double_price", test_stage, {"prices": "x"}, {})
+        error_message = "Expected the key to change with the parameters, got {} twice".format(actual)
+        assert expected != actual, error_message
+
+class TestRunPipelineWithCache(object):
+    def test_outputs_are_restored_from_cache(self, tmp_path):
+        test_df.to_csv(tmp_path / "prices.csv", encoding = "utf-8-sig", index = False)
+        runner.run_pipeline(stages = test_stages, artifacts = test_artifacts, project_root = tmp_path)
+        (tmp_path / "doubled.csv").unlink()
+        call_count = call_counts["double_price"]
+        runner.run_pipeline(stages = test_stages, artifacts = test_artifacts, project_root = tmp_path)
+        error_message = "Expected double_price to be restored from the cache, with its output written back."
+        assert call_counts["double_price"] == call_count, error_message
+        restored = pd.read_csv(tmp_path / "doubled.csv", encoding = "utf-8-sig")
+        assert restored.loc[:,"price"].tolist() == [20, 40, 60], error_message
+
+    def test_changed_input_is_recalculated(self, tmp_path):
+        test_df.to_csv(tmp_path / "prices.csv", encoding = "utf-8-sig", index = False)
+        runner.run_pipeline(stages = test_stages, artifacts = test_artifacts, project_root = tmp_path)
+        test_df.assign(price = [1, 2, 3]).to_csv(tmp_path / "prices.csv", encoding = "utf-8-sig", index = False)
+        values = runner.run_pipeline(stages = test_stages, artifacts = test_artifacts, project_root = tmp_path)
+        expected = [2, 4, 6]
+        actual = values["doubled"].loc[:,"price"].tolist()
+        error_message = "Expected {}, got {}".format(expected, actual)
+        assert expected == actual, error_message
+
+    def test_no_cache_is_stored_when_disabled(self, tmp_path):
+        test_df.to_csv(tmp_path / "prices.csv", encoding = "utf-8-sig", index = False)
+        runner.run_pipeline(stages = test_stages, artifacts = test_artifacts,
+                            use_cache = False, project_root = tmp_path)
+        error_message = "Expected no cache folder to be created."
+        assert not tmp_path.joinpath(functions.stage_cache_dir).exists(), error_message
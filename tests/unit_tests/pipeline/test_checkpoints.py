@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+------ What is this file? ------
+
+This test module contains some tests for the checkpoints.py script.
+The script can be found at:
+    src/pipeline/checkpoints.py
+
+"""
+#%% --- Import Required Packages ---
+
+import pytest
+import pandas as pd
+import geopandas as gpd
+from shapely.geometry import Point
+from src.pipeline import checkpoints as functions
+
+#%% --- Create test data ---
+
+test_df = pd.DataFrame({"price": [10, 20, 30, 40, 50]})
+
+def double_price(chunk, calls, fail_at = None):
+    calls.append(chunk.index[0])
+    if chunk.index[0] == fail_at:
+        raise RuntimeError("Interrupted")
+    return pd.DataFrame({"doubled": chunk.loc[:,"price"].values * 2})
+
+#%% --- Run tests ---
+
+class TestCalculateCheckpointKey(object):
+    def test_valerror_on_non_dataframe(self):
+        expected_message = "data must be a pandas.DataFrame"
+        with pytest.raises(ValueError) as exception_info:
+            functions.calculate_checkpoint_key([1, 2])
+        error_message = "Expected the following message: {}. Got the following: {}".format(expected_message, exception_info)
+        assert exception_info.match(expected_message), error_message
+
+    def test_key_depends_on_data_and_parts(self):
+        key = functions.calculate_checkpoint_key(test_df, "a")
+        changed_data_key = functions.calculate_checkpoint_key(test_df.assign(price = 0), "a")
+        changed_part_key = functions.calculate_checkpoint_key(test_df, "b")
+        error_message = "Expected a different key when the data or the parts change"
+        assert key == functions.calculate_checkpoint_key(test_df, "a"), error_message
+        assert len({key, changed_data_key, changed_part_key}) == 3, error_message
+
+    def test_key_depends_on_geometries(self):
+        test_gdf = gpd.GeoDataFrame({"price": [10, 20]}, geometry = [Point(0, 0), None])
+        key = functions.calculate_checkpoint_key(test_gdf)
+        moved_key = functions.calculate_checkpoint_key(test_gdf.set_geometry([Point(0, 0), Point(1, 1)]))
+        error_message = "Expected a stable key that changes with the geometries, and the input left unchanged"
+        assert key == functions.calculate_checkpoint_key(test_gdf), error_message
+        assert key != moved_key, error_message
+        assert test_gdf.geometry.iloc[0] == Point(0, 0), error_message
+
+class TestRunInChunks(object):
+    def test_valerror_on_bad_chunk_size(self, tmp_path):
+        expected_message = "chunk_size must be a positive integer, got 0"
+        with pytest.raises(ValueError) as exception_info:
+            functions.run_in_chunks(double_price, test_df, 0, tmp_path, "key", calls = [])
+        error_message = "Expected the following message: {}. Got the following: {}".format(expected_message, exception_info)
+        assert exception_info.match(expected_message), error_message
+
+    def test_chunks_are_concatenated_in_order(self, tmp_path):
+        expected = pd.DataFrame({"doubled": [20, 40, 60, 80, 100]})
+        actual = functions.run_in_chunks(double_price, test_df, 2, tmp_path, "key", calls = [])
+        error_message = "Expected {}, got {}".format(expected, actual)
+        assert expected.equals(actual), error_message
+
+    def test_resumes_after_last_completed_chunk(self, tmp_path):
+        with pytest.raises(RuntimeError):
+            functions.run_in_chunks(double_price, test_df, 2, tmp_path, "key", calls = [], fail_at = 4)
+        calls = []
+        actual = functions.run_in_chunks(double_price, test_df, 2, tmp_path, "key", calls = calls)
+        error_message = "Expected only the chunk starting at row 4 to run again, got {}".format(calls)
+        assert calls == [4], error_message
+        assert actual.loc[:,"doubled"].tolist() == [20, 40, 60, 80, 100], error_message
+
+    def test_new_key_discards_checkpoints(self, tmp_path):
+        functions.run_in_chunks(double_price, test_df, 2, tmp_path, "key", calls = [])
+        calls = []
+        functions.run_in_chunks(double_price, test_df, 2, tmp_path, "other key", calls = calls)
+        error_message = "Expected every chunk to run again, got {}".format(calls)
+        assert calls == [0, 2, 4], error_message
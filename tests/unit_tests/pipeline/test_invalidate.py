@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+------ What is this file? ------
+
+This test module contains some tests for the invalidate.py script.
+The script can be found at:
+    src/pipeline/invalidate.py
+
+"""
+#%% --- Import Required Packages ---
+
+import pytest
+from pathlib import Path # To wrap around filepaths
+from src.pipeline import invalidate as functions
+from src.pipeline import registry
+
+#%% --- Create test data ---
+
+test_artifacts = {"prices": {"path": Path("raw/prices.csv"), "kind": "csv"},
+                  "doubled": {"path": Path("processed/doubled.csv"), "kind": "csv"},
+                  "summed": {"path": Path("final/summed.csv"), "kind": "csv"},
+                  "counted": {"path": Path("final/counted.csv"), "kind": "csv"},
+                  "figures_of_plot_sum": {"path": Path("figures/plot_sum"), "kind": "figures"}}
+
+test_stages = {"double_price": {"function": None, "inputs": {"prices": "prices"}, "outputs": ["doubled"]},
+               "sum_price": {"function": None, "inputs": {"doubled": "doubled"}, "outputs": ["summed"]},
+               "count_price": {"function": None, "inputs": {"prices": "prices"}, "outputs": ["counted"]},
+               "plot_sum": {"function": None, "inputs": ["summed"], "outputs": ["figures_of_plot_sum"]}}
+
+def create_outputs(project_root):
+    for artifact in test_artifacts.values():
+        path = project_root.joinpath(artifact["path"])
+        path.parent.mkdir(parents = True, exist_ok = True)
+        if artifact["kind"] == "figures":
+            path.mkdir()
+            path.joinpath("figure.png").write_bytes(b"png")
+        else:
+            path.write_text("price\n1\n")
+    for stage_name in test_stages:
+        project_root.joinpath(functions.stage_cache.stage_cache_dir, stage_name).mkdir(parents = True)
+
+#%% --- Run tests ---
+
+class TestGetInvalidatedStages(object):
+    def test_valerror_on_unknown_change(self, tmp_path):
+        expected_message = "Unknown stages, artifacts or paths: \\['missing'\\]"
+        with pytest.raises(ValueError) as exception_info:
+            functions.get_invalidated_stages(["missing"], test_stages, test_artifacts, tmp_path)
+        error_message = "Expected the following message: {}. Got the following: {}".format(expected_message, exception_info)
+        assert exception_info.match(expected_message), error_message
+
+    def test_changed_stage_invalidates_downstream_only(self, tmp_path):
+        expected = ["sum_price", "plot_sum"]
+        actual = functions.get_invalidated_stages(["sum_price"], test_stages, test_artifacts, tmp_path)
+        error_message = "Expected {}, got {}".format(expected, actual)
+        assert expected == actual, error_message
+
+    def test_changed_file_invalidates_its_consumers(self, tmp_path):
+        expected = ["double_price", "sum_price", "count_price", "plot_sum"]
+        actual = functions.get_invalidated_stages(["raw/prices.csv"], test_stages, test_artifacts, tmp_path)
+        error_message = "Expected {}, got {}".format(expected, actual)
+        assert expected == actual, error_message
+
+    def test_visualization_does_not_invalidate_analysis(self, tmp_path):
+        expected = ["visualize_price_distribution_of_airbnb_rentals_kdeplot"]
+        actual = functions.get_invalidated_stages(expected, registry.stages, registry.artifacts, tmp_path)
+        error_message = "Expected {}, got {}".format(expected, actual)
+        assert expected == actual, error_message
+
+class TestFindArtifact(object):
+    def test_sidecar_belongs_to_shapefile(self, tmp_path):
+        expected = "htourism_centers_processed"
+        actual = functions.find_artifact("data/processed/htourism_centers_processed.dbf",
+                                         registry.artifacts, tmp_path)
+        error_message = "Expected {}, got {}".format(expected, actual)
+        assert expected == actual, error_message
+
+class TestInvalidate(object):
+    def test_removes_downstream_outputs_and_cache_entries(self, tmp_path):
+        create_outputs(tmp_path)
+        functions.invalidate(["doubled"], stages = test_stages, artifacts = test_artifacts,
+                             project_root = tmp_path)
+        cache_dir = tmp_path.joinpath(functions.stage_cache.stage_cache_dir)
+        error_message = "Expected only the outputs and cache entries downstream of doubled to be removed."
+        assert tmp_path.joinpath("processed/doubled.csv").exists(), error_message
+        assert tmp_path.joinpath("final/counted.csv").exists(), error_message
+        assert cache_dir.joinpath("count_price").exists(), error_message
+        assert not tmp_path.joinpath("final/summed.csv").exists(), error_message
+        assert not tmp_path.joinpath("figures/plot_sum").exists(), error_message
+        assert not cache_dir.joinpath("sum_price").exists(), error_message
+
+    def test_dry_run_removes_nothing(self, tmp_path):
+        create_outputs(tmp_path)
+        removed_paths = functions.invalidate(["double_price"], dry_run = True, stages = test_stages,
+                                             artifacts = test_artifacts, project_root = tmp_path)[1]
+        error_message = "Expected the paths to be listed but kept, got {}".format(removed_paths)
+        assert len(removed_paths) == 6, error_message
+        assert all(path.exists() for path in removed_paths), error_message
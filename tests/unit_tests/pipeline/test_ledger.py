@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+------ What is this file? ------
+
+This test module contains some tests for the ledger.py script.
+The script can be found at:
+    src/pipeline/ledger.py
+
+"""
+#%% --- Import Required Packages ---
+
+import pytest
+import pandas as pd
+import geopandas as gpd
+from pathlib import Path # To wrap around filepaths
+from shapely.geometry import Point
+from src.pipeline import ledger as functions
+from src.pipeline import runner
+
+#%% --- Create test data ---
+
+test_df = pd.DataFrame({"name": ["a", "b", "c"],
+                        "price": [10, 20, 30]})
+
+def drop_cheapest(prices):
+    return {"filtered": prices.loc[prices.loc[:,"price"] > 10,:]}
+
+test_artifacts = {"prices": {"path": Path("prices.csv"), "kind": "csv"},
+                  "filtered": {"path": Path("filtered.csv"), "kind": "csv", "persist": True}}
+
+test_stages = {"drop_cheapest": {"function": drop_cheapest,
+                                 "inputs": {"prices": "prices"},
+                                 "outputs": ["filtered"]}}
+
+def fail_on_prices(filtered):
+    raise RuntimeError("no prices")
+
+test_failing_stages = dict(test_stages, fail_on_prices = {"function": fail_on_prices,
+                                                          "inputs": {"filtered": "filtered"},
+                                                          "outputs": []})
+
+def make_run(run_id, wall_time):
+    return {"run_id": run_id,
+            "commit": None,
+            "stages": [{"stage": "drop_cheapest", "status": "run",
+                        "input_rows": {"prices": 3}, "output_rows": {"filtered": 2},
+                        "wall_time_s": wall_time, "cpu_time_s": wall_time, "peak_rss_mb": 100.0,
+                        "bytes_read": 10, "bytes_written": 10}]}
+
+#%% --- Run tests ---
+
+class TestGetArtifactSize(object):
+    def test_shapefile_includes_sidecar_files(self, tmp_path):
+        test_filepath = tmp_path / "test.shp"
+        gpd.GeoDataFrame({"price": [1]}, geometry = [Point(0, 0)]).to_file(test_filepath)
+        expected = sum(fp.stat().st_size for fp in tmp_path.iterdir())
+        actual = functions.get_artifact_size(test_filepath, "shapefile")
+        error_message = "Expected {} bytes, got {}".format(expected, actual)
+        assert expected == actual, error_message
+
+class TestFinishStageRecord(object):
+    def test_peak_rss_is_per_stage(self):
+        heavy_record = functions.start_stage_record("heavy", "run")
+        if functions.get_peak_rss_mb() is None or not heavy_record["started"][2]:
+            pytest.skip("The peak RSS can't be reset on this platform")
+        test_buffer = bytearray(200 * 1024 ** 2)
+        heavy_peak = functions.finish_stage_record(heavy_record)["peak_rss_mb"]
+        del test_buffer
+        light_peak = functions.finish_stage_record(functions.start_stage_record("light", "run"))["peak_rss_mb"]
+        error_message = "Expected the light stage to peak 200 MB below the heavy stage, got {} and {}".format(light_peak, heavy_peak)
+        assert heavy_peak - light_peak > 150, error_message
+
+class TestSelectRun(object):
+    def test_valerror_on_unknown_run(self):
+        expected_message = "No run missing in the ledger, which has 1 runs"
+        with pytest.raises(ValueError) as exception_info:
+            functions.select_run([make_run("a", 1.0)], "missing")
+        error_message = "Expected the following message: {}. Got the following: {}".format(expected_message, exception_info)
+        assert exception_info.match(expected_message), error_message
+
+    def test_selects_by_position(self):
+        expected = "b"
+        actual = functions.select_run([make_run("a", 1.0), make_run("b", 1.0)], "-1")["run_id"]
+        error_message = "Expected {}, got {}".format(expected, actual)
+        assert expected == actual, error_message
+
+class TestCompareRuns(object):
+    def test_relative_change(self):
+        comparison = functions.compare_runs(make_run("a", 2.0), make_run("b", 3.0))
+        expected = 50.0
+        actual = comparison.loc["drop_cheapest","wall_time_s_change_%"]
+        error_message = "Expected {}, got {}".format(expected, actual)
+        assert expected == actual, error_message
+
+class TestMain(object):
+    def test_compare_needs_two_runs(self, tmp_path, monkeypatch, capsys):
+        monkeypatch.setattr(functions.data_io, "project_root", tmp_path)
+        functions.append_run(make_run("a", 1.0), tmp_path.joinpath(functions.ledger_fp))
+        functions.main(["compare"])
+        actual = capsys.readouterr().out
+        error_message = "Expected a usage message, got {}".format(actual)
+        assert actual.startswith("compare needs two runs, the ledger has 1."), error_message
+
+    def test_summary_shows_failed_run(self, tmp_path, monkeypatch, capsys):
+        monkeypatch.setattr(functions.data_io, "project_root", tmp_path)
+        functions.append_run(dict(make_run("a", 1.0), status = "failed", error = "RuntimeError: no prices"),
+                             tmp_path.joinpath(functions.ledger_fp))
+        functions.main(["summary"])
+        actual = capsys.readouterr().out
+        error_message = "Expected the status and the error of the run, got {}".format(actual)
+        assert "--- a (commit None, failed) RuntimeError: no prices ---" in actual, error_message
+
+class TestRunPipelineLedger(object):
+    def test_run_is_recorded(self, tmp_path):
+        test_df.to_csv(tmp_path / "prices.csv", encoding = "utf-8-sig", index = False)
+        runner.run_pipeline(use_cache = False, stages = test_stages, artifacts = test_artifacts,
+                            project_root = tmp_path)
+        runs = functions.read_runs(tmp_path.joinpath(functions.ledger_fp))
+        stage_record = runs[-1]["stages"][0]
+        error_message = "Expected one run with the row counts and disk traffic of drop_cheapest, got {}".format(runs)
+        assert len(runs) == 1, error_message
+        assert runs[-1]["status"] == "succeeded", error_message
+        assert stage_record["input_rows"] == {"prices": 3}, error_message
+        assert stage_record["output_rows"] == {"filtered": 2}, error_message
+        assert stage_record["bytes_read"] == (tmp_path / "prices.csv").stat().st_size, error_message
+        assert stage_record["bytes_written"] == (tmp_path / "filtered.csv").stat().st_size, error_message
+
+    def test_failed_run_is_recorded(self, tmp_path):
+        test_df.to_csv(tmp_path / "prices.csv", encoding = "utf-8-sig", index = False)
+        with pytest.raises(RuntimeError):
+            runner.run_pipeline(use_cache = False, stages = test_failing_stages, artifacts = test_artifacts,
+                                project_root = tmp_path)
+        run = functions.read_runs(tmp_path.joinpath(functions.ledger_fp))[-1]
+        expected = ("failed", "RuntimeError: no prices", [("drop_cheapest", "run"), ("fail_on_prices", "failed")])
+        actual = (run["status"], run["error"], [(stage["stage"], stage["status"]) for stage in run["stages"]])
+        error_message = "Expected {}, got {}".format(expected, actual)
+        assert expected == actual, error_message
+
+    def test_run_is_not_recorded_when_disabled(self, tmp_path):
+        test_df.to_csv(tmp_path / "prices.csv", encoding = "utf-8-sig", index = False)
+        runner.run_pipeline(record_run = False, stages = test_stages, artifacts = test_artifacts,
+                            project_root = tmp_path)
+        error_message = "Expected no ledger to be written."
+        assert not tmp_path.joinpath(functions.ledger_fp).exists(), error_message
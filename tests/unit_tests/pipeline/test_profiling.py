@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+------ What is this file? ------
+
+This test module contains some tests for the profiling.py script.
+The script can be found at:
+    src/pipeline/profiling.py
+
+"""
+#%% --- Import Required Packages ---
+
+import time
+import pstats
+import pytest
+from src.pipeline import profiling as functions
+
+#%% --- Create test data ---
+
+def add_slowly(a, b):
+    time.sleep(0.05)
+    return a + b
+
+def fail():
+    raise RuntimeError("Stage failed")
+
+#%% --- Run tests ---
+
+class TestGetProfileMode(object):
+    def test_reads_environment_variable(self, monkeypatch):
+        monkeypatch.setenv(functions.profile_env_var, "Sample")
+        expected = "sample"
+        actual = functions.get_profile_mode()
+        error_message = "Expected {}, got {}".format(expected, actual)
+        assert expected == actual, error_message
+
+    def test_off_when_unset(self, monkeypatch):
+        monkeypatch.delenv(functions.profile_env_var, raising = False)
+        actual = functions.get_profile_mode()
+        error_message = "Expected None, got {}".format(actual)
+        assert actual is None, error_message
+
+    def test_valerror_on_unknown_mode(self):
+        expected_message = "The profile mode must be one of"
+        with pytest.raises(ValueError) as exception_info:
+            functions.get_profile_mode("line")
+        error_message = "Expected the following message: {}. Got the following: {}".format(expected_message, exception_info)
+        assert exception_info.match(expected_message), error_message
+
+class TestProfileCall(object):
+    def test_cprofile_writes_prof_file(self, tmp_path):
+        result, profile_dir = functions.profile_call(add_slowly, "add_slowly", "cprofile", tmp_path, a = 1, b = 2)
+        stats = pstats.Stats(str(profile_dir.joinpath("profile.prof")))
+        profiled_functions = [function_name for (_, _, function_name) in stats.stats]
+        error_message = "Expected the result 3 and add_slowly in the profile, got {} and {}".format(result, profiled_functions)
+        assert result == 3 and "add_slowly" in profiled_functions, error_message
+
+    def test_sample_writes_collapsed_stacks(self, tmp_path):
+        _, profile_dir = functions.profile_call(add_slowly, "add_slowly", "sample", tmp_path, a = 1, b = 2)
+        lines = profile_dir.joinpath("stacks.collapsed").read_text().splitlines()
+        error_message = "Expected sampled stacks ending in add_slowly, got {}".format(lines)
+        assert len(lines) > 0 and all(line.rsplit(" ", 1)[1].isdigit() for line in lines), error_message
+        assert any("add_slowly (" in line for line in lines), error_message
+
+    def test_profile_dir_is_under_reports(self, tmp_path):
+        _, profile_dir = functions.profile_call(add_slowly, "add_slowly", "cprofile", tmp_path, a = 1, b = 2)
+        expected = tmp_path.joinpath(functions.profiles_dir, "add_slowly")
+        error_message = "Expected the profile in {}, got {}".format(expected, profile_dir)
+        assert profile_dir.parent == expected, error_message
+
+    def test_profile_is_written_when_stage_fails(self, tmp_path):
+        with pytest.raises(RuntimeError):
+            functions.profile_call(fail, "fail", "all", tmp_path)
+        written = sorted(fp.name for fp in tmp_path.joinpath(functions.profiles_dir, "fail").rglob("*") if fp.is_file())
+        expected = ["profile.prof", "profile.txt", "stacks.collapsed"]
+        error_message = "Expected {}, got {}".format(expected, written)
+        assert expected == written, error_message
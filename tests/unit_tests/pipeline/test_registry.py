@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+------ What is this file? ------
+
+This test module contains some tests for the registry.py script.
+The script can be found at:
+    src/pipeline/registry.py
+
+"""
+#%% --- Import Required Packages ---
+
+import pytest
+from pathlib import Path # To wrap around filepaths
+from src.pipeline import registry as functions
+
+#%% --- Run tests ---
+
+class TestBuildRegistry(object):
+    def test_valerror_on_unknown_city(self):
+        expected_message = "Unknown city: atlantis"
+        with pytest.raises(ValueError) as exception_info:
+            functions.build_registry("atlantis")
+        error_message = "Expected the following message: {}. Got the following: {}".format(expected_message, exception_info)
+        assert exception_info.match(expected_message), error_message
+
+    def test_valerror_on_badly_formatted_snapshot(self):
+        expected_message = "snapshot must be a date formatted as YYYY-MM-DD, got 30-06-2020"
+        with pytest.raises(ValueError) as exception_info:
+            functions.build_registry(functions.home_city, "30-06-2020")
+        error_message = "Expected the following message: {}. Got the following: {}".format(expected_message, exception_info)
+        assert exception_info.match(expected_message), error_message
+
+    def test_default_matches_module_level_registry(self):
+        artifacts, stages = functions.build_registry()
+        error_message = "Expected build_registry() to describe the original run"
+        assert artifacts == functions.artifacts and stages == functions.stages, error_message
+
+    def test_snapshot_outputs_are_namespaced(self):
+        artifacts, stages = functions.build_registry(functions.home_city, "2020-06-30")
+        expected = {"istanbul_airbnb_raw": Path("data/raw/airbnb_snapshots/istanbul/2020-06-30.csv"),
+                    "nn_analysis_results_all": Path("data/final/2020-06-30/nn_analysis_results_all.csv"),
+                    "htourism_centers_processed": Path("data/processed/htourism_centers_processed.shp")}
+        actual = {name: artifacts[name]["path"] for name in expected}
+        error_message = "Expected {}, got {}".format(expected, actual)
+        assert expected == actual, error_message
+
+    def test_snapshot_runs_have_no_visualizations(self):
+        artifacts, stages = functions.build_registry(functions.home_city, "2020-06-30")
+        actual = [stage_name for stage_name, stage in stages.items() if stage["function"] is None]
+        error_message = "Expected no visualization stages, got {}".format(actual)
+        assert actual == [], error_message
+
+    def test_reuse_shared_leaves_out_shared_stages(self):
+        artifacts, stages = functions.build_registry(functions.home_city, "2020-06-30", reuse_shared = True)
+        actual = [stage_name for stage_name in functions.shared_stage_names if stage_name in stages]
+        error_message = "Expected no shared stages, got {}".format(actual)
+        assert actual == [], error_message
+
+class TestListSnapshots(object):
+    def test_lists_snapshots_oldest_first(self, tmp_path):
+        snapshots_dir = tmp_path.joinpath(functions.snapshots_dir, "istanbul")
+        snapshots_dir.mkdir(parents = True)
+        for snapshot in ["2021-06-30", "2020-06-30"]:
+            snapshots_dir.joinpath("{}.csv".format(snapshot)).write_text("id\n1\n")
+        expected = ["2020-06-30", "2021-06-30"]
+        actual = functions.list_snapshots("istanbul", tmp_path)
+        error_message = "Expected {}, got {}".format(expected, actual)
+        assert expected == actual, error_message
+
+    def test_city_without_snapshots(self, tmp_path):
+        actual = functions.list_snapshots("istanbul", tmp_path)
+        error_message = "Expected [], got {}".format(actual)
+        assert actual == [], error_message
+
+class TestDodoTargets(object):
+    def test_stage_outputs_are_dodo_targets(self):
+        #invalidate.py removes the outputs of a stage, doit only reruns the task
+        #if they are declared as its targets
+        import dodo
+        expected = {stage_name: sorted(str(dodo.get_target_fp(functions.artifacts[name])) for name in stage["outputs"])
+                    for stage_name, stage in functions.stages.items()}
+        actual = {stage_name: sorted(str(target) for target in getattr(dodo, "task_" + stage_name)()["targets"])
+                  for stage_name in functions.stages}
+        error_message = "Expected {}, got {}".format(expected, actual)
+        assert expected == actual, error_message
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+------ What is this file? ------
+
+This test module contains some tests for the runner.py script.
+The script can be found at:
+    src/pipeline/runner.py
+
+"""
+#%% --- Import Required Packages ---
+
+import pytest
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+from pathlib import Path # To wrap around filepaths
+from shapely.geometry import Point
+from src.pipeline import runner as functions
+from src.pipeline import registry
+
+#%% --- Create test data ---
+
+test_df = pd.DataFrame({"name": ["a", "b", "c"],
+                        "price": [10, 20, 30],
+                        "score": [0.1, np.nan, 1/3]})
+
+test_gdf = gpd.GeoDataFrame({"district_name": pd.Categorical(["x", "y", "x"]),
+                             "price": [10, 20, 30]},
+                            index = [5, 3, 8],
+                            geometry = [Point(0, 0), Point(1, 1), Point(2, 2)],
+                            crs = "EPSG:4326")
+
+def double_price(prices):
+    prices = prices.copy()
+    prices.loc[:,"price"] = prices.loc[:,"price"] * 2
+    return {"doubled": prices}
+
+def sum_price(doubled):
+    return {"summed": pd.DataFrame({"price": [doubled.loc[:,"price"].sum()]})}
+
+test_artifacts = {"prices": {"path": Path("prices.csv"), "kind": "csv"},
+                  "doubled": {"path": Path("doubled.csv"), "kind": "csv", "persist": False},
+                  "summed": {"path": Path("summed.csv"), "kind": "csv", "persist": True}}
+
+test_stages = {"sum_price": {"function": sum_price,
+                             "inputs": {"doubled": "doubled"},
+                             "outputs": ["summed"]},
+               "double_price": {"function": double_price,
+                                "inputs": {"prices": "prices"},
+                                "outputs": ["doubled"]}}
+
+#%% --- Run tests ---
+
+class TestResolveStageOrder(object):
+    def test_valerror_on_unknown_target(self):
+        expected_message = "Unknown stages: \\['missing'\\]"
+        with pytest.raises(ValueError) as exception_info:
+            functions.resolve_stage_order(test_stages, targets = ["missing"])
+        error_message = "Expected the following message: {}. Got the following: {}".format(expected_message, exception_info)
+        assert exception_info.match(expected_message), error_message
+
+    def test_upstream_stages_come_first(self):
+        expected = ["double_price", "sum_price"]
+        actual = functions.resolve_stage_order(test_stages, targets = ["sum_price"])
+        error_message = "Expected {}, got {}".format(expected, actual)
+        assert expected == actual, error_message
+
+    def test_registered_stages_keep_dodo_order(self):
+        expected = list(registry.stages.keys())
+        actual = functions.resolve_stage_order(registry.stages)
+        error_message = "Expected {}, got {}".format(expected, actual)
+        assert expected == actual, error_message
+
+class TestHandOver(object):
+    def test_csv_matches_disk_round_trip(self, tmp_path):
+        test_filepath = tmp_path / "test.csv"
+        test_df.to_csv(test_filepath, encoding = "utf-8-sig", index = False)
+        expected = pd.read_csv(test_filepath, encoding = "utf-8-sig")
+        actual = functions.hand_over(test_df, {"kind": "csv"})
+        error_message = "Expected the in-memory copy to equal the copy read from disk."
+        assert expected.equals(actual), error_message
+
+    def test_shapefile_matches_disk_round_trip(self, tmp_path):
+        test_filepath = tmp_path / "test.shp"
+        test_gdf.astype({"district_name": object}).to_file(test_filepath)
+        expected = gpd.read_file(test_filepath)
+        actual = functions.hand_over(test_gdf, {"kind": "shapefile"})
+        error_message = "Expected {}, got {}".format(list(expected.columns), list(actual.columns))
+        assert list(expected.columns) == list(actual.columns), error_message
+        assert expected.index.equals(actual.index), error_message
+        assert (actual.loc[:,"district_n"].dtype == object), error_message
+
+class TestRunPipeline(object):
+    def test_valerror_on_unknown_persist(self, tmp_path):
+        expected_message = "persist must be one of default, all, none or a list of artifact names. Got some"
+        with pytest.raises(ValueError) as exception_info:
+            functions.run_pipeline(persist = "some", stages = test_stages,
+                                   artifacts = test_artifacts, project_root = tmp_path)
+        error_message = "Expected the following message: {}. Got the following: {}".format(expected_message, exception_info)
+        assert exception_info.match(expected_message), error_message
+
+    def test_outputs_are_handed_over_in_memory(self, tmp_path):
+        test_df.to_csv(tmp_path / "prices.csv", encoding = "utf-8-sig", index = False)
+        values = functions.run_pipeline(persist = "none", stages = test_stages,
+                                        artifacts = test_artifacts, project_root = tmp_path)
+        error_message = "Expected the sum of the doubled prices, without any output on disk."
+        assert values["summed"].loc[0,"price"] == 120, error_message
+        assert not (tmp_path / "doubled.csv").exists(), error_message
+        assert not (tmp_path / "summed.csv").exists(), error_message
+
+    def test_default_persists_configured_outputs(self, tmp_path):
+        test_df.to_csv(tmp_path / "prices.csv", encoding = "utf-8-sig", index = False)
+        functions.run_pipeline(stages = test_stages, artifacts = test_artifacts,
+                               project_root = tmp_path)
+        error_message = "Expected only summed.csv to be written."
+        assert not (tmp_path / "doubled.csv").exists(), error_message
+        assert (tmp_path / "summed.csv").exists(), error_message
+
+    def test_profiled_stage_runs_even_if_cached(self, tmp_path):
+        test_df.to_csv(tmp_path / "prices.csv", encoding = "utf-8-sig", index = False)
+        functions.run_pipeline(stages = test_stages, artifacts = test_artifacts, project_root = tmp_path)
+        functions.run_pipeline(profile = "cprofile", profiled_stages = ["sum_price"], stages = test_stages,
+                               artifacts = test_artifacts, project_root = tmp_path)
+        run = functions.run_ledger.read_runs(tmp_path / functions.run_ledger.ledger_fp)[-1]
+        expected = {"double_price": "cached", "sum_price": "run"}
+        actual = {stage["stage"]: stage["status"] for stage in run["stages"]}
+        error_message = "Expected {} with a profile of sum_price, got {}".format(expected, actual)
+        assert expected == actual, error_message
+        assert len(list((tmp_path / "reports/profiles/sum_price").glob("*/profile.prof"))) == 1, error_message
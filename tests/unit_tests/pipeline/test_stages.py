@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+------ What is this file? ------
+
+This test module contains some tests for the stages.py script.
+The script can be found at:
+    src/pipeline/stages.py
+
+"""
+#%% --- Import Required Packages ---
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+from shapely.geometry import Point, Polygon
+from src.pipeline import stages as functions
+
+#%% --- Create test data ---
+
+test_districts_gdf = gpd.GeoDataFrame({"OBJECTID": [1, 2],
+                                       "Shape_Leng": [4.0, 4.0],
+                                       "Shape_Area": [1.0, 1.0],
+                                       "continent": ["Europe", "Asia"],
+                                       "district_e": ["West", "East"],
+                                       "district_t": ["Batı", "Doğu"]},
+                                      geometry = [Polygon([(0, 0), (1, 0), (1, 1), (0, 1)]),
+                                                  Polygon([(1, 0), (2, 0), (2, 1), (1, 1)])],
+                                      crs = "EPSG:4326")
+
+test_points_gdf = gpd.GeoDataFrame({"district_e": ["West", "West", "East"],
+                                    "price": [10, 20, 1000]},
+                                   geometry = [Point(0.2, 0.5), Point(0.4, 0.5), Point(1.5, 0.5)],
+                                   crs = "EPSG:4326")
+
+test_extra_data = pd.DataFrame({"district_eng": ["West", "East"],
+                                "population": [100, 200],
+                                "yearly_average_household_income": [1.5, 2.5],
+                                "unused": [0, 0]})
+
+#%% --- Run tests ---
+
+class TestCalculatePriceBounds(object):
+    def test_bounds_are_iqr_based(self):
+        test_prices = pd.Series(np.arange(1, 101))
+        expected = (25.75 - 1.5 * 49.5, 75.25 + 1.5 * 49.5)
+        actual = functions.calculate_price_bounds(test_prices, iqr_multiplier = 1.5)
+        error_message = "Expected {}, got {}".format(expected, actual)
+        assert np.allclose(expected, actual), error_message
+
+class TestCalculateGeographicDistribution(object):
+    def test_counts_and_extra_data_are_joined(self):
+        result = functions.calculate_geographic_distribution(test_districts_gdf, test_points_gdf,
+                                                             test_extra_data, count_column = "test_count")
+        expected_columns = ["district_e", "district_t", "geometry", "test_count",
+                            "population", "yearly_average_household_income"]
+        error_message = "Expected columns {}, got {}".format(expected_columns, list(result.columns))
+        assert list(result.columns) == expected_columns, error_message
+        error_message = "Expected counts [2, 1], got {}".format(result.loc[:,"test_count"].tolist())
+        assert result.loc[:,"test_count"].tolist() == [2, 1], error_message
+
+    def test_districts_without_points_have_no_count(self):
+        west_points_gdf = test_points_gdf.loc[test_points_gdf.loc[:,"district_e"] == "West",:]
+        result = functions.calculate_geographic_distribution(test_districts_gdf, west_points_gdf,
+                                                             test_extra_data, count_column = "test_count")
+        actual = result.loc[:,"test_count"]
+        error_message = "Expected counts [2, nan], got {}".format(actual.tolist())
+        assert actual.iloc[0] == 2 and np.isnan(actual.iloc[1]), error_message
+
+class TestDecodeRecodePointStr(object):
+    def test_point_is_decoded(self):
+        expected = Point(28.97, 41.01)
+        actual = functions.decode_recode_point_str(str(expected))
+        error_message = "Expected {}, got {}".format(expected, actual)
+        assert expected.equals(actual), error_message
+
+class TestRunNearestNeighborAnalysis(object):
+    def test_one_output_per_selected_district(self):
+        outputs = functions.run_nearest_neighbor_analysis(test_points_gdf, test_points_gdf,
+                                                          selected_districts = ["West", "East"])
+        expected = ["nn_analysis_results_all", "nn_analysis_results_normalized",
+                    "nn_analysis_results_norm_west", "nn_analysis_results_norm_east"]
+        error_message = "Expected {}, got {}".format(expected, list(outputs.keys()))
+        assert list(outputs.keys()) == expected, error_message
+
+    def test_checkpointed_results_match(self, tmp_path):
+        expected = functions.run_nearest_neighbor_analysis(test_points_gdf, test_points_gdf,
+                                                           selected_districts = ["West"])
+        actual = functions.run_nearest_neighbor_analysis(test_points_gdf, test_points_gdf,
+                                                         selected_districts = ["West"],
+                                                         checkpoint_dir = tmp_path, chunk_size = 2)
+        for output_name in expected:
+            error_message = "Expected the same {} with and without checkpoints".format(output_name)
+            assert expected[output_name].equals(actual[output_name]), error_message
+            assert tmp_path.joinpath(output_name, "manifest.json").is_file(), error_message